@@ -1,12 +1,24 @@
-from flask import Flask, render_template, redirect, url_for, flash, request
 import json
+import gzip
+import queue
+import sqlite3
+import hashlib
+import hmac
+import argparse
+import pandas as pd
+from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, Response, stream_with_context
 import os
 import webbrowser
 from threading import Timer
 from src.config import Config
+from src.pipeline.signal_snapshot import SignalSnapshot, parse_watchlist, category_tickers
+from src.pipeline.signal_events import SignalBroadcaster, format_sse
+from src.pipeline.history_store import query_series, HISTORY_FIELDS, DOWNSAMPLE_METHODS
 
 # --- LIBRERÍAS DE BASE DE DATOS Y LOGIN ---
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager, UserMixin, login_user, current_user, logout_user, login_required
 
@@ -15,7 +27,24 @@ app = Flask(__name__)
 
 # --- CONFIGURACIÓN ---
 app.config['SECRET_KEY'] = 'bubo_alpha_secret_key_12345' # Cambia esto en producción
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = Config.DATABASE_URL
+# Pool de conexiones: cada hilo de cada worker toma una conexión ya abierta
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': Config.DB_POOL_SIZE,
+    'max_overflow': Config.DB_MAX_OVERFLOW,
+    'pool_pre_ping': True,
+    'connect_args': {'timeout': Config.DB_BUSY_TIMEOUT} if Config.DATABASE_URL.startswith('sqlite') else {},
+}
+
+@event.listens_for(Engine, "connect")
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """SQLite en modo WAL: muchos lectores concurrentes (varios workers) mientras alguien escribe."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(Config.DB_BUSY_TIMEOUT * 1000)}")
+        cursor.close()
 
 # Extensiones
 db = SQLAlchemy(app)
@@ -36,33 +65,19 @@ class User(db.Model, UserMixin):
     # Columna para guardar la lista de favoritos (string separado por comas)
     watchlist = db.Column(db.String(500), default="") 
 
+# Señales en memoria: latest_signals.json solo se vuelve a leer cuando cambia en disco
+SIGNALS = SignalSnapshot()
+# Eventos "signals updated" del pipeline, repartidos a los clientes SSE de este proceso
+EVENTS = SignalBroadcaster()
+
 # --- RUTAS ---
 
 @app.route('/')
 @login_required
 def dashboard():
-    json_path = Config.DATA_PROCESSED / "latest_signals.json"
-    
-    signals = []
-    
-    # 1. Intentamos leer el archivo JSON con todas las señales
-    if json_path.exists():
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                all_signals = json.load(f)
-            
-            # 2. Lógica de Filtrado por Watchlist
-            if current_user.watchlist:
-                # Convertimos "AAPL, BTC" -> ['AAPL', 'BTC']
-                user_tickers = [t.strip().upper() for t in current_user.watchlist.split(',') if t.strip()]
-                # Filtramos solo las que el usuario quiere
-                signals = [s for s in all_signals if s['ticker'] in user_tickers]
-            else:
-                # Si no tiene watchlist, mostramos todo (o podrías mostrar nada)
-                signals = all_signals
-
-        except Exception as e:
-            print(f"Error leyendo JSON: {e}")
+    # 1. Señales desde la caché en memoria (se recarga sola si el pipeline publicó otra versión)
+    # 2. Filtrado por Watchlist: búsqueda directa por ticker (sin watchlist se muestra todo)
+    signals = SIGNALS.for_watchlist(current_user.watchlist)
     
     # 3. Renderizamos pasando las SEÑALES, el USUARIO y las CATEGORÍAS (para el menú)
     return render_template(
@@ -88,6 +103,166 @@ def update_watchlist():
     
     return redirect(url_for('dashboard'))
 
+# --- API JSON (herramientas internas) ---
+
+def _api_error(message, status):
+    return jsonify({'error': message}), status
+
+def _api_authorized():
+    """Sesión iniciada o, para herramientas sin sesión, el header X-API-Key igual a Config.API_TOKEN."""
+    if current_user.is_authenticated:
+        return True
+    key = request.headers.get('X-API-Key')
+    return bool(Config.API_TOKEN and key) and hmac.compare_digest(key, Config.API_TOKEN)
+
+def _csv_param(name):
+    """"narrative, date" -> ('date', 'narrative') (ordenado: la misma proyección comparte caché)."""
+    return tuple(sorted({v.strip() for v in request.args.get(name, '').split(',') if v.strip()}))
+
+@app.route('/api/signals')
+def api_signals():
+    """
+    Señales en JSON: ?tickers=AAPL,MSFT o ?category=Criptomonedas (por defecto todas),
+    ?fields=ticker,signal,alpha_score o ?exclude=narrative, y ?since=<version> para recibir solo
+    lo que cambió después de esa publicación. Responde 304 si el ETag no cambió y gzip si el cliente lo acepta.
+    """
+    if not _api_authorized():
+        return _api_error('No autorizado', 401)
+
+    tickers = None
+    if request.args.get('tickers'):
+        tickers = parse_watchlist(request.args['tickers'])
+    elif request.args.get('category'):
+        tickers = category_tickers(request.args['category'])
+        if tickers is None:
+            return _api_error(f"Categoría desconocida: {request.args['category']}", 404)
+
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return _api_error('since debe ser un número de versión', 400)
+
+    snapshot = SIGNALS.get()
+    body, etag = snapshot.render(tickers, _csv_param('fields'), _csv_param('exclude'), since)
+
+    # El ETag cambia con el contenido y con la codificación (fuerte por representación)
+    use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '') and len(body) >= Config.API_GZIP_MIN_BYTES
+    tag = f"{etag}-gzip" if use_gzip else etag
+
+    if request.if_none_match.contains(etag) or request.if_none_match.contains(f"{etag}-gzip"):
+        response = Response(status=304)
+    else:
+        response = Response(snapshot.gzipped(body, etag) if use_gzip else body, mimetype='application/json')
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(tag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Signals-Version'] = str(snapshot.version)
+    return response
+
+@app.route('/api/stream')
+def api_stream():
+    """
+    Canal SSE: un evento 'signals' por cada publicación del pipeline que toque la watchlist
+    del usuario (o ?tickers=...), con la versión y las señales que cambiaron.
+    Al reconectar, Last-Event-ID (la última versión recibida) trae lo que se perdió.
+    """
+    if not _api_authorized():
+        return _api_error('No autorizado', 401)
+
+    watchlist = request.args.get('tickers') or (current_user.watchlist if current_user.is_authenticated else "")
+    tickers = set(parse_watchlist(watchlist))
+    last_id = request.headers.get('Last-Event-ID', request.args.get('since'))
+
+    def message(version, changed):
+        relevant = [t for t in changed if not tickers or t in tickers]
+        if not relevant:
+            return None
+        return format_sse({'version': version, 'changed': relevant, 'signals': SIGNALS.get().select(relevant)},
+                          event='signals', event_id=version)
+
+    def stream():
+        q = EVENTS.subscribe()
+        try:
+            yield f"retry: {Config.SSE_RETRY_MS}\n\n"
+            # Reconexión: lo que cambió mientras el cliente estuvo desconectado
+            if last_id is not None and last_id.isdigit():
+                snapshot = SIGNALS.get()
+                missed = [s['ticker'] for s in snapshot.signals if s.get('version', 0) > int(last_id)]
+                msg = message(snapshot.version, missed) if missed else None
+                if msg:
+                    yield msg
+            while True:
+                try:
+                    event = q.get(timeout=Config.SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # Comentario SSE: mantiene viva la conexión a través de proxies
+                    yield ": ping\n\n"
+                    continue
+                msg = message(event['version'], event['changed'])
+                if msg:
+                    yield msg
+        finally:
+            EVENTS.unsubscribe(q)
+
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/history/<ticker>')
+def api_history(ticker):
+    """
+    Serie histórica de un ticker para graficar, reducida en el servidor (LTTB o min/max por bucket).
+    Parámetros: start, end (YYYY-MM-DD), points, fields (p. ej. close,alpha_score) y method (lttb|minmax).
+    """
+    if not _api_authorized():
+        return _api_error('No autorizado', 401)
+    if not Config.SIGNAL_HISTORY_PATH.exists():
+        return _api_error('Todavía no hay historial de señales', 404)
+
+    fields = _csv_param('fields') or ('close', 'alpha_score')
+    unknown = [f for f in fields if f not in HISTORY_FIELDS]
+    if unknown:
+        return _api_error(f"Campos desconocidos: {', '.join(unknown)}", 400)
+    method = request.args.get('method', 'lttb')
+    if method not in DOWNSAMPLE_METHODS:
+        return _api_error(f"method debe ser uno de: {', '.join(DOWNSAMPLE_METHODS)}", 400)
+    try:
+        points = int(request.args['points']) if 'points' in request.args else None
+        start, end = (str(pd.Timestamp(request.args[k]).date()) if request.args.get(k) else None for k in ('start', 'end'))
+    except ValueError:
+        return _api_error('points debe ser un entero y start/end fechas YYYY-MM-DD', 400)
+    if points is not None and points < 3:
+        return _api_error('points debe ser al menos 3', 400)
+
+    ticker = ticker.upper()
+    series = query_series(ticker, start, end, points, fields, method)
+    if not series['total']:
+        return _api_error(f"Sin historial para {ticker}", 404)
+
+    body = json.dumps(series, separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha1(body).hexdigest()
+    use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '') and len(body) >= Config.API_GZIP_MIN_BYTES
+
+    if request.if_none_match.contains(etag) or request.if_none_match.contains(f"{etag}-gzip"):
+        response = Response(status=304)
+    else:
+        response = Response(gzip.compress(body, compresslevel=6) if use_gzip else body, mimetype='application/json')
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(f"{etag}-gzip" if use_gzip else etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/categories')
+def api_categories():
+    return jsonify(Config.TICKER_CATEGORIES)
+
 # --- RUTAS DE AUTH (Login/Registro) ---
 
 @app.route('/register', methods=['GET', 'POST'])
@@ -137,12 +312,42 @@ def logout():
 
 # --- INICIO DEL SERVIDOR ---
 
+def init_db():
+    """Crea las tablas si no existen. Se corre una sola vez, antes de arrancar los workers."""
+    with app.app_context():
+        db.create_all()
+        # Ningún worker debe heredar conexiones abiertas por este proceso
+        db.engine.dispose()
+
+def create_app(create_schema=True):
+    """
+    Fábrica WSGI para producción con varios workers. Cada conexión SSE (/api/stream, una por
+    pestaña abierta del dashboard) queda abierta toda su vida, así que se usan workers gevent:
+    miles de conexiones por worker en vez de un hilo ocupado por cliente.
+
+        python -m src.app --init-db      # una vez: crea el esquema antes de los workers
+        gunicorn -w 4 -k gevent --worker-connections 1000 -b 0.0.0.0:8000 "src.app:create_app(create_schema=False)"
+
+    Con create_schema=False los workers no corren create_all() todos a la vez sobre la misma base.
+    Cada worker comparte latest_signals.npy por mmap y la base SQLite en modo WAL.
+    """
+    if create_schema:
+        init_db()
+    return app
+
 def open_browser():
     webbrowser.open_new("http://127.0.0.1:5000")
 
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all() # Crea la base de datos si no existe
+    parser = argparse.ArgumentParser(description="Dashboard de Bubo Alpha (servidor de desarrollo)")
+    parser.add_argument("--init-db", action="store_true", help="Solo crear el esquema de la base y salir (antes de gunicorn)")
+    args = parser.parse_args()
+    if args.init_db:
+        init_db()
+        raise SystemExit(0)
+
+    # Servidor de desarrollo (un proceso, recarga automática)
+    create_app()
         
     Timer(1, open_browser).start()
     app.run(debug=True, port=5000, host='0.0.0.0')
\ No newline at end of file
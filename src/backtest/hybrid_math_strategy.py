@@ -1,8 +1,10 @@
-import vectorbt as vbt
 import pandas as pd
 import numpy as np
 import logging
 from src.config import Config
+from src.pipeline.alpha_engine import load_alpha_store
+from src.backtest.simulator import from_signals, clean_signals, portfolio_metrics
+from src.backtest.result_cache import cached_backtest
 
 # Configuración de Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -16,74 +18,73 @@ def run_math_strategy():
     input_path = Config.DATA_PROCESSED / "features_master.parquet"
     if not input_path.exists(): return
 
-    logger.info("Cargando Master Dataset...")
-    df = pd.read_parquet(input_path)
+    # Parámetros de la simulación (entran en la llave de la caché de resultados)
+    params = {
+        "impact_factor": Config.IMPACT_FACTOR, "smooth_window": Config.SENTIMENT_SMOOTH_WINDOW,
+        "init_cash": 10000, "fees": 0.001, "slippage": 0.001,
+    }
 
-    # PREPARACIÓN DE MATRICES
-    
-    # Usamos ffill() para persistencia de datos 
-    close = df.pivot(index='date', columns='ticker', values='close').ffill()
-    ema_fast = df.pivot(index='date', columns='ticker', values='ema_fast').ffill()
-    ema_slow = df.pivot(index='date', columns='ticker', values='ema_slow').ffill()
-    
-    # Sentimiento con memoria de 7 días (suavizado)
-    sentiment_raw = df.pivot(index='date', columns='ticker', values='sentiment_avg').ffill().fillna(0.0)
-    sentiment_smooth = sentiment_raw.rolling(window=7).mean().fillna(0.0)
+    def simulate():
+        logger.info("Cargando Master Dataset...")
+        # Matrices del motor de Alpha (la misma fórmula y el mismo IMPACT_FACTOR que el dashboard)
+        alpha = load_alpha_store()
+        close = alpha.frame('close')
 
-    # INGENIERÍA MATEMÁTICA (EL INDICADOR ROBUSTO)
+        # INGENIERÍA MATEMÁTICA (EL INDICADOR ROBUSTO)
 
     
-    # A) Componente Técnico: Spread Normalizado
-    # Calculamos la distancia porcentual entre las EMAs.
-    # Si es > 0, es tendencia alcista. Si es 0.05, es una tendencia MUY fuerte.
-    tech_score = (ema_fast - ema_slow) / close
+        # A) Componente Técnico: Spread Normalizado
+        # Calculamos la distancia porcentual entre las EMAs.
+        # Si es > 0, es tendencia alcista. Si es 0.05, es una tendencia MUY fuerte.
+        tech_score = alpha.frame('tech_score')
     
-    # B) Componente Fundamental: Impacto de IA
-    # El sentimiento suele ser pequeño (0.1, 0.05). Lo multiplicamos por un "Factor de Impacto"
-    # para que tenga peso contra la tendencia.
-    # IMPACT_FACTOR = 0.5 significa que una noticia fuerte vale tanto como un 50% de tendencia.
-    IMPACT_FACTOR = 0.2
-    fund_score = sentiment_smooth * IMPACT_FACTOR
-    
-    # EL ALPHA SCORE (La Fusión) 
-
+        # B) Componente Fundamental: Impacto de IA
+        # El sentimiento suele ser pequeño (0.1, 0.05). Se multiplica por Config.IMPACT_FACTOR
+        # para que tenga peso contra la tendencia.
+        # EL ALPHA SCORE (La Fusión): Alpha = (Tendencia) + (Noticias * IMPACT_FACTOR)
+        alpha_score = alpha.frame('alpha_score')
 
-
-    # Sumamos ambos vectores.
-    # Alpha = (Tendencia) + (Noticias)
-    alpha_score = tech_score + fund_score
-
-    #GENERACIÓN DE SEÑALES
+        #GENERACIÓN DE SEÑALES
   
     
-    # Regla: Compramos cuando el Alpha Score cruza CERO hacia arriba
-    # Esto significa que la suma de fuerzas es positiva.
-    entries_hybrid = alpha_score > 0.0
-    exits_hybrid = alpha_score < 0.0
+        # Regla: Compramos cuando el Alpha Score cruza CERO hacia arriba
+        # Esto significa que la suma de fuerzas es positiva.
+        entries_hybrid = alpha_score > 0.0
+        exits_hybrid = alpha_score < 0.0
 
-    # Limpieza de señales (Evitar re-compras diarias)
-    entries_hybrid = entries_hybrid.vbt.signals.clean()
-    exits_hybrid = exits_hybrid.vbt.signals.clean()
+        # Limpieza de señales (Evitar re-compras diarias)
+        entries_hybrid = clean_signals(entries_hybrid)
+        exits_hybrid = clean_signals(exits_hybrid)
     
-    # Benchmark (Solo Técnico) para comparar
-    entries_tech = tech_score > 0.0
-    exits_tech = tech_score < 0.0
-    entries_tech = entries_tech.vbt.signals.clean()
-    exits_tech = exits_tech.vbt.signals.clean()
+        # Benchmark (Solo Técnico) para comparar
+        entries_tech = tech_score > 0.0
+        exits_tech = tech_score < 0.0
+        entries_tech = clean_signals(entries_tech)
+        exits_tech = clean_signals(exits_tech)
 
-    # SIMULACIÓN
+        # SIMULACIÓN
  
-    logger.info("Ejecutando Math Backtest...")
+        logger.info("Ejecutando Math Backtest...")
     
-    pf_tech = vbt.Portfolio.from_signals(
-        close=close, entries=entries_tech, exits=exits_tech, 
-        init_cash=10000, fees=0.001, slippage=0.001, freq='1D'
-    )
+        pf_tech = from_signals(
+            close=close, entries=entries_tech, exits=exits_tech, 
+            init_cash=params["init_cash"], fees=params["fees"], slippage=params["slippage"], freq='1D'
+        )
     
-    pf_hybrid = vbt.Portfolio.from_signals(
-        close=close, entries=entries_hybrid, exits=exits_hybrid, 
-        init_cash=10000, fees=0.001, slippage=0.001, freq='1D'
-    )
+        pf_hybrid = from_signals(
+            close=close, entries=entries_hybrid, exits=exits_hybrid, 
+            init_cash=params["init_cash"], fees=params["fees"], slippage=params["slippage"], freq='1D'
+        )
+        return {
+            'tech': portfolio_metrics(pf_tech),
+            'hybrid': portfolio_metrics(pf_hybrid),
+            'equity_tech': pf_tech.value(),
+            'equity_hybrid': pf_hybrid.value(),
+        }
+
+    # Si el dataset y los parámetros no cambiaron, el resultado sale de la caché sin simular
+    result = cached_backtest("hybrid_alpha_score", params, input_path, simulate)
+    tech, hybrid = result['tech'], result['hybrid']
 
     # REPORTE
   
@@ -93,17 +94,17 @@ def run_math_strategy():
     
     print(f"{'MÉTRICA':<20} | {'TÉCNICO':<15} | {'ALPHA SCORE (IA)':<15}")
     print("-" * 60)
-    print(f"{'Retorno Total':<20} | {pf_tech.total_return().mean()*100:14.2f}% | {pf_hybrid.total_return().mean()*100:14.2f}%")
-    print(f"{'Win Rate':<20} | {pf_tech.trades.win_rate().mean()*100:14.2f}% | {pf_hybrid.trades.win_rate().mean()*100:14.2f}%")
-    print(f"{'Sharpe Ratio':<20} | {pf_tech.sharpe_ratio().mean():14.4f}  | {pf_hybrid.sharpe_ratio().mean():14.4f}")
+    print(f"{'Retorno Total':<20} | {tech['total_return'].mean()*100:14.2f}% | {hybrid['total_return'].mean()*100:14.2f}%")
+    print(f"{'Win Rate':<20} | {tech['win_rate'].mean()*100:14.2f}% | {hybrid['win_rate'].mean()*100:14.2f}%")
+    print(f"{'Sharpe Ratio':<20} | {tech['sharpe'].mean():14.4f}  | {hybrid['sharpe'].mean():14.4f}")
     print("-" * 60)
     
     print("\nDETALLE POR ACTIVO:")
     comparison = pd.DataFrame({
-        'Tecnico_%': pf_tech.total_return() * 100,
-        'Hibrido_%': pf_hybrid.total_return() * 100,
-        'Diferencia': (pf_hybrid.total_return() - pf_tech.total_return()) * 100,
-        'Trades_IA': pf_hybrid.trades.count()
+        'Tecnico_%': tech['total_return'] * 100,
+        'Hibrido_%': hybrid['total_return'] * 100,
+        'Diferencia': (hybrid['total_return'] - tech['total_return']) * 100,
+        'Trades_IA': hybrid['trades']
     })
     print(comparison)
     print("="*60)
@@ -1,8 +1,10 @@
-import vectorbt as vbt
 import pandas as pd
 import numpy as np
 import logging
 from src.config import Config
+from src.data.market_matrix import load_market_bundle
+from src.backtest.simulator import from_signals, portfolio_metrics
+from src.backtest.result_cache import BacktestCache, dataset_hash, result_key
 
 # Configuración de Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -14,78 +16,82 @@ def optimize_alpha_score():
     Optimización Paramétrica:
     Ejecuta la estrategia Híbrida múltiples veces con distintos pesos (Impact Factors)
     para encontrar el equilibrio perfecto entre Técnica y Noticias.
+    Para grids de varios parámetros (EMAs, ventana de sentimiento, umbrales) usar src.backtest.sweep.
     """
     input_path = Config.DATA_PROCESSED / "features_master.parquet"
     if not input_path.exists(): return
 
     logger.info("Cargando datos...")
-    df = pd.read_parquet(input_path)
+    bundle = load_market_bundle()
 
-    # PREPARACIÓN DE DATOS
-    close = df.pivot(index='date', columns='ticker', values='close').ffill()
-    ema_fast = df.pivot(index='date', columns='ticker', values='ema_fast').ffill()
-    ema_slow = df.pivot(index='date', columns='ticker', values='ema_slow').ffill()
+    # PREPARACIÓN DE DATOS (bundle compartido de matrices fecha x ticker)
+    close = bundle['close']
     
     # Sentimiento suavizado (7 días)
-    sentiment_raw = df.pivot(index='date', columns='ticker', values='sentiment_avg').ffill().fillna(0.0)
-    sentiment_smooth = sentiment_raw.rolling(window=7).mean().fillna(0.0)
-
-    # DEFINIR EL MOTOR DE INDICADORES (Indicator Factory)
-    # Esta es la magia de vbt. Definimos una función que acepta un parámetro 'impact'.
-    # vbt correrá esta función para cada valor del rango que le demos.
-    
-    def calculate_alpha(tech_spread, sentiment, impact):
-        # Fórmula: Score Técnico + (Sentimiento * Peso)
-        return tech_spread + (sentiment * impact)
-
-    AlphaIndicator = vbt.IndicatorFactory(
-        class_name='AlphaOptimizer',
-        input_names=['tech_spread', 'sentiment'],
-        param_names=['impact'], # <--- Este es el parámetro a optimizar
-        output_names=['alpha_score']
-    ).from_apply_func(calculate_alpha)
+    sentiment_smooth = bundle['sentiment_smooth']
 
     #COMPONENTE TÉCNICO BASE
-    tech_score = (ema_fast - ema_slow) / close
+    tech_score = bundle['tech_score']
 
     # EJECUCIÓN MASIVA (El Torneo)
     # Probamos pesos desde 0.0 hasta 2.0 en pasos de 0.1
     # np.arange(start, stop, step) -> [0.0, 0.1, 0.2 ... 2.0]
-    test_range = np.arange(0.0, 2.1, 0.1)
+    test_range = np.round(np.arange(0.0, 2.1, 0.1), 2)
     
     logger.info(f"Probando {len(test_range)} configuraciones distintas...")
     
-    # Run: Ejecuta todas las combinaciones a la vez
-    alpha = AlphaIndicator.run(
-        tech_score, 
-        sentiment_smooth, 
-        impact=test_range,
-        param_product=True # Prueba cada peso contra cada activo
-    )
+    # CACHÉ POR PUNTO: cada peso se guarda por separado (llave = dataset + parámetros),
+    # así repetir la corrida es inmediato y ampliar el rango solo simula los pesos nuevos.
+    params = {"smooth_window": Config.SENTIMENT_SMOOTH_WINDOW, "init_cash": 10000, "fees": 0.001}
+    cache = BacktestCache() if Config.BACKTEST_CACHE else None
+    keys = {}
+    if cache:
+        data_hash = dataset_hash(input_path)
+        keys = {impact: result_key("alpha_impact", {**params, "impact": float(impact)}, data_hash) for impact in test_range}
+    results = {impact: cache.get(key) for impact, key in keys.items()}
+    results = {impact: r for impact, r in results.items() if r is not None}
+    missing = [impact for impact in test_range if impact not in results]
+    logger.info(f"{len(results)} pesos ya estaban en caché, {len(missing)} por simular.")
 
-    # GENERAR SEÑALES
-    # Entrada cuando Alpha > 0, Salida cuando Alpha < 0
-    entries = alpha.alpha_score > 0.0
-    exits = alpha.alpha_score < 0.0
-    
-    # SIMULACIÓN DE PORTAFOLIO (Portfolio)
-    # vbt calcula el retorno para las 20 versiones x 5 activos = 100 backtests en 1 segundo.
-    pf = vbt.Portfolio.from_signals(
-        close=close, 
-        entries=entries, 
-        exits=exits, 
-        init_cash=10000, 
-        fees=0.001, 
-        freq='1D'
-    )
+    if missing:
+        # Fórmula: Score Técnico + (Sentimiento * Peso), una copia por peso.
+        # Columnas = (impact, ticker): cada peso contra cada activo
+        alpha_score = pd.concat(
+            {impact: tech_score + (sentiment_smooth * impact) for impact in missing},
+            axis=1, names=['impact', 'ticker']
+        )
+
+        # GENERAR SEÑALES
+        # Entrada cuando Alpha > 0, Salida cuando Alpha < 0
+        entries = alpha_score > 0.0
+        exits = alpha_score < 0.0
+        
+        # SIMULACIÓN DE PORTAFOLIO (Portfolio)
+        # Un solo backtest vectorizado para todos los pesos pendientes x todos los activos.
+        pf = from_signals(
+            close=pd.concat({impact: close for impact in missing}, axis=1, names=['impact', 'ticker']), 
+            entries=entries, 
+            exits=exits, 
+            init_cash=params["init_cash"], 
+            fees=params["fees"], 
+            freq='1D'
+        )
+
+        metrics = portfolio_metrics(pf)
+        for impact in missing:
+            results[impact] = {'metrics': metrics.xs(impact, level='impact')}
+            if cache:
+                cache.put(keys[impact], results[impact], evict=False)
+        if cache:
+            cache.evict()
 
     # ANÁLISIS DE RESULTADOS
     # Obtenemos el Sharpe Ratio para cada combinación
-    sharpe = pf.sharpe_ratio()
+    sharpe = pd.concat({impact: results[impact]['metrics']['sharpe'] for impact in test_range}, names=['impact', 'ticker'])
     
     # Promediamos el Sharpe de todos los activos para ver qué peso es mejor EN GENERAL
     # El índice del resultado será el valor de 'impact'
-    avg_sharpe_by_impact = sharpe.groupby('alphaoptimizer_impact').mean()
+    avg_sharpe_by_impact = sharpe.groupby(level='impact').mean()
     
     # Encontramos el ganador
     best_impact = avg_sharpe_by_impact.idxmax()
@@ -106,7 +112,7 @@ def optimize_alpha_score():
     print("="*60)
     # Ver cuál es el mejor peso para cada activo individualmente
     # unstack para ver tabla: Filas=Impacto, Columnas=Ticker
-    sharpe_table = sharpe.unstack(level='alphaoptimizer_impact')
+    sharpe_table = sharpe.unstack(level='impact')
     print(sharpe_table.idxmax(axis=1)) # Muestra el mejor peso para cada ticker
     
     print("\n" + "="*60)
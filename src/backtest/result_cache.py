@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import pandas as pd
+from src.config import Config
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_HASH_BLOCK = 1 << 20
+
+def _dataset_files(path):
+    return [path] if path.is_file() else sorted(f for f in path.rglob("*") if f.is_file())
+
+def dataset_hash(path, memo_path=None):
+    """
+    Hash del CONTENIDO de un dataset (archivo o directorio particionado).
+    Como leer todo el parquet cuesta, el hash se recuerda junto a la versión barata
+    (mtime, tamaño) de cada archivo y solo se recalcula cuando alguno cambia.
+    """
+    memo_path = memo_path or Config.BACKTEST_CACHE_DIR / "dataset_hashes.json"
+    files = _dataset_files(path)
+    names = [f.name if f == path else str(f.relative_to(path)) for f in files]
+    stats = [f.stat() for f in files]
+    version = [[name, st.st_mtime_ns, st.st_size] for name, st in zip(names, stats)]
+
+    memo = {}
+    if memo_path.exists():
+        with open(memo_path, 'r', encoding='utf-8') as f:
+            memo = json.load(f)
+    entry = memo.get(str(path))
+    if entry and entry["version"] == version:
+        return entry["hash"]
+
+    digest = hashlib.sha256()
+    for name, f in zip(names, files):
+        digest.update(name.encode('utf-8'))
+        with open(f, 'rb') as fh:
+            for block in iter(lambda: fh.read(_HASH_BLOCK), b""):
+                digest.update(block)
+
+    memo[str(path)] = {"version": version, "hash": digest.hexdigest()}
+    memo_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = memo_path.with_name(f"{memo_path.name}.tmp{os.getpid()}")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(memo, f)
+    os.replace(tmp_path, memo_path)
+    return memo[str(path)]["hash"]
+
+def result_key(strategy, params, data_hash):
+    """
+    Llave de un resultado: hash del dataset + nombre de la estrategia + sus parámetros.
+    El motor de simulación (Config.BACKTEST_ENGINE) entra en la llave automáticamente.
+    """
+    payload = json.dumps(
+        {"strategy": strategy, "data": data_hash, "engine": Config.BACKTEST_ENGINE, "params": params},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class BacktestCache:
+    """
+    Caché en disco de resultados de backtests: un directorio por llave con los objetos
+    pandas del resultado (métricas por ticker, curvas de equity...).
+    La fecha de modificación del directorio marca el último uso para desalojar lo más viejo
+    cuando hay más de Config.BACKTEST_CACHE_MAX_ENTRIES resultados.
+    """
+
+    def __init__(self, path=None, max_entries=None):
+        self.path = path or Config.BACKTEST_CACHE_DIR
+        self.max_entries = max_entries or Config.BACKTEST_CACHE_MAX_ENTRIES
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _entry(self, key):
+        return self.path / key[:2] / key
+
+    def get(self, key):
+        """Devuelve {nombre: objeto pandas} o None si la llave no está."""
+        entry = self._entry(key)
+        if not (entry / "index.json").exists():
+            return None
+        try:
+            with open(entry / "index.json", 'r', encoding='utf-8') as f:
+                names = json.load(f)
+            result = {name: pd.read_pickle(entry / f"{name}.pkl") for name in names}
+        except (OSError, EOFError, ValueError):
+            # Entrada a medio borrar por otro proceso: se trata como fallo
+            return None
+        # Marcamos el acierto como reciente (protegido del desalojo)
+        os.utime(entry)
+        return result
+
+    def put(self, key, result, evict=True):
+        """
+        Guarda un resultado {nombre: objeto pandas} de forma atómica y desaloja si hace falta.
+        Quien guarda muchos resultados seguidos puede pasar evict=False y llamar evict() al final.
+        """
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry.with_name(f"{key}.tmp{os.getpid()}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir()
+
+        for name, obj in result.items():
+            obj.to_pickle(tmp_path / f"{name}.pkl")
+        # El índice se escribe al final: su presencia marca la entrada como completa
+        with open(tmp_path / "index.json", 'w', encoding='utf-8') as f:
+            json.dump(list(result), f)
+
+        try:
+            tmp_path.rename(entry)
+        except OSError:
+            # Otro proceso guardó la misma llave al mismo tiempo: el resultado es idéntico
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        if evict:
+            self.evict()
+
+    def entries(self):
+        return [d for shard in self.path.iterdir() if shard.is_dir() for d in shard.iterdir()
+                if d.is_dir() and ".tmp" not in d.name]
+
+    def evict(self):
+        """Borra los resultados usados hace más tiempo hasta quedar en max_entries."""
+        entries = self.entries()
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
+
+        def last_used(d):
+            try:
+                return d.stat().st_mtime
+            except FileNotFoundError:
+                return 0.0
+
+        for d in sorted(entries, key=last_used)[:excess]:
+            shutil.rmtree(d, ignore_errors=True)
+        logger.info(f"Caché de backtests: {excess} resultados viejos desalojados.")
+
+def cached_backtest(strategy, params, data_path, compute, cache=None):
+    """
+    Corre `compute()` (que devuelve {nombre: objeto pandas}) solo si no hay un resultado
+    guardado para el mismo dataset, estrategia y parámetros. Con Config.BACKTEST_CACHE=False
+    siempre simula.
+    """
+    if not Config.BACKTEST_CACHE:
+        return compute()
+
+    cache = cache or BacktestCache()
+    key = result_key(strategy, params, dataset_hash(data_path))
+    start = time.perf_counter()
+    result = cache.get(key)
+    if result is not None:
+        logger.info(f"Caché de backtests: '{strategy}' sin cambios, resultado reutilizado ({time.perf_counter() - start:.2f}s).")
+        return result
+
+    result = compute()
+    cache.put(key, result)
+    return result
@@ -0,0 +1,242 @@
+import logging
+import numpy as np
+import pandas as pd
+from src.config import Config
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Numba es opcional (igual que en src.tech.kernels): con Numba el bucle por serie se compila,
+# sin Numba se usa una versión NumPy que recorre el tiempo vectorizando entre columnas.
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Días por año para anualizar con freq='1D' (la misma convención que vectorbt)
+ANN_FACTOR = 365
+
+# SIMULADOR LONG-ONLY (mismas reglas que vbt.Portfolio.from_signals con los defaults que usamos):
+# - Entrada sin posición: compra con TODO el efectivo al cierre * (1 + slippage), pagando fees.
+# - Salida con posición: vende todo al cierre * (1 - slippage), pagando fees.
+# - Entrada y salida en la misma barra se ignoran; una entrada con posición abierta no acumula.
+# - Barras sin precio (NaN) no operan.
+
+def _simulate_loop(close, entries, exits, init_cash, fees, slippage):
+    T, N = close.shape
+    value = np.empty((T, N))
+    n_trades = np.zeros(N)
+    n_wins = np.zeros(N)
+    open_pnl = np.zeros(N)
+    is_open = np.zeros(N, dtype=np.bool_)
+    for j in range(N):
+        cash = init_cash
+        size = 0.0
+        cost = 0.0      # Efectivo invertido en la posición abierta (incluye fees de entrada)
+        last = np.nan   # Último precio válido, para valuar
+        for t in range(T):
+            price = close[t, j]
+            if not np.isnan(price):
+                last = price
+                if entries[t, j] and not exits[t, j] and size == 0.0 and cash > 0.0:
+                    size = cash / (1.0 + fees) / (price * (1.0 + slippage))
+                    cost = cash
+                    cash = 0.0
+                    n_trades[j] += 1
+                elif exits[t, j] and not entries[t, j] and size > 0.0:
+                    cash += size * price * (1.0 - slippage) * (1.0 - fees)
+                    if cash > cost:
+                        n_wins[j] += 1
+                    size = 0.0
+            value[t, j] = cash if size == 0.0 else cash + size * last
+        # Trade abierto al final: PnL al cierre de la última barra (sin fees de salida), como vbt.
+        # Si esa barra no tiene precio el PnL queda NaN (y no cuenta como ganador)
+        is_open[j] = size > 0.0
+        open_pnl[j] = size * close[T - 1, j] - cost if size > 0.0 else np.nan
+    return value, n_trades, n_wins, open_pnl, is_open
+
+def _simulate_rows(close, entries, exits, init_cash, fees, slippage):
+    T, N = close.shape
+    value = np.empty((T, N))
+    cash = np.full(N, float(init_cash))
+    size = np.zeros(N)
+    cost = np.zeros(N)
+    last = np.full(N, np.nan)
+    n_trades = np.zeros(N)
+    n_wins = np.zeros(N)
+    for t in range(T):
+        price = close[t]
+        valid = ~np.isnan(price)
+        last = np.where(valid, price, last)
+
+        buy = valid & entries[t] & ~exits[t] & (size == 0.0) & (cash > 0.0)
+        sell = valid & exits[t] & ~entries[t] & (size > 0.0)
+
+        proceeds = np.where(sell, cash + size * np.where(valid, price, 0.0) * (1.0 - slippage) * (1.0 - fees), 0.0)
+        n_wins += sell & (proceeds > cost)
+        n_trades += buy
+
+        new_size = np.where(buy, cash / (1.0 + fees) / (np.where(valid, price, 1.0) * (1.0 + slippage)), np.where(sell, 0.0, size))
+        cost = np.where(buy, cash, cost)
+        cash = np.where(buy, 0.0, np.where(sell, proceeds, cash))
+        size = new_size
+        value[t] = np.where(size == 0.0, cash, cash + size * last)
+
+    open_pnl = np.where(size > 0.0, size * close[-1] - cost, np.nan)
+    return value, n_trades, n_wins, open_pnl, size > 0.0
+
+if NUMBA_AVAILABLE:
+    _simulate_impl = njit(cache=True)(_simulate_loop)
+else:
+    _simulate_impl = _simulate_rows
+
+def clean_signals(signals):
+    """Equivalente a signals.vbt.signals.clean() con un solo argumento: solo el primer True de cada racha."""
+    signals = signals.fillna(False).astype(bool)
+    return signals & ~signals.shift(1, fill_value=False)
+
+class Trades:
+    """
+    Conteos de trades por columna, con la misma interfaz que pf.trades de vbt para lo que usamos.
+    Como en vbt, count() y win_rate() incluyen el trade que quede abierto al final, valuado
+    al cierre de la última barra: si esa barra es NaN su PnL es NaN y no cuenta como ganador.
+    """
+
+    def __init__(self, n_trades, n_wins, open_pnl, is_open):
+        self._n_trades = n_trades
+        self._n_wins = n_wins          # Trades cerrados con ganancia
+        self._open_pnl = open_pnl      # PnL del trade abierto (NaN si no hay o si el último cierre es NaN)
+        self._is_open = is_open        # Hay un trade abierto al final
+
+    def count(self):
+        return self._n_trades
+
+    def win_rate(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (self._n_wins + (self._open_pnl > 0)) / self._n_trades
+
+    def closed_count(self):
+        return self._n_trades - self._is_open
+
+    def closed_win_rate(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._n_wins / self.closed_count()
+
+class SignalPortfolio:
+    """
+    Resultado de simular señales de entrada/salida sobre matrices fecha x ticker.
+    Expone las métricas que usan los backtests con los mismos nombres que vbt.Portfolio.
+    """
+
+    def __init__(self, close, value, n_trades, n_wins, open_pnl, is_open, init_cash):
+        self.init_cash = init_cash
+        self._value = pd.DataFrame(value, index=close.index, columns=close.columns)
+        self.trades = Trades(
+            pd.Series(n_trades.astype(int), index=close.columns, name='count'),
+            pd.Series(n_wins, index=close.columns),
+            pd.Series(open_pnl, index=close.columns),
+            pd.Series(is_open.astype(int), index=close.columns),
+        )
+
+    def value(self):
+        return self._value
+
+    def returns(self):
+        prev = self._value.shift(1)
+        prev.iloc[0] = self.init_cash
+        return self._value / prev - 1
+
+    def total_return(self):
+        return (self._value.iloc[-1] / self.init_cash - 1).rename('total_return')
+
+    def sharpe_ratio(self):
+        returns = self.returns()
+        std = returns.std(ddof=1)
+        sharpe = returns.mean() / std * np.sqrt(ANN_FACTOR)
+        # Igual que vbt: sin volatilidad el Sharpe es infinito; con menos de 2 barras, NaN
+        sharpe[std == 0] = np.inf
+        if len(returns) < 2:
+            sharpe[:] = np.nan
+        return sharpe.rename('sharpe_ratio')
+
+    def max_drawdown(self):
+        return (self._value / self._value.cummax() - 1).min().rename('max_drawdown')
+
+    def stats(self):
+        """Resumen promedio de todas las columnas (subconjunto de pf.stats() de vbt)."""
+        return pd.Series({
+            'Start Value': self.init_cash,
+            'End Value': self._value.iloc[-1].mean(),
+            'Total Return [%]': self.total_return().mean() * 100,
+            'Max Drawdown [%]': -self.max_drawdown().mean() * 100,
+            'Total Trades': self.trades.count().mean(),
+            'Total Closed Trades': self.trades.closed_count().mean(),
+            # Como en vbt, el Win Rate del resumen solo mira trades cerrados
+            'Win Rate [%]': self.trades.closed_win_rate().mean() * 100,
+            'Sharpe Ratio': self.sharpe_ratio().replace([np.inf, -np.inf], np.nan).mean(),
+        })
+
+def simulate_signals(close, entries, exits, init_cash=10000, fees=0.0, slippage=0.0):
+    """
+    Backtest long-only de señales sobre DataFrames alineados (índice=fecha, columnas=ticker).
+    Devuelve un SignalPortfolio con value(), returns(), total_return(), sharpe_ratio() y trades.
+    """
+    entries = entries.reindex_like(close).fillna(False).to_numpy(dtype=bool)
+    exits = exits.reindex_like(close).fillna(False).to_numpy(dtype=bool)
+    value, n_trades, n_wins, open_pnl, is_open = _simulate_impl(close.to_numpy(dtype=np.float64), entries, exits,
+                                                      float(init_cash), float(fees), float(slippage))
+    return SignalPortfolio(close, value, n_trades, n_wins, open_pnl, is_open, init_cash)
+
+def portfolio_metrics(pf):
+    """Métricas por columna (ticker) de un portafolio nativo o de vectorbt, listas para guardar en caché."""
+    return pd.DataFrame({
+        'total_return': pf.total_return(),
+        'sharpe': pf.sharpe_ratio(),
+        'win_rate': pf.trades.win_rate(),
+        'trades': pf.trades.count(),
+    })
+
+def from_signals(close, entries, exits, init_cash=10000, fees=0.0, slippage=0.0, freq='1D', engine=None):
+    """
+    Punto de entrada común de los backtests: usa el simulador nativo o vectorbt
+    según Config.BACKTEST_ENGINE ("native" / "vectorbt"). vectorbt solo se importa si se pide.
+    """
+    engine = engine or Config.BACKTEST_ENGINE
+    if engine == "vectorbt":
+        import vectorbt as vbt
+        return vbt.Portfolio.from_signals(close=close, entries=entries, exits=exits, init_cash=init_cash,
+                                          fees=fees, slippage=slippage, freq=freq)
+    if engine != "native":
+        raise ValueError(f"Motor de backtest desconocido: {engine}")
+    return simulate_signals(close, entries, exits, init_cash=init_cash, fees=fees, slippage=slippage)
+
+if __name__ == "__main__":
+    # Chequeo de equivalencia contra vectorbt (si está instalado) sobre datos sintéticos
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2020-01-01", periods=1500, freq="D")
+    close = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.02, (1500, 20)), axis=0)), index=dates)
+    close.iloc[:30, ::3] = np.nan
+    signal = close.ewm(span=10).mean() - close.ewm(span=40).mean()
+    entries, exits = clean_signals(signal > 0), clean_signals(signal < 0)
+
+    native = from_signals(close, entries, exits, fees=0.001, slippage=0.001, engine="native")
+    logger.info(f"Numba disponible: {NUMBA_AVAILABLE}")
+    try:
+        import vectorbt  # noqa: F401
+    except ImportError:
+        logger.info("vectorbt no está instalado: solo se corrió el simulador nativo.")
+        print(native.stats())
+    else:
+        ref = from_signals(close, entries, exits, fees=0.001, slippage=0.001, engine="vectorbt")
+        checks = {
+            "total_return": (native.total_return(), ref.total_return()),
+            "sharpe": (native.sharpe_ratio(), ref.sharpe_ratio()),
+            "win_rate": (native.trades.win_rate(), ref.trades.win_rate()),
+            "trades": (native.trades.count(), ref.trades.count()),
+            "value": (native.value(), ref.value()),
+        }
+        for name, (fast, reference) in checks.items():
+            ok = np.allclose(np.asarray(fast, dtype=float), np.asarray(reference, dtype=float), rtol=1e-9, equal_nan=True)
+            logger.info(f"   {name:<15} {'OK' if ok else 'DIFERENTE'}")
@@ -0,0 +1,287 @@
+import json
+import math
+import hashlib
+import argparse
+import itertools
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.config import Config
+from src.tech import kernels
+from src.data.feature_store import open_feature_store, STORE_SOURCES
+from src.data.market_matrix import load_market_bundle
+from src.backtest.simulator import from_signals
+from src.backtest.result_cache import BacktestCache, dataset_hash, result_key
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Parámetros de la simulación (los mismos que optimize_weights)
+INIT_CASH = 10000
+FEES = 0.001
+
+# Columnas del grid, en el orden en que se arma el producto cartesiano
+PARAM_NAMES = ('impact', 'ema_fast', 'ema_slow', 'smooth_window', 'entry_threshold', 'exit_threshold')
+
+# Grid por defecto: el barrido histórico de impacto (0.0 a 2.0) alrededor de la configuración actual
+DEFAULT_GRID = {
+    'impact': np.round(np.arange(0.0, 2.1, 0.1), 2).tolist(),
+    'ema_fast': [Config.SMA_FAST],
+    'ema_slow': [Config.SMA_SLOW],
+    'smooth_window': [Config.SENTIMENT_SMOOTH_WINDOW],
+    'entry_threshold': [0.0],
+    'exit_threshold': [0.0],
+}
+
+# Matrices derivadas que cada worker calcula una sola vez (EMAs por span, sentimiento por ventana)
+_WORKER = {}
+
+def expand_grid(grid):
+    """
+    Producto cartesiano del grid -> DataFrame con una fila por configuración.
+    Descarta combinaciones sin sentido (EMA rápida >= lenta, umbral de entrada < umbral de salida).
+    """
+    grid = {**DEFAULT_GRID, **grid}
+    configs = pd.DataFrame(list(itertools.product(*(grid[name] for name in PARAM_NAMES))), columns=list(PARAM_NAMES))
+    valid = (configs['ema_fast'] < configs['ema_slow']) & (configs['entry_threshold'] >= configs['exit_threshold'])
+    configs = configs[valid].reset_index(drop=True)
+    configs.insert(0, 'config_id', [config_key(row) for row in configs.to_dict('records')])
+    return configs
+
+def config_key(params):
+    """ID estable de una configuración (sirve para reanudar desde el checkpoint)."""
+    payload = json.dumps({name: float(params[name]) for name in PARAM_NAMES}, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+def chunk_size_for(n_dates, n_tickers, budget_mb=None):
+    """
+    Cuántas configuraciones caben en un bloque sin pasar el presupuesto de memoria.
+    Cada configuración ocupa ~8 matrices float64 fecha x ticker (alpha, señales e internos del simulador).
+    """
+    budget_mb = budget_mb or Config.SWEEP_CHUNK_MB
+    per_config = n_dates * n_tickers * 8 * 8
+    return max(1, int(budget_mb * 1024 ** 2 // per_config))
+
+# WORKER: cada proceso abre el bundle por memory-map (page cache compartido, sin copias del parquet)
+
+def init_worker():
+    """Inicializador del pool: cada proceso abre el bundle por memory-map una sola vez."""
+    if Config.BACKTEST_ENGINE == "vectorbt":
+        import vectorbt  # noqa: F401  (se importa una vez por proceso, no por bloque)
+    _WORKER.clear()
+    _WORKER['bundle'] = load_market_bundle()
+    _WORKER['raw_close'] = open_feature_store("master", rebuild=False).frame('close')
+
+def _ema(span):
+    """EMA de un span dado sobre las barras reales de cada ticker (igual que src.tech.indicators)."""
+    key = ('ema', span)
+    if key not in _WORKER:
+        bundle = _WORKER['bundle']
+        if span == Config.SMA_FAST:
+            _WORKER[key] = bundle['ema_fast']
+        elif span == Config.SMA_SLOW:
+            _WORKER[key] = bundle['ema_slow']
+        else:
+            raw = _WORKER['raw_close']
+            _WORKER[key] = pd.DataFrame(kernels.ema(raw.to_numpy(), span), index=raw.index, columns=raw.columns).ffill()
+    return _WORKER[key]
+
+def _sentiment(window):
+    """Sentimiento suavizado con memoria de `window` días."""
+    key = ('sentiment', window)
+    if key not in _WORKER:
+        bundle = _WORKER['bundle']
+        if window == Config.SENTIMENT_SMOOTH_WINDOW:
+            _WORKER[key] = bundle['sentiment_smooth']
+        else:
+            _WORKER[key] = bundle['sentiment_avg'].fillna(0.0).rolling(window=window).mean().fillna(0.0)
+    return _WORKER[key]
+
+def alpha_frame(cfg, tickers):
+    """Alpha Score (fecha x ticker) de una configuración, sobre toda la historia."""
+    close = _WORKER['bundle']['close'][tickers]
+    tech_score = (_ema(cfg['ema_fast'])[tickers] - _ema(cfg['ema_slow'])[tickers]) / close
+    return tech_score + _sentiment(cfg['smooth_window'])[tickers] * cfg['impact']
+
+def simulate_chunk(configs, tickers, start=None, end=None):
+    """
+    Simula un bloque de configuraciones sobre `tickers` (y opcionalmente solo las fechas
+    [start, end]) en UNA llamada a from_signals, con columnas = configuración x ticker.
+    Los indicadores se calculan sobre toda la historia, así que recortar fechas no pierde calentamiento.
+    """
+    rows = slice(start, end)
+    close = _WORKER['bundle']['close'][tickers].loc[rows]
+    alpha = pd.concat({cfg['config_id']: alpha_frame(cfg, tickers).loc[rows] for cfg in configs},
+                      axis=1, names=['config_id', 'ticker'])
+    entry = np.repeat([cfg['entry_threshold'] for cfg in configs], len(tickers))
+    exit_ = np.repeat([cfg['exit_threshold'] for cfg in configs], len(tickers))
+
+    return from_signals(
+        close=pd.concat({cfg['config_id']: close for cfg in configs}, axis=1, names=['config_id', 'ticker']),
+        entries=alpha > entry,
+        exits=alpha < exit_,
+        init_cash=INIT_CASH,
+        fees=FEES,
+        freq='1D'
+    )
+
+def _cache_key(cfg, tickers, start, end):
+    """Llave de caché de un punto del grid para un universo y rango de fechas."""
+    if 'data_hash' not in _WORKER:
+        _WORKER['data_hash'] = dataset_hash(STORE_SOURCES["master"])
+    params = {
+        **{name: cfg[name] for name in PARAM_NAMES},
+        'tickers': list(tickers), 'start': start, 'end': end, 'init_cash': INIT_CASH, 'fees': FEES,
+    }
+    return result_key("alpha_sweep", params, _WORKER['data_hash'])
+
+def evaluate_chunk(configs, tickers, start=None, end=None):
+    """
+    Métricas promedio por configuración (Sharpe, retorno total, trades) de un bloque.
+    Los puntos del grid que ya están en la caché de backtests no se vuelven a simular.
+    """
+    cache = BacktestCache() if Config.BACKTEST_CACHE else None
+    keys = {cfg['config_id']: _cache_key(cfg, tickers, start, end) for cfg in configs} if cache else {}
+
+    per_config = {}
+    for config_id, key in keys.items():
+        hit = cache.get(key)
+        if hit is not None:
+            per_config[config_id] = hit['metrics']
+
+    todo = [cfg for cfg in configs if cfg['config_id'] not in per_config]
+    if todo:
+        pf = simulate_chunk(todo, tickers, start, end)
+        metrics = pd.DataFrame({
+            # Sin volatilidad (sin trades) el Sharpe es infinito: no debe ganar el ranking
+            'sharpe': pf.sharpe_ratio().replace([np.inf, -np.inf], np.nan),
+            'total_return': pf.total_return(),
+            'trades': pf.trades.count(),
+        })
+        for cfg in todo:
+            per_config[cfg['config_id']] = metrics.xs(cfg['config_id'], level='config_id')
+            if cache:
+                cache.put(keys[cfg['config_id']], {'metrics': per_config[cfg['config_id']]}, evict=False)
+        if cache:
+            cache.evict()
+
+    per_ticker = pd.concat(per_config, names=['config_id', 'ticker'])
+    return per_ticker.groupby(level='config_id').mean().reset_index()
+
+# CHECKPOINT: tabla de resultados que se reescribe tras cada bloque
+
+def load_checkpoint(path, data_version):
+    """Resultados ya calculados para esta versión de datos (los de otra versión se descartan)."""
+    if path is None or not path.exists():
+        return pd.DataFrame()
+    done = pd.read_parquet(path)
+    return done[done['data_version'] == data_version].reset_index(drop=True)
+
+def save_checkpoint(results, path):
+    tmp_path = path.with_name(path.name + ".tmp")
+    results.to_parquet(tmp_path, engine='fastparquet', compression='snappy')
+    tmp_path.replace(path)
+
+def rung_tickers(tickers, n_rungs, eta, seed=0):
+    """
+    Universo de cada ronda del successive halving: la ronda r usa 1/eta^(n_rungs-1-r) de los
+    tickers (muestra fija y anidada), la última usa todos. El Sharpe promedio sobre una muestra
+    de tickers es un estimador barato del Sharpe promedio del universo completo.
+    """
+    order = list(np.random.default_rng(seed).permutation(tickers))
+    sizes = [max(1, math.ceil(len(order) / eta ** (n_rungs - 1 - r))) for r in range(n_rungs)]
+    return [sorted(order[:n]) for n in sizes]
+
+def run_sweep(grid=None, workers=None, budget_mb=None, eta=None, rungs=None, checkpoint=None):
+    """
+    Barrido paralelo del grid con poda por successive halving:
+    en cada ronda se evalúan las configuraciones vivas sobre una muestra mayor de tickers
+    y solo sobrevive el mejor 1/eta (por Sharpe promedio). Los bloques de configuraciones
+    corren en un pool de procesos y cada bloque respeta `budget_mb` de memoria.
+    Los resultados se guardan tras cada bloque en `checkpoint`, así que una corrida
+    interrumpida retoma donde quedó.
+    """
+    workers = workers or Config.SWEEP_WORKERS
+    eta = eta or Config.SWEEP_ETA
+    rungs = rungs or Config.SWEEP_RUNGS
+    checkpoint = checkpoint or Config.DATA_PROCESSED / "sweep_results.parquet"
+
+    bundle = load_market_bundle()
+    if bundle is None:
+        logger.error("No encontré features_master.parquet.")
+        return None
+
+    configs = expand_grid(grid or {})
+    tickers = list(bundle['close'].columns)
+    n_dates = len(bundle['close'])
+    data_version = json.dumps(open_feature_store("master", rebuild=False).source_version)
+
+    # Con pocas configuraciones no vale la pena podar: una sola ronda con todo el universo
+    n_rungs = max(1, min(rungs, int(math.log(max(len(configs), 1), eta)) + 1))
+    universes = rung_tickers(tickers, n_rungs, eta)
+
+    results = load_checkpoint(checkpoint, data_version)
+    if len(results):
+        logger.info(f"Reanudando barrido: {len(results)} evaluaciones ya en {checkpoint.name}")
+
+    alive = configs
+    logger.info(f"Barrido: {len(configs)} configuraciones, {n_rungs} rondas, {workers} procesos")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        for r, universe in enumerate(universes):
+            done = results[(results['rung'] == r) & (results['n_tickers'] == len(universe))] if len(results) else results
+            done_ids = set(done['config_id']) if len(done) else set()
+            todo = alive[~alive['config_id'].isin(done_ids)].to_dict('records')
+
+            size = chunk_size_for(n_dates, len(universe), budget_mb)
+            chunks = [todo[i:i + size] for i in range(0, len(todo), size)]
+            logger.info(f"Ronda {r + 1}/{n_rungs}: {len(alive)} configuraciones vivas x {len(universe)} tickers "
+                        f"({len(todo)} pendientes en {len(chunks)} bloques de hasta {size})")
+
+            futures = [pool.submit(evaluate_chunk, chunk, universe) for chunk in chunks]
+            for future in as_completed(futures):
+                metrics = future.result().assign(rung=r, n_tickers=len(universe), data_version=data_version)
+                metrics = metrics.merge(configs, on='config_id')
+                results = pd.concat([results, metrics], ignore_index=True)
+                save_checkpoint(results, checkpoint)
+
+            # PODA: sobrevive el mejor 1/eta de esta ronda
+            scores = results[(results['rung'] == r) & (results['n_tickers'] == len(universe))
+                             & results['config_id'].isin(alive['config_id'])]
+            if r < n_rungs - 1:
+                keep = max(1, math.ceil(len(alive) / eta))
+                best = scores.sort_values('sharpe', ascending=False, na_position='last').head(keep)['config_id']
+                alive = alive[alive['config_id'].isin(best)]
+
+    final = results[(results['rung'] == n_rungs - 1) & (results['n_tickers'] == len(tickers))
+                    & results['config_id'].isin(alive['config_id'])]
+    return final.sort_values('sharpe', ascending=False, na_position='last').reset_index(drop=True)
+
+def parse_grid(values):
+    """Convierte ['impact=0,0.5,1', 'ema_fast=10,20'] en {'impact': [0, 0.5, 1], 'ema_fast': [10, 20]}."""
+    grid = {}
+    for item in values or []:
+        name, _, raw = item.partition('=')
+        if name not in PARAM_NAMES:
+            raise ValueError(f"Parámetro desconocido: {name}. Opciones: {PARAM_NAMES}")
+        cast = int if name in ('ema_fast', 'ema_slow', 'smooth_window') else float
+        grid[name] = [cast(v) for v in raw.split(',') if v]
+    return grid
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Barrido multi-parámetro del Alpha Score")
+    parser.add_argument("--grid", nargs="*", default=[],
+                        help="Valores por parámetro, p. ej. impact=0,0.5,1 ema_fast=10,20 smooth_window=3,7,14")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos del pool (Config.SWEEP_WORKERS)")
+    parser.add_argument("--budget-mb", type=int, default=None, help="Memoria máxima por bloque (Config.SWEEP_CHUNK_MB)")
+    parser.add_argument("--eta", type=int, default=None, help="Factor de poda del successive halving (Config.SWEEP_ETA)")
+    args = parser.parse_args()
+
+    top = run_sweep(parse_grid(args.grid), workers=args.workers, budget_mb=args.budget_mb, eta=args.eta)
+    if top is not None:
+        print("\n" + "="*60)
+        print(f"TOP 10 CONFIGURACIONES ({len(top)} evaluadas en el universo completo)")
+        print("="*60)
+        print(top[list(PARAM_NAMES) + ['sharpe', 'total_return', 'trades']].head(10).to_string(index=False))
@@ -1,7 +1,8 @@
-import vectorbt as vbt 
-import pandas as pd 
 import logging 
 from src.config import Config 
+from src.data.feature_store import open_feature_store
+from src.backtest.simulator import from_signals, clean_signals, portfolio_metrics
+from src.backtest.result_cache import cached_backtest
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)        
@@ -17,45 +18,57 @@ def run_trend_simulation():
         logger.error("No encontré el archivo de features. Ejecuta primero src.tech.indicators")
         return
 
-    logger.info("Cargando datos y preparando matrices...")
-    df = pd.read_parquet(input_path)
+    # Parámetros de la simulación (entran en la llave de la caché de resultados)
+    params = {"ema_fast": Config.SMA_FAST, "ema_slow": Config.SMA_SLOW, "init_cash": 10000, "fees": 0.001, "slippage": 0.001}
 
-    # Transformación a Formato 'Wide' (Requisito de VectorBT)
-    # VectorBT necesita que cada COLUMNA sea un Ticker y el ÍNDICE sea la Fecha.
-    # Usamos pivot() para transformar la tabla.
+    def simulate():
+        logger.info("Cargando datos y preparando matrices...")
+        store = open_feature_store("technical")
+
+        # Formato 'Wide' (Requisito de VectorBT)
+        # VectorBT necesita que cada COLUMNA sea un Ticker y el ÍNDICE sea la Fecha.
+        # El feature store ya guarda cada feature así (memory-map), sin pivot().
     
-    # Precios de Cierre
-    close_price = df.pivot(index='date', columns='ticker', values='close')
+        # Precios de Cierre
+        close_price = store.frame('close')
     
-    # Indicadores
-    ema_fast = df.pivot(index='date', columns='ticker', values='ema_fast')
-    ema_slow = df.pivot(index='date', columns='ticker', values='ema_slow')
+        # Indicadores
+        ema_fast = store.frame('ema_fast')
+        ema_slow = store.frame('ema_slow')
 
-    # Definir la Lógica de la Estrategia
-    # Regla de Entrada: EMA Rápida > EMA Lenta (Cruce Dorado)
-    entries = ema_fast > ema_slow
+        # Definir la Lógica de la Estrategia
+        # Regla de Entrada: EMA Rápida > EMA Lenta (Cruce Dorado)
+        entries = ema_fast > ema_slow
     
-    # Regla de Salida: EMA Rápida < EMA Lenta (Cruce de la Muerte)
-    exits = ema_fast < ema_slow
+        # Regla de Salida: EMA Rápida < EMA Lenta (Cruce de la Muerte)
+        exits = ema_fast < ema_slow
+
+        # Limpieza: Eliminar señales en zonas donde no hay datos (al principio de la historia)
+        entries = clean_signals(entries)
+        exits = clean_signals(exits)
 
-    # Limpieza: Eliminar señales en zonas donde no hay datos (al principio de la historia)
-    entries = entries.vbt.signals.clean()
-    exits = exits.vbt.signals.clean()
+        logger.info(f"Ejecutando simulación para: {close_price.columns.tolist()}")
 
-    logger.info(f"Ejecutando simulación para: {close_price.columns.tolist()}")
+        # El Motor de Backtesting (Portfolio): simulador nativo o vectorbt según Config.BACKTEST_ENGINE
+        # Simulamos con $10,000 iniciales, fees de 0.1% (común en crypto/brokers)
+        # freq='1D' indica que los datos son diarios para calcular métricas anualizadas correctamente
+        portfolio = from_signals(
+            close=close_price,
+            entries=entries,
+            exits=exits,
+            init_cash=params["init_cash"],
+            fees=params["fees"],          # 0.1% comisión por operación
+            slippage=params["slippage"],  # 0.1% deslizamiento (precio real vs teórico)
+            freq='1D'        # Frecuencia diaria
+        )
+        return {
+            'stats': portfolio.stats(),
+            'metrics': portfolio_metrics(portfolio),
+            'equity': portfolio.value(),
+        }
 
-    # El Motor de Backtesting (Portfolio)
-    # Simulamos con $10,000 iniciales, fees de 0.1% (común en crypto/brokers)
-    # freq='1D' indica que los datos son diarios para calcular métricas anualizadas correctamente
-    portfolio = vbt.Portfolio.from_signals(
-        close=close_price,
-        entries=entries,
-        exits=exits,
-        init_cash=10000,
-        fees=0.001,      # 0.1% comisión por operación
-        slippage=0.001,  # 0.1% deslizamiento (precio real vs teórico)
-        freq='1D'        # Frecuencia diaria
-    )
+    # Si el dataset y los parámetros no cambiaron, el resultado sale de la caché sin simular
+    result = cached_backtest("trend_ema_cross", params, input_path, simulate)
 
     # Reporte de Resultados
     print("\n" + "="*50)
@@ -63,13 +76,13 @@ def run_trend_simulation():
     print("="*50)
     
     # Estadísticas Totales (Promedio de todos los activos)
-    print(portfolio.stats())
+    print(result['stats'])
 
     print("\n" + "="*50)
     print("RENDIMIENTO POR ACTIVO")
     print("="*50)
     # Rendimiento individual
-    print(portfolio.total_return() * 100)
+    print(result['metrics']['total_return'] * 100)
 
     # Guardar métricas (Opcional para futuro dashboard)
     # Por ahora solo lo vemos en consola.
@@ -0,0 +1,145 @@
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from src.config import Config
+from src.data.market_matrix import load_market_bundle
+from src.backtest.sweep import (
+    INIT_CASH, PARAM_NAMES, expand_grid, parse_grid, chunk_size_for,
+    init_worker, evaluate_chunk, simulate_chunk,
+)
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def make_folds(dates, train_days=None, test_days=None, anchored=False):
+    """
+    Ventanas walk-forward sobre el índice de fechas:
+    entrenar en [train_start, train_end] y evaluar en el período siguiente (test_days).
+    `anchored=True` mantiene el inicio del entrenamiento fijo (ventana creciente);
+    si no, la ventana de entrenamiento rueda con el mismo largo.
+    """
+    train_days = pd.Timedelta(days=train_days or Config.WALK_FORWARD_TRAIN_DAYS)
+    test_days = pd.Timedelta(days=test_days or Config.WALK_FORWARD_TEST_DAYS)
+    first, last = dates[0], dates[-1]
+
+    folds = []
+    test_start = first + train_days
+    while test_start <= last:
+        test_end = min(test_start + test_days - pd.Timedelta(days=1), last)
+        train_start = first if anchored else test_start - train_days
+        folds.append({
+            'fold': len(folds),
+            'train_start': train_start, 'train_end': test_start - pd.Timedelta(days=1),
+            'test_start': test_start, 'test_end': test_end,
+        })
+        test_start = test_end + pd.Timedelta(days=1)
+    return folds
+
+def run_fold(fold, configs, tickers, budget_mb=None):
+    """
+    Un fold: elige la mejor configuración por Sharpe promedio en entrenamiento y la
+    simula fuera de muestra. Devuelve (métricas del fold, retornos diarios del portafolio de prueba).
+    """
+    close = load_market_bundle()['close']
+    n_train = len(close.loc[fold['train_start']:fold['train_end']])
+    size = chunk_size_for(n_train, len(tickers), budget_mb)
+
+    # ENTRENAMIENTO: todas las configuraciones, en bloques acotados en memoria
+    train = pd.concat([
+        evaluate_chunk(configs[i:i + size], tickers, fold['train_start'], fold['train_end'])
+        for i in range(0, len(configs), size)
+    ], ignore_index=True)
+    best_id = train.sort_values('sharpe', ascending=False, na_position='last')['config_id'].iloc[0]
+    best = next(cfg for cfg in configs if cfg['config_id'] == best_id)
+
+    # PRUEBA (fuera de muestra): solo la ganadora
+    pf = simulate_chunk([best], tickers, fold['test_start'], fold['test_end'])
+    # Portafolio equiponderado: cada ticker arranca con INIT_CASH
+    value = pf.value().sum(axis=1)
+    returns = value.pct_change().fillna(value.iloc[0] / (INIT_CASH * len(tickers)) - 1)
+
+    metrics = {
+        **fold,
+        **{name: best[name] for name in PARAM_NAMES},
+        'train_sharpe': train.loc[train['config_id'] == best_id, 'sharpe'].iloc[0],
+        'test_sharpe': pf.sharpe_ratio().replace([np.inf, -np.inf], np.nan).mean(),
+        'test_return': pf.total_return().mean(),
+        'test_trades': pf.trades.count().sum(),
+    }
+    return metrics, returns
+
+def _run_fold_task(args):
+    return run_fold(*args)
+
+def equity_metrics(returns):
+    """Métricas de la curva fuera de muestra cosida (misma anualización que vbt con freq='1D')."""
+    equity = (1 + returns).cumprod()
+    drawdown = equity / equity.cummax() - 1
+    std = returns.std()
+    return {
+        'total_return': equity.iloc[-1] - 1,
+        'sharpe': returns.mean() / std * np.sqrt(365) if std > 0 else np.nan,
+        'max_drawdown': drawdown.min(),
+        'days': len(returns),
+    }
+
+def run_walk_forward(grid=None, train_days=None, test_days=None, anchored=False, workers=None, budget_mb=None, save=True):
+    """
+    Optimización walk-forward: los folds corren en paralelo (un proceso por fold, todos leyendo
+    el mismo bundle por memory-map) y el resultado es una tabla por fold y la curva de equity
+    fuera de muestra cosida de todos los folds.
+    """
+    bundle = load_market_bundle()
+    if bundle is None:
+        logger.error("No encontré features_master.parquet.")
+        return None, None
+
+    configs = expand_grid(grid or {}).to_dict('records')
+    tickers = list(bundle['close'].columns)
+    folds = make_folds(bundle['close'].index, train_days, test_days, anchored)
+    if not folds:
+        logger.error("La historia es más corta que la ventana de entrenamiento.")
+        return None, None
+
+    workers = workers or Config.SWEEP_WORKERS
+    logger.info(f"Walk-forward {'anclado' if anchored else 'rodante'}: {len(folds)} folds x "
+                f"{len(configs)} configuraciones x {len(tickers)} tickers ({workers} procesos)")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        outputs = list(pool.map(_run_fold_task, [(fold, configs, tickers, budget_mb) for fold in folds]))
+
+    folds_table = pd.DataFrame([metrics for metrics, _ in outputs])
+    returns = pd.concat([r for _, r in outputs]).sort_index()
+    equity = pd.DataFrame({'returns': returns, 'equity': (1 + returns).cumprod()})
+
+    if save:
+        folds_table.to_parquet(Config.DATA_PROCESSED / "walk_forward_folds.parquet", engine='fastparquet', compression='snappy')
+        equity.to_parquet(Config.DATA_PROCESSED / "walk_forward_equity.parquet", engine='fastparquet', compression='snappy')
+
+    return folds_table, equity
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward del Alpha Score (entrenar -> evaluar fuera de muestra)")
+    parser.add_argument("--grid", nargs="*", default=[], help="Igual que src.backtest.sweep, p. ej. impact=0,0.5,1")
+    parser.add_argument("--train-days", type=int, default=None, help="Días de entrenamiento (Config.WALK_FORWARD_TRAIN_DAYS)")
+    parser.add_argument("--test-days", type=int, default=None, help="Días de prueba por fold (Config.WALK_FORWARD_TEST_DAYS)")
+    parser.add_argument("--anchored", action="store_true", help="Ventana de entrenamiento creciente desde el inicio")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos del pool (Config.SWEEP_WORKERS)")
+    args = parser.parse_args()
+
+    folds_table, equity = run_walk_forward(parse_grid(args.grid), args.train_days, args.test_days,
+                                           args.anchored, args.workers)
+    if folds_table is not None:
+        print("\n" + "="*60)
+        print("WALK-FORWARD: RESULTADOS POR FOLD")
+        print("="*60)
+        print(folds_table[['fold', 'test_start', 'test_end', 'impact', 'train_sharpe', 'test_sharpe', 'test_return']].to_string(index=False))
+
+        print("\n" + "="*60)
+        print("FUERA DE MUESTRA (curva cosida)")
+        print("="*60)
+        for name, value in equity_metrics(equity['returns']).items():
+            print(f"{name:<15} {value:.4f}" if isinstance(value, float) else f"{name:<15} {value}")
@@ -31,6 +31,11 @@ class Config:
     DATA_PROCESSED = DATA_DIR / "processed"
     MODELS_DIR = BASE_DIR / "models"
     LOGS_DIR = BASE_DIR / "logs"
+    FEATURE_STORE_DIR = DATA_PROCESSED / "feature_store"
+    # prices_5y / features_*: directorio particionado por año con row groups por ticker (filtros empujados al lector)
+    PARQUET_PARTITIONED = True
+    FEATURE_STORE_DTYPE = "float64"  # "float32" reduce a la mitad disco y memoria
+    FEATURE_STORE_GRACE_SECONDS = 300  # Las versiones reemplazadas se borran pasado este tiempo
 
     # Universos y Estrategia
     # DICCIONARIO DE ACTIVOS ORGANIZADOS POR SECTOR
@@ -75,9 +80,41 @@ class Config:
     SMA_SLOW = 50 
     SMA_VERY_SLOW = 200
     VOL_TARGET = 0.10 
+    SENTIMENT_SMOOTH_WINDOW = 7  # Memoria del sentimiento (días) para el Alpha Score
+    IMPACT_FACTOR = 0.7          # Peso del sentimiento en el Alpha Score (dashboard y backtests)
+    # Simulador de backtests: "native" (src.backtest.simulator, sin dependencias) o "vectorbt"
+    BACKTEST_ENGINE = "native"
+    # Caché de resultados de backtests (llave = hash del dataset + estrategia + parámetros)
+    BACKTEST_CACHE = True
+    BACKTEST_CACHE_DIR = DATA_PROCESSED / "backtest_cache"
+    BACKTEST_CACHE_MAX_ENTRIES = 5000
+    # Barrido de parámetros (python -m src.backtest.sweep)
+    SWEEP_WORKERS = 4      # Procesos del pool
+    SWEEP_CHUNK_MB = 512   # Memoria máxima por bloque de configuraciones
+    SWEEP_ETA = 3          # Successive halving: sobrevive 1/ETA de las configuraciones por ronda
+    SWEEP_RUNGS = 3        # Máximo de rondas de poda
+    # Walk-forward (python -m src.backtest.walk_forward): días de entrenamiento / prueba por fold
+    WALK_FORWARD_TRAIN_DAYS = 730
+    WALK_FORWARD_TEST_DAYS = 90
+    # Indicadores técnicos: solo calcular barras nuevas (python -m src.tech.indicators --full para reconstruir)
+    TECH_INCREMENTAL = True
+    # "wide": matrices NumPy para todos los tickers a la vez | "groupby": un DataFrame por ticker
+    TECH_ENGINE = "wide"
+    # Suavizado de RSI/ATR: "sma" (media móvil simple, el histórico) o "wilder"
+    INDICATOR_SMOOTHING = "sma"
     
     # --- INTELIGENCIA ARTIFICIAL & API KEYS ---
     FINBERT_MODEL = "ProsusAI/finbert"
+    FINBERT_BATCH_SIZE = 32    # Titulares por forward pass (sube si tienes GPU)
+    FINBERT_MAX_LENGTH = 512   # Máximo de tokens por texto (límite de BERT)
+    # Noticias en streaming (limpieza -> FinBERT -> agregado diario por lotes, memoria acotada)
+    NEWS_STREAMING = os.environ.get("NEWS_STREAMING", "0") == "1"
+    NEWS_STREAM_BATCH_SIZE = 4096   # Filas por lote (y por row group de news_raw)
+    # Agregado diario incremental: estado por (date, ticker) que solo se actualiza con noticias nuevas
+    SENTIMENT_INCREMENTAL = True
+    SENTIMENT_RECENCY_HALFLIFE_HOURS = 6   # Vida media del peso por recencia dentro del día
+    SENTIMENT_CACHE_PATH = DATA_PROCESSED / "sentiment_cache.db"
+    SENTIMENT_CACHE_MAX_ROWS = 1_000_000
     
     # Aquí leemos la variable cargada
     FINNHUB_KEY = os.getenv("FINNHUB_API_KEY")
@@ -88,6 +125,48 @@ class Config:
     
     NEWS_HISTORY_DAYS = 365
     NEWS_TOP_N = 50
+
+    # Ingesta asíncrona (src.data.ingest_async): todos los tickers en paralelo con límite de tasa por proveedor
+    INGEST_ASYNC = os.environ.get("INGEST_ASYNC", "1") == "1"
+    # Solo bajar lo posterior a la última vela / noticia guardada por ticker (--full para reconstruir)
+    INGEST_INCREMENTAL = True
+    INGEST_CONCURRENCY = 16        # Conexiones simultáneas por proveedor (tamaño del pool)
+    INGEST_RETRIES = 4             # Reintentos ante 429 / 5xx / errores de red
+    INGEST_BACKOFF = 0.5           # Espera base (s) del backoff exponencial
+    INGEST_TIMEOUT = 30            # Timeout total por petición (s)
+    INGEST_PRICE_PERIOD = "5y"
+    INGEST_NEWS_WINDOW_DAYS = 30   # Finnhub recorta respuestas largas: pedimos por ventanas
+    YAHOO_BASE_URL = os.environ.get("YAHOO_BASE_URL", "https://query2.finance.yahoo.com")
+    YAHOO_RATE_PER_SEC = 10
+    FINNHUB_BASE_URL = os.environ.get("FINNHUB_BASE_URL", "https://finnhub.io/api/v1")
+    FINNHUB_RATE_PER_SEC = 1       # Plan gratuito: 60 llamadas por minuto
+    
+    # Pipeline: "subprocess" (un intérprete por etapa) o "inprocess" (un solo proceso, DataFrames en memoria)
+    # "parallel" ejecuta el grafo de etapas con ramas independientes a la vez
+    PIPELINE_MODE = os.environ.get("PIPELINE_MODE", "subprocess")
+    PIPELINE_WORKERS = 3
+
+    # Servidor web: base de usuarios y señales compartidas entre workers
+    DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///site.db")
+    DB_POOL_SIZE = 8
+    DB_MAX_OVERFLOW = 8
+    DB_BUSY_TIMEOUT = 30            # Segundos esperando un lock de SQLite antes de fallar
+    SIGNALS_MMAP = True             # Leer latest_signals.npy con mmap en vez de parsear el JSON en cada worker
+
+    # API JSON del servidor (/api/signals)
+    API_TOKEN = os.environ.get("API_TOKEN")   # Sin sesión iniciada, la API exige el header X-API-Key con este valor
+    API_GZIP_MIN_BYTES = 1024                 # Respuestas más chicas no se comprimen
+    API_RESPONSE_CACHE_SIZE = 256             # Respuestas serializadas por versión de señales
+    # Canal SSE (/api/stream) alimentado por data/processed/signal_events.jsonl
+    SSE_POLL_SECONDS = 1.0          # Cada cuánto revisa el log de eventos cada proceso del servidor
+    SSE_HEARTBEAT_SECONDS = 15      # Ping para mantener viva la conexión
+    SSE_RETRY_MS = 5000             # Espera sugerida al navegador antes de reconectar
+    SSE_QUEUE_SIZE = 16             # Eventos pendientes por cliente
+    SSE_EVENT_LOG_MAX_BYTES = 1_000_000
+    # Historial de señales para gráficas (/api/history/<ticker>)
+    SIGNAL_HISTORY_PATH = DATA_PROCESSED / "signal_history.db"
+    HISTORY_DEFAULT_POINTS = 500    # Puntos por serie si el cliente no pide otro número
+    HISTORY_MAX_POINTS = 5000       # Tope de puntos por respuesta
     
     DEVICE = "cuda" if os.environ.get("CUDA_VISIBLE_DEVICES") else "cpu"
 
@@ -0,0 +1,219 @@
+import os
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+from fastparquet import writer
+from src.config import Config
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# LAYOUT PARTICIONADO
+# Cada dataset (prices_5y, features_technical, features_master...) se guarda como un directorio
+# hive particionado por año (year=2024/...). Dentro de cada partición las filas van ordenadas
+# por (ticker, fecha) y cada ticker es su propio row group, así que las estadísticas min/max
+# de 'ticker' y 'date' permiten saltar todo lo que no pide la consulta.
+# No particionamos por ticker porque símbolos como "EURUSD=X" o "CL=F" chocan con el formato key=value.
+PARTITION_COL = 'year'
+
+def _row_group_offsets(df):
+    """Inicio de cada bloque (año, ticker) en un DataFrame ya ordenado."""
+    new_block = df[PARTITION_COL].ne(df[PARTITION_COL].shift()) | df['ticker'].ne(df['ticker'].shift())
+    return np.flatnonzero(new_block.to_numpy()).tolist()
+
+def _tmp_path(path):
+    """Ruta temporal junto a `path` (mismo filesystem, para que el rename final sea atómico)."""
+    tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+    _remove(tmp_path)
+    return tmp_path
+
+def _remove(path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+def _swap_in(tmp_path, path):
+    """
+    Reemplaza `path` por `tmp_path`, ya escrito completo. Un archivo se reemplaza con un solo
+    os.replace; un directorio se aparta primero y se borra recién cuando el nuevo ya está en su lugar.
+    """
+    if path.exists() and (path.is_dir() or tmp_path.is_dir()):
+        old_path = path.with_name(f"{path.name}.old{os.getpid()}")
+        _remove(old_path)
+        os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        _remove(old_path)
+    else:
+        os.replace(tmp_path, path)
+
+def _with_partition(df):
+    data = df.assign(**{PARTITION_COL: df['date'].dt.year})
+    return data.sort_values([PARTITION_COL, 'ticker', 'date'], kind='mergesort').reset_index(drop=True)
+
+def _write_partitions(data, path, append=False):
+    data.to_parquet(
+        path, engine='fastparquet', compression='snappy', index=False,
+        partition_on=[PARTITION_COL], file_scheme='hive',
+        row_group_offsets=_row_group_offsets(data), stats=True,
+        append=append
+    )
+
+def partition_years(path):
+    """Años con partición en un dataset particionado."""
+    return {int(p.name.split('=', 1)[1]) for p in path.glob(f"{PARTITION_COL}=*") if p.is_dir()}
+
+def write_dataset(df, path, append=False):
+    """
+    Guarda un dataset largo (date, ticker, ...) en `path`.
+    Con Config.PARQUET_PARTITIONED escribe el layout particionado; `append=True`
+    agrega archivos nuevos a las particiones en lugar de reescribir todo el dataset.
+    Una reescritura completa se escribe aparte y reemplaza al dataset viejo con un rename:
+    si el proceso muere a medias, el dataset anterior queda intacto.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if not Config.PARQUET_PARTITIONED:
+        if append and path.exists():
+            df.to_parquet(path, engine='fastparquet', compression='snappy', append=True)
+            return
+        tmp_path = _tmp_path(path)
+        df.to_parquet(tmp_path, engine='fastparquet', compression='snappy')
+        _swap_in(tmp_path, path)
+        return
+
+    if append and path.is_file():
+        # Migración: el archivo monolítico viejo se reescribe una vez como dataset particionado
+        logger.info(f"Migrando {path.name} a layout particionado...")
+        df = pd.concat([pd.read_parquet(path), df], ignore_index=True)
+        append = False
+
+    data = _with_partition(df)
+    if append and path.exists():
+        _write_partitions(data, path, append=True)
+        return
+
+    tmp_path = _tmp_path(path)
+    _write_partitions(data, tmp_path)
+    _swap_in(tmp_path, path)
+
+def read_dataset(path, columns=None, tickers=None, start=None, end=None):
+    """
+    Lee un dataset (archivo único o directorio particionado) empujando los filtros al lector:
+    las particiones de años fuera de rango ni se abren y los row groups se descartan por
+    sus estadísticas de ticker/fecha. Al final se aplica el filtro exacto por fila.
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    partitioned = path.is_dir()
+
+    filters = []
+    if tickers is not None:
+        filters.append(('ticker', 'in', list(tickers)))
+    if start is not None:
+        filters.append(('date', '>=', start))
+        if partitioned:
+            filters.append((PARTITION_COL, '>=', start.year))
+    if end is not None:
+        filters.append(('date', '<=', end))
+        if partitioned:
+            filters.append((PARTITION_COL, '<=', end.year))
+
+    read_columns = None
+    if columns is not None:
+        # Las columnas que usa el filtro exacto se leen aunque no se pidan
+        extra = (['ticker'] if tickers is not None else []) + (['date'] if start is not None or end is not None else [])
+        read_columns = list(dict.fromkeys(list(columns) + extra))
+
+    df = pd.read_parquet(path, engine='fastparquet', columns=read_columns, filters=filters or None)
+
+    # Filtro exacto (fastparquet filtra por row group completo)
+    mask = np.ones(len(df), dtype=bool)
+    if tickers is not None:
+        mask &= df['ticker'].isin(list(tickers)).to_numpy()
+    if start is not None:
+        mask &= (df['date'] >= start).to_numpy()
+    if end is not None:
+        mask &= (df['date'] <= end).to_numpy()
+    if not mask.all():
+        df = df[mask]
+
+    if partitioned and PARTITION_COL in df.columns and (columns is None or PARTITION_COL not in columns):
+        df = df.drop(columns=PARTITION_COL)
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True) if partitioned else df
+
+def dataset_tickers(path):
+    """Tickers presentes en un dataset (solo se lee la columna 'ticker')."""
+    return read_dataset(path, columns=['ticker'])['ticker'].unique().tolist()
+
+def _merge_rows(df, keys, min_date):
+    df = df.drop_duplicates(subset=list(keys), keep='last')
+    if min_date is not None:
+        df = df[df['date'] >= min_date]
+    return df.sort_values(['ticker', 'date'], kind='mergesort').reset_index(drop=True)
+
+def upsert_dataset(df, path, keys=('ticker', 'date'), min_date=None):
+    """
+    Mezcla filas nuevas en un dataset existente: las filas con la misma llave se reemplazan
+    por la versión nueva (p. ej. la vela del día que se descargó a medio día).
+    `min_date` recorta la historia más vieja que la ventana del dataset.
+
+    En el layout particionado solo se reescriben los años que toca `df` (más el del corte
+    `min_date` si le quedan filas viejas); los demás archivos pasan al dataset nuevo con un
+    hard link, sin copiarse, y los años anteriores al corte se descartan. El dataset nuevo se
+    arma en un directorio temporal que reemplaza al viejo con un rename.
+    Devuelve las filas de las particiones reescritas (el dataset completo si no es particionado).
+    """
+    min_date = pd.Timestamp(min_date) if min_date is not None else None
+
+    if not (Config.PARQUET_PARTITIONED and path.is_dir()):
+        # Archivo único, primer guardado o migración: se reescribe completo
+        if path.exists():
+            df = pd.concat([read_dataset(path), df], ignore_index=True)
+        df = _merge_rows(df, keys, min_date)
+        write_dataset(df, path)
+        return df
+
+    existing_years = partition_years(path)
+    years = set(df['date'].dt.year.unique().tolist())
+    if min_date is not None and min_date.year in existing_years:
+        stale = read_dataset(path, columns=['date'], start=pd.Timestamp(min_date.year, 1, 1),
+                             end=min_date - pd.Timedelta(days=1))
+        if len(stale):
+            years.add(min_date.year)
+    rewrite = sorted(years & existing_years)
+
+    if rewrite:
+        current = pd.read_parquet(path, engine='fastparquet', filters=[(PARTITION_COL, 'in', rewrite)])
+        current = current[current[PARTITION_COL].astype(int).isin(rewrite)].drop(columns=PARTITION_COL)
+        df = pd.concat([current, df], ignore_index=True)
+    merged = _merge_rows(df, keys, min_date)
+
+    tmp_path = _tmp_path(path)
+    if len(merged):
+        _write_partitions(_with_partition(merged), tmp_path)
+    kept = [y for y in existing_years - years if min_date is None or y >= min_date.year]
+    for year in kept:
+        part_dir = f"{PARTITION_COL}={year}"
+        (tmp_path / part_dir).mkdir(parents=True)
+        for f in (path / part_dir).glob("*.parquet"):
+            try:
+                os.link(f, tmp_path / part_dir / f.name)
+            except OSError:
+                shutil.copy2(f, tmp_path / part_dir / f.name)
+
+    files = sorted(str(f) for f in tmp_path.glob(f"{PARTITION_COL}=*/*.parquet"))
+    if not files:
+        _remove(tmp_path)
+        write_dataset(merged, path)
+        return merged
+    # _metadata nuevo que cubre los archivos reescritos y los enlazados
+    writer.merge(files)
+    _swap_in(tmp_path, path)
+    logger.info(f"{path.name}: particiones reescritas {sorted(years)}, {len(kept)} sin cambios"
+                + (f", recortado antes de {min_date.date()}" if min_date is not None else ""))
+    return merged
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+from src.config import Config
+from src.data.datasets import read_dataset
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Datasets largos (date, ticker, features...) que exponemos como matrices fecha x ticker
+STORE_SOURCES = {
+    "master": Config.DATA_PROCESSED / "features_master.parquet",
+    "technical": Config.DATA_PROCESSED / "features_technical.parquet",
+}
+
+def source_version(path):
+    """
+    Versión barata de un dataset: (mtime_ns, tamaño). Sirve para un archivo o para
+    un directorio de parquet particionado (se toma el archivo más reciente y el total).
+    """
+    files = [path] if path.is_file() else [f for f in path.rglob("*") if f.is_file()]
+    if not files:
+        return None
+    stats = [f.stat() for f in files]
+    return [max(st.st_mtime_ns for st in stats), sum(st.st_size for st in stats)]
+
+def current_version_dir(path):
+    """
+    Directorio de la versión publicada de un store (lo que dice CURRENT), o None si no hay.
+    Un store escrito con el formato anterior (manifest.json en la raíz) se sigue leyendo en su lugar.
+    """
+    try:
+        name = (path / "CURRENT").read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        return path if (path / "manifest.json").exists() else None
+    return path / name
+
+class FeatureStore:
+    """
+    Almacén columnar de features: una matriz fecha x ticker por feature en un .npy
+    que se abre con memory-map. Todos los procesos que lo leen comparten el page cache
+    del sistema operativo en lugar de tener cada uno su copia del parquet.
+
+    Estructura en disco:
+        CURRENT                   -> nombre del subdirectorio de la versión publicada
+        <versión>/manifest.json   -> tickers, features, dtype y versión del dataset de origen
+        <versión>/dates.npy       -> índice de fechas compartido (datetime64[ns], ordenado)
+        <versión>/<feature>.npy   -> matriz [fecha x ticker]
+
+    Al abrirlo se fija una versión y se mapean todas sus matrices (mapear no lee datos),
+    así que un store abierto nunca mezcla archivos de dos publicaciones.
+    """
+
+    def __init__(self, path):
+        self.root = path
+        while True:
+            self.path = current_version_dir(path)
+            if self.path is None:
+                raise FileNotFoundError(f"No hay una versión publicada en {path}")
+            try:
+                self._open()
+                return
+            except FileNotFoundError:
+                # Se publicó otra versión (y se borró esta) entre leer CURRENT y abrirla: reintentamos
+                if current_version_dir(path) == self.path:
+                    raise
+
+    def _open(self):
+        with open(self.path / "manifest.json", 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+        self.dates = np.load(self.path / "dates.npy")
+        self.tickers = self.manifest["tickers"]
+        self.features = self.manifest["features"]
+        self._ticker_pos = {t: i for i, t in enumerate(self.tickers)}
+        self._matrices = {name: np.load(self.path / f"{name}.npy", mmap_mode='r') for name in self.features}
+
+    @property
+    def source_version(self):
+        return self.manifest.get("source_version")
+
+    def _load(self, name):
+        if name not in self._matrices:
+            raise KeyError(f"Feature '{name}' no existe en {self.path}. Disponibles: {self.features}")
+        return self._matrices[name]
+
+    def _rows(self, start=None, end=None):
+        lo = 0 if start is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start)), side='left')
+        hi = len(self.dates) if end is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end)), side='right')
+        return slice(lo, hi)
+
+    def _cols(self, tickers=None):
+        if tickers is None:
+            return slice(None)
+        pos = [self._ticker_pos[t] for t in tickers]
+        # Un bloque contiguo de tickers sigue siendo una vista; una lista arbitraria copia solo esas columnas
+        if pos and pos == list(range(pos[0], pos[-1] + 1)):
+            return slice(pos[0], pos[-1] + 1)
+        return pos
+
+    def matrix(self, name, tickers=None, start=None, end=None):
+        """
+        Matriz [fecha x ticker] de una feature. Sin `tickers` (o con un bloque contiguo)
+        devuelve una vista sin copia sobre el archivo mapeado en memoria.
+        """
+        return self._load(name)[self._rows(start, end), self._cols(tickers)]
+
+    def frame(self, name, tickers=None, start=None, end=None):
+        """Igual que matrix() pero envuelto en un DataFrame (índice=date, columnas=ticker) como df.pivot."""
+        rows, cols = self._rows(start, end), self._cols(tickers)
+        columns = self.tickers[cols] if isinstance(cols, slice) else [self.tickers[i] for i in cols]
+        return pd.DataFrame(
+            self._load(name)[rows, cols],
+            index=pd.DatetimeIndex(self.dates[rows], name='date'),
+            columns=pd.Index(columns, name='ticker'),
+            copy=False
+        )
+
+def load_store(path):
+    """FeatureStore publicado en `path`, o None si todavía no hay ninguna versión."""
+    try:
+        return FeatureStore(path)
+    except FileNotFoundError:
+        return None
+
+def _prune_versions(path, keep):
+    """
+    Borra las versiones viejas de un store. Se respetan la publicada y las tocadas hace menos de
+    FEATURE_STORE_GRACE_SECONDS: un lector que acaba de leer CURRENT o un escritor que todavía
+    no publica siguen encontrando su directorio. (Los archivos ya mapeados sobreviven al borrado.)
+    """
+    cutoff = time.time() - Config.FEATURE_STORE_GRACE_SECONDS
+    for entry in path.iterdir():
+        if entry.is_dir() and entry.name != keep and entry.name.startswith("v") and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry, ignore_errors=True)
+    # Formato anterior (archivos sueltos en la raíz): ya no los lee nadie que abra el store
+    if (path / "manifest.json").exists():
+        for entry in path.iterdir():
+            if entry.is_file() and entry.suffix in (".npy", ".json"):
+                entry.unlink(missing_ok=True)
+
+def write_matrices(path, dates, tickers, matrices, version=None):
+    """
+    Escribe y publica una versión nueva de un FeatureStore a partir de matrices [fecha x ticker]
+    ya alineadas. Cada publicación va a su propio subdirectorio y se activa reemplazando CURRENT
+    con os.replace: en todo momento hay una versión completa publicada, la vieja o la nueva.
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    # Nombres por proceso: varios workers pueden publicar la misma versión a la vez (gana la última)
+    version_name = f"v{time.time_ns()}-{os.getpid()}"
+    tmp_path = path / f"{version_name}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir()
+
+    np.save(tmp_path / "dates.npy", np.asarray(dates, dtype='datetime64[ns]'))
+    for name, m in matrices.items():
+        np.save(tmp_path / f"{name}.npy", m)
+
+    manifest = {
+        "tickers": [str(t) for t in tickers],
+        "features": list(matrices),
+        "dtype": next(iter(matrices.values())).dtype.name if matrices else None,
+        "source_version": version,
+    }
+    with open(tmp_path / "manifest.json", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Publicación: el directorio completo toma su nombre final y luego CURRENT apunta a él
+    tmp_path.rename(path / version_name)
+    pointer = path / f"CURRENT.{version_name}.tmp"
+    pointer.write_text(version_name, encoding='utf-8')
+    os.replace(pointer, path / "CURRENT")
+    _prune_versions(path, keep=version_name)
+
+    logger.info(f"Feature store listo: {path} ({len(dates)} fechas x {len(tickers)} tickers, {len(matrices)} features)")
+    return FeatureStore(path)
+
+def build_feature_store(df, path, version=None, dtype=None):
+    """
+    Convierte un DataFrame largo (date, ticker, features...) en un FeatureStore.
+    Se pivotea UNA sola vez: cada fila cae en su celda [fecha, ticker] por índice directo.
+    """
+    dtype = np.dtype(dtype or Config.FEATURE_STORE_DTYPE)
+    date_codes, dates = pd.factorize(df['date'], sort=True)
+    ticker_codes, tickers = pd.factorize(df['ticker'], sort=True)
+    features = [c for c in df.columns if c not in ('date', 'ticker') and pd.api.types.is_numeric_dtype(df[c])]
+
+    matrices = {}
+    for name in features:
+        m = np.full((len(dates), len(tickers)), np.nan, dtype=dtype)
+        m[date_codes, ticker_codes] = df[name].to_numpy(dtype=dtype, na_value=np.nan)
+        matrices[name] = m
+
+    return write_matrices(path, dates, tickers, matrices, version=version)
+
+def open_feature_store(name, rebuild=True):
+    """
+    Abre el store `name` ("master" o "technical"). Si no existe o quedó viejo respecto
+    a su parquet de origen, lo reconstruye (una vez) a partir del parquet.
+    Devuelve None si tampoco existe el parquet de origen.
+    """
+    source = STORE_SOURCES[name]
+    path = Config.FEATURE_STORE_DIR / name
+    store = load_store(path)
+
+    if not source.exists():
+        return store
+
+    version = source_version(source)
+    if store is None or store.source_version != version:
+        if not rebuild:
+            return store
+        logger.info(f"Construyendo feature store '{name}' desde {source.name}...")
+        store = build_feature_store(read_dataset(source), path, version=version)
+    return store
+
+def build_feature_stores():
+    """Etapa del pipeline: (re)construye los stores cuyo parquet de origen cambió."""
+    Config.FEATURE_STORE_DIR.mkdir(parents=True, exist_ok=True)
+    for name in STORE_SOURCES:
+        if open_feature_store(name) is None:
+            logger.warning(f"No encontré {STORE_SOURCES[name]}: store '{name}' omitido.")
+
+if __name__ == "__main__":
+    build_feature_stores()
@@ -0,0 +1,390 @@
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+import pandas as pd
+import aiohttp
+from src.config import Config
+from src.data.datasets import read_dataset, upsert_dataset
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Respuestas que vale la pena reintentar (límite de tasa y errores del servidor)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """
+    Limitador de tasa por proveedor: `rate` peticiones por segundo con ráfagas de hasta `capacity`.
+    Todas las corrutinas que comparten el bucket esperan su turno en vez de recibir 429.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def penalize(self, seconds):
+        """Tras un 429 con Retry-After, vaciamos el bucket para frenar a todas las corrutinas."""
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+class Provider:
+    """Un cliente HTTP por proveedor: sesión con pool de conexiones + limitador de tasa + concurrencia acotada."""
+
+    def __init__(self, name, base_url, rate, concurrency=None, headers=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.bucket = TokenBucket(rate)
+        self.semaphore = asyncio.Semaphore(concurrency or Config.INGEST_CONCURRENCY)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency or Config.INGEST_CONCURRENCY, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=Config.INGEST_TIMEOUT),
+            headers=headers,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def get_json(self, path, params=None, retries=None):
+        """
+        GET con reintentos y backoff exponencial (con jitter) ante 429/5xx y errores de red.
+        Devuelve el JSON o lanza la última excepción cuando se agotan los intentos.
+        """
+        retries = Config.INGEST_RETRIES if retries is None else retries
+        url = f"{self.base_url}/{path.lstrip('/')}"
+
+        for attempt in range(retries + 1):
+            await self.bucket.acquire()
+            try:
+                async with self.semaphore, self.session.get(url, params=params) as resp:
+                    if resp.status in RETRY_STATUS and attempt < retries:
+                        retry_after = float(resp.headers.get("Retry-After", 0) or 0)
+                        if resp.status == 429 and retry_after:
+                            self.bucket.penalize(retry_after)
+                        raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=resp.status)
+                    resp.raise_for_status()
+                    return await resp.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = getattr(e, 'status', None)
+                if attempt >= retries or (status is not None and status not in RETRY_STATUS):
+                    raise
+                delay = Config.INGEST_BACKOFF * (2 ** attempt) * (1 + random.random())
+                logger.debug(f"{self.name}: reintento {attempt + 1}/{retries} en {delay:.2f}s ({e})")
+                await asyncio.sleep(delay)
+
+# PRECIOS (API de gráficos de Yahoo, la misma que usa yfinance)
+
+def exchange_dates(timestamps, meta):
+    """
+    Epoch de las velas -> fecha calendario en la hora de la bolsa. Yahoo sella cada vela diaria en
+    la medianoche local (los pares "=X" quedan a las 23:00 UTC en horario de verano de Londres):
+    normalizar en UTC las corre al día anterior. Se usa la zona de la bolsa (sigue los cambios de
+    horario) y, si no viene o no se reconoce, el gmtoffset actual.
+    """
+    stamps = pd.to_datetime(timestamps, unit='s', utc=True)
+    local = None
+    if meta.get("exchangeTimezoneName"):
+        try:
+            local = stamps.tz_convert(meta["exchangeTimezoneName"])
+        except KeyError:
+            logger.debug(f"Zona horaria desconocida: {meta['exchangeTimezoneName']}")
+    if local is None:
+        local = stamps + pd.Timedelta(seconds=meta.get("gmtoffset") or 0)
+    return local.tz_localize(None).normalize()
+
+def parse_chart(ticker, payload):
+    """JSON de /v8/finance/chart -> DataFrame (date, ticker, open, high, low, close, volume)."""
+    result = (payload.get("chart") or {}).get("result") or []
+    if not result or not result[0].get("timestamp"):
+        return pd.DataFrame()
+    result = result[0]
+    quote = result["indicators"]["quote"][0]
+    df = pd.DataFrame({
+        "date": exchange_dates(result["timestamp"], result.get("meta") or {}),
+        "ticker": ticker,
+        **{col: pd.to_numeric(pd.Series(quote.get(col)), errors='coerce') for col in ("open", "high", "low", "close", "volume")},
+    })
+    # Una barra por día (la última si el proveedor manda la vela en curso duplicada)
+    return df.drop_duplicates(subset=["date"], keep="last").reset_index(drop=True)
+
+async def fetch_prices(provider, ticker, period=None, start=None):
+    """Velas diarias de un ticker: todo el `period` ("5y") o desde `start` si se pide solo el delta."""
+    params = {"interval": "1d", "includeAdjustedClose": "true"}
+    if start is not None:
+        params.update(period1=int(pd.Timestamp(start).timestamp()), period2=int(time.time()))
+    else:
+        params["range"] = period or Config.INGEST_PRICE_PERIOD
+    payload = await provider.get_json(f"v8/finance/chart/{ticker}", params)
+    return parse_chart(ticker, payload)
+
+# NOTICIAS (Finnhub company-news)
+
+def parse_news(ticker, items):
+    """Lista de noticias de Finnhub -> DataFrame (id, ticker, date, headline, summary, source, url)."""
+    if not items:
+        return pd.DataFrame()
+    df = pd.DataFrame(items)
+    df = pd.DataFrame({
+        "id": df["id"].astype("int64"),
+        "ticker": ticker,
+        "date": pd.to_datetime(df["datetime"], unit='s'),
+        "headline": df.get("headline"),
+        "summary": df.get("summary"),
+        "source": df.get("source"),
+        "url": df.get("url"),
+    })
+    return df.drop_duplicates(subset=["id"]).reset_index(drop=True)
+
+async def fetch_news(provider, ticker, start, end):
+    """
+    Noticias de un ticker entre `start` y `end`. Finnhub recorta respuestas largas,
+    así que el rango se parte en ventanas de Config.INGEST_NEWS_WINDOW_DAYS que se piden en paralelo.
+    """
+    edges = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(),
+                          freq=f"{Config.INGEST_NEWS_WINDOW_DAYS}D").tolist() + [pd.Timestamp(end).normalize() + pd.Timedelta(days=1)]
+    windows = [(a, b - pd.Timedelta(days=1)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+    pages = await asyncio.gather(*(
+        provider.get_json("company-news", {"symbol": ticker, "from": str(a.date()), "to": str(b.date()), "token": Config.FINNHUB_KEY})
+        for a, b in windows
+    ))
+    frames = [parse_news(ticker, page) for page in pages if page]
+    frames = [f for f in frames if len(f)]
+    return pd.concat(frames, ignore_index=True).drop_duplicates(subset=["id"]) if frames else pd.DataFrame()
+
+# MARCAS DE AGUA (HIGH-WATER MARKS)
+# Por ticker guardamos la última vela y la última noticia ya almacenadas; la siguiente corrida
+# solo pide lo que viene después. Sin marca (ticker nuevo o primera corrida) se baja la ventana completa.
+
+def watermarks_path():
+    return Config.DATA_RAW / "ingest_watermarks.json"
+
+def prices_path():
+    return Config.DATA_RAW / "prices_5y.parquet"
+
+def news_path():
+    return Config.DATA_RAW / "news_raw.parquet"
+
+def watermarks_from_data(prices=None, news=None):
+    """Marcas de agua derivadas de los datasets guardados: última fecha por ticker y última noticia (ts, id)."""
+    marks = {"prices": {}, "news": {}}
+    if prices is not None and len(prices):
+        last = prices.groupby('ticker')['date'].max()
+        marks["prices"] = {t: str(d.date()) for t, d in last.items()}
+    if news is not None and len(news):
+        last = news.sort_values(['ticker', 'date', 'id']).groupby('ticker').tail(1)
+        marks["news"] = {t: {"ts": int(d.timestamp()), "id": int(i)} for t, d, i in zip(last['ticker'], last['date'], last['id'])}
+    return marks
+
+def load_watermarks():
+    """
+    Lee las marcas de agua; si no existen pero sí hay datos en disco, se reconstruyen a partir de ellos.
+    Las marcas de un dataset que ya no está en disco se ignoran: pedir solo el delta dejaría
+    el dataset sin su historia, así que ese dataset se vuelve a bajar completo.
+    """
+    path = watermarks_path()
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            marks = json.load(f)
+        for kind, data_path in (("prices", prices_path()), ("news", news_path())):
+            if marks.get(kind) and not data_path.exists():
+                logger.warning(f"{data_path.name} no existe: se ignoran las marcas de {kind} y se baja la ventana completa.")
+                marks[kind] = {}
+        return marks
+    prices = read_dataset(prices_path(), columns=['ticker', 'date']) if prices_path().exists() else None
+    news = pd.read_parquet(news_path(), engine='fastparquet', columns=['id', 'ticker', 'date']) if news_path().exists() else None
+    return watermarks_from_data(prices, news)
+
+def period_start(period, today=None):
+    """Inicio de una ventana al estilo de Yahoo ("5y", "6mo", "30d", "ytd"); None para "max"."""
+    today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+    if period == "max":
+        return None
+    if period == "ytd":
+        return today.replace(month=1, day=1)
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Período no reconocido: {period}")
+    n, unit = int(match[1]), match[2]
+    return today - {"d": pd.DateOffset(days=n), "wk": pd.DateOffset(weeks=n),
+                    "mo": pd.DateOffset(months=n), "y": pd.DateOffset(years=n)}[unit]
+
+def save_watermarks(marks):
+    path = watermarks_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(marks, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# ORQUESTACIÓN
+
+async def _gather_tickers(fetch, tickers, label):
+    """Corre `fetch(ticker)` para todo el universo; un ticker que falla no tumba la corrida."""
+    start = time.perf_counter()
+    results = await asyncio.gather(*(fetch(t) for t in tickers), return_exceptions=True)
+
+    frames, failed = [], []
+    for ticker, result in zip(tickers, results):
+        if isinstance(result, Exception):
+            failed.append(ticker)
+            logger.warning(f"{label}: {ticker} falló ({type(result).__name__}: {result})")
+        elif len(result):
+            frames.append(result)
+
+    logger.info(f"{label}: {len(frames)}/{len(tickers)} tickers con datos en {time.perf_counter() - start:.1f}s"
+                + (f" | fallidos: {failed}" if failed else ""))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(), failed
+
+def yahoo_provider():
+    return Provider("yahoo", Config.YAHOO_BASE_URL, Config.YAHOO_RATE_PER_SEC,
+                    headers={"User-Agent": "Mozilla/5.0 (compatible; bubo-alpha)"})
+
+def finnhub_provider():
+    return Provider("finnhub", Config.FINNHUB_BASE_URL, Config.FINNHUB_RATE_PER_SEC)
+
+async def ingest_prices_async(tickers=None, period=None, watermarks=None):
+    """
+    Descarga las velas de todo el universo de forma concurrente.
+    Con `watermarks` ({ticker: última fecha}) solo se pide desde la última vela guardada
+    (incluida, para reemplazar la vela del día si se bajó incompleta).
+    """
+    tickers = tickers or Config.TICKERS
+    watermarks = watermarks or {}
+    async with yahoo_provider() as yahoo:
+        return await _gather_tickers(
+            lambda t: fetch_prices(yahoo, t, period=period, start=watermarks.get(t)), tickers, "Precios"
+        )
+
+async def ingest_news_async(tickers=None, start=None, end=None, watermarks=None):
+    """
+    Descarga las noticias de todo el universo (por defecto los últimos NEWS_HISTORY_DAYS).
+    Con `watermarks` ({ticker: {"ts", "id"}}) cada ticker se pide desde el día de su última noticia.
+    No se filtra por hora: Finnhub indexa noticias tarde o con hora anterior a la última ya guardada,
+    y lo ya visto se descarta al guardar (save_news deduplica por (ticker, id)).
+    """
+    tickers = tickers or Config.TICKERS
+    if not Config.FINNHUB_KEY:
+        logger.warning("FINNHUB_API_KEY vacía: se omite la ingesta de noticias.")
+        return pd.DataFrame(), list(tickers)
+    end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+    start = pd.Timestamp(start or end - pd.Timedelta(days=Config.NEWS_HISTORY_DAYS)).normalize()
+    watermarks = watermarks or {}
+
+    async def fetch_delta(ticker):
+        mark = watermarks.get(ticker)
+        if mark is None:
+            return await fetch_news(finnhub, ticker, start, end)
+        last_day = pd.Timestamp(mark["ts"], unit='s').normalize()
+        return await fetch_news(finnhub, ticker, max(start, last_day), end)
+
+    async with finnhub_provider() as finnhub:
+        return await _gather_tickers(fetch_delta, tickers, "Noticias")
+
+async def ingest_all_async(tickers=None, watermarks=None):
+    """Precios y noticias a la vez: son proveedores distintos, cada uno con su propio límite."""
+    watermarks = watermarks or {}
+    (prices, _), (news, _) = await asyncio.gather(
+        ingest_prices_async(tickers, watermarks=watermarks.get("prices")),
+        ingest_news_async(tickers, watermarks=watermarks.get("news")),
+    )
+    return prices, news
+
+def save_prices(prices):
+    """
+    Mezcla el delta en prices_5y (sin duplicar (ticker, date)) recortando lo anterior a la ventana
+    Config.INGEST_PRICE_PERIOD. Devuelve las filas de las particiones reescritas.
+    """
+    output_path = prices_path()
+    merged = upsert_dataset(prices, output_path, keys=('ticker', 'date'),
+                            min_date=period_start(Config.INGEST_PRICE_PERIOD))
+    logger.info(f"Precios guardados en: {output_path} (+{len(prices)} filas descargadas, {len(merged)} reescritas)")
+    return merged
+
+def save_news(news):
+    """
+    Mezcla el delta en news_raw (sin duplicar (ticker, id)) recortando a los últimos NEWS_HISTORY_DAYS.
+    Finnhub repite la misma noticia (mismo id) en cada ticker relacionado: cada uno conserva su copia.
+    """
+    output_path = news_path()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    merged = news
+    if output_path.exists():
+        merged = pd.concat([pd.read_parquet(output_path, engine='fastparquet'), news], ignore_index=True)
+    cutoff = pd.Timestamp.today().normalize() - pd.Timedelta(days=Config.NEWS_HISTORY_DAYS)
+    merged = merged.drop_duplicates(subset=['ticker', 'id'], keep='last')
+    merged = merged[merged['date'] >= cutoff].sort_values(['ticker', 'date'], kind='mergesort').reset_index(drop=True)
+    # Row groups del tamaño del lote de streaming: src.nlp.stream_sentiment los lee de a uno.
+    # news_raw es la única copia de la historia: se escribe aparte y se reemplaza con os.replace
+    tmp_path = output_path.with_name(f"{output_path.name}.tmp{os.getpid()}")
+    merged.to_parquet(tmp_path, engine='fastparquet', compression='snappy',
+                      row_group_offsets=Config.NEWS_STREAM_BATCH_SIZE)
+    os.replace(tmp_path, output_path)
+    logger.info(f"Noticias guardadas en: {output_path} (+{len(news)} nuevas, {len(merged)} en total)")
+    return merged
+
+def run_ingestion(kind="all", tickers=None, full=False):
+    """
+    Etapa del pipeline: ingesta asíncrona de precios, noticias o ambos.
+    Con Config.INGEST_INCREMENTAL solo se baja lo posterior a las marcas de agua;
+    `full=True` ignora las marcas y vuelve a bajar las ventanas completas.
+    """
+    incremental = Config.INGEST_INCREMENTAL and not full
+    marks = load_watermarks() if incremental else {"prices": {}, "news": {}}
+    if incremental:
+        logger.info(f"Ingesta incremental: {len(marks.get('prices', {}))} tickers con marca de precios, "
+                    f"{len(marks.get('news', {}))} con marca de noticias.")
+
+    if kind == "prices":
+        prices, _ = asyncio.run(ingest_prices_async(tickers, watermarks=marks.get("prices")))
+        news = None
+    elif kind == "news":
+        news, _ = asyncio.run(ingest_news_async(tickers, watermarks=marks.get("news")))
+        prices = None
+    else:
+        prices, news = asyncio.run(ingest_all_async(tickers, watermarks=marks))
+
+    if prices is not None:
+        if not prices.empty:
+            save_prices(prices)
+            # El delta llega hasta hoy: su última vela por ticker es la nueva marca
+            marks["prices"] = {**marks.get("prices", {}), **watermarks_from_data(prices=prices)["prices"]}
+        elif not prices_path().exists():
+            raise SystemExit("Ingesta de precios sin datos.")
+    if news is not None:
+        if not news.empty:
+            marks["news"] = {**marks.get("news", {}), **watermarks_from_data(news=save_news(news))["news"]}
+        else:
+            logger.info("Sin noticias nuevas.")
+
+    # Las marcas se guardan DESPUÉS de escribir los datos: si algo falla a medias, se repite el delta
+    save_watermarks(marks)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingesta asíncrona de precios (Yahoo) y noticias (Finnhub)")
+    parser.add_argument("kind", nargs="?", choices=["prices", "news", "all"], default="all")
+    parser.add_argument("--tickers", nargs="*", default=None, help="Subconjunto de tickers (por defecto Config.TICKERS)")
+    parser.add_argument("--full", action="store_true", help="Ignorar las marcas de agua y bajar las ventanas completas")
+    args = parser.parse_args()
+    run_ingestion(args.kind, args.tickers, full=args.full)
@@ -0,0 +1,70 @@
+import logging
+import numpy as np
+from src.config import Config
+from src.data.feature_store import load_store, open_feature_store, write_matrices
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Matrices alineadas (fecha x ticker) que usan las estrategias y la fase de señales
+BUNDLE_FIELDS = ('close', 'ema_fast', 'ema_slow', 'sentiment_avg', 'sentiment_smooth', 'tech_score')
+
+# Memo en proceso: {(versión del dataset, ventana): bundle}
+_MEMO = {}
+
+def build_market_bundle(store, smooth_window):
+    """
+    Reshape + limpieza que antes repetía cada script:
+    ffill de precios/EMAs, sentimiento con memoria de `smooth_window` días y spread técnico.
+    """
+    # Usamos ffill() para persistencia de datos
+    close = store.frame('close').ffill()
+    ema_fast = store.frame('ema_fast').ffill()
+    ema_slow = store.frame('ema_slow').ffill()
+    sentiment_avg = store.frame('sentiment_avg').ffill()
+
+    # Sentimiento suavizado (sin noticias = 0)
+    sentiment_smooth = sentiment_avg.fillna(0.0).rolling(window=smooth_window).mean().fillna(0.0)
+
+    # Componente Técnico: Spread Normalizado entre EMAs
+    tech_score = (ema_fast - ema_slow) / close
+
+    return {
+        'close': close, 'ema_fast': ema_fast, 'ema_slow': ema_slow,
+        'sentiment_avg': sentiment_avg, 'sentiment_smooth': sentiment_smooth, 'tech_score': tech_score,
+    }
+
+def load_market_bundle(smooth_window=None):
+    """
+    Devuelve {campo: DataFrame fecha x ticker} para features_master, construido una sola vez
+    por versión de datos. El bundle se guarda en disco como otro FeatureStore (memory-map)
+    y se invalida cuando cambia la versión (mtime/tamaño) del dataset de origen.
+    Devuelve None si no existe features_master.
+    """
+    smooth_window = smooth_window or Config.SENTIMENT_SMOOTH_WINDOW
+    store = open_feature_store("master")
+    if store is None:
+        return None
+
+    key = (tuple(store.source_version or ()), smooth_window)
+    if key in _MEMO:
+        return _MEMO[key]
+
+    path = Config.FEATURE_STORE_DIR / f"bundle_w{smooth_window}"
+    cached = load_store(path)
+
+    if cached is None or cached.source_version != store.source_version:
+        logger.info(f"Construyendo bundle de matrices (ventana de sentimiento = {smooth_window})...")
+        frames = build_market_bundle(store, smooth_window)
+        reference = frames['close']
+        cached = write_matrices(
+            path, reference.index.values, reference.columns,
+            {name: frames[name].to_numpy(dtype=np.dtype(Config.FEATURE_STORE_DTYPE)) for name in BUNDLE_FIELDS},
+            version=store.source_version
+        )
+
+    bundle = {name: cached.frame(name) for name in BUNDLE_FIELDS}
+    _MEMO.clear()
+    _MEMO[key] = bundle
+    return bundle
@@ -1,48 +1,194 @@
+import os
+import json
+import argparse
+import numpy as np
 import pandas as pd
 import logging 
 from src.config import Config   
+from src.data.datasets import read_dataset
 
 #Configuración de Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)    
 
-def aggregate_daily_sentiment():
+# ESTADO AGREGADO POR (date, ticker)
+# En vez de recalcular el groupby sobre todas las noticias, guardamos estadísticos suficientes
+# que se pueden sumar: conteo, suma, suma de cuadrados, mínimo, máximo y la suma ponderada
+# por recencia. Dos estados parciales (otro lote, otro worker, otro día) se mezclan con
+# merge_states en cualquier orden y el resultado es el mismo.
+STATE_AGG = {
+    'count': 'sum', 'sum': 'sum', 'sumsq': 'sum', 'min': 'min', 'max': 'max',
+    'wsum': 'sum', 'wscore': 'sum',
+}
+
+def _state_dir():
+    return Config.DATA_PROCESSED / "sentiment_state"
+
+def _state_meta():
+    # Si cambia el modelo o la vida media, el estado guardado ya no sirve
+    return {"model": Config.FINBERT_MODEL, "halflife_hours": Config.SENTIMENT_RECENCY_HALFLIFE_HOURS,
+            "keys": ["ticker", "id"]}
+
+def news_keys(df):
+    """Llave de una noticia agregada: (ticker, id). Finnhub repite el mismo id en cada ticker relacionado."""
+    return pd.MultiIndex.from_arrays([df['ticker'].astype(str), df['id'].astype('int64')], names=['ticker', 'id'])
+
+def partial_state(df):
+    """Estado parcial de un conjunto de noticias puntuadas (índice: date, ticker)."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=list(STATE_AGG), index=pd.MultiIndex.from_arrays([[], []], names=['date', 'ticker']))
+    day = df['date'].dt.normalize()
+    score = df['sentiment_score'].astype('float64')
+    # Recencia dentro del día: una noticia de cierre pesa más que una de madrugada
+    hours_to_close = (day + pd.Timedelta(days=1) - df['date']).dt.total_seconds() / 3600
+    weight = np.exp2(-hours_to_close / Config.SENTIMENT_RECENCY_HALFLIFE_HOURS)
+
+    parts = pd.DataFrame({
+        'date': day, 'ticker': df['ticker'],
+        'count': 1, 'sum': score, 'sumsq': score ** 2, 'min': score, 'max': score,
+        'wsum': weight, 'wscore': weight * score,
+    })
+    return parts.groupby(['date', 'ticker']).agg(STATE_AGG)
+
+def merge_states(*states):
+    """Mezcla estados parciales (asociativa y conmutativa)."""
+    states = [st for st in states if st is not None and len(st)]
+    if not states:
+        return partial_state(None)
+    if len(states) == 1:
+        return states[0]
+    return pd.concat(states).groupby(level=['date', 'ticker']).agg(STATE_AGG)
+
+def prune_state(state):
+    """
+    Quita los días fuera de la ventana de noticias (NEWS_HISTORY_DAYS, el mismo recorte de news_raw):
+    así el estado incremental no crece sin límite y coincide con una reconstrucción --full.
+    """
+    cutoff = pd.Timestamp.today().normalize() - pd.Timedelta(days=Config.NEWS_HISTORY_DAYS)
+    if state is None or not len(state):
+        return state
+    return state[state.index.get_level_values('date') >= cutoff]
+
+def finalize_state(state):
+    """Estado -> features_sentiment (date, ticker, sentiment_avg, news_count + dispersión, extremos y recencia)."""
+    state = state.sort_index()
+    count = state['count'].astype('float64')
+    mean = state['sum'] / count
+    var = (state['sumsq'] - count * mean ** 2) / (count - 1)
+    return pd.DataFrame({
+        'sentiment_avg': mean,
+        'news_count': state['count'].astype('int64'),
+        # Desviación estándar muestral (NaN con una sola noticia, igual que pandas)
+        'sentiment_std': np.sqrt(var.clip(lower=0)).where(count > 1),
+        'sentiment_min': state['min'].astype('float64'),
+        'sentiment_max': state['max'].astype('float64'),
+        'sentiment_recency': state['wscore'] / state['wsum'],
+    }, index=state.index).reset_index()
+
+def load_sentiment_state():
+    """Devuelve (estado, llaves (ticker, id) ya agregadas) o (None, None) si no hay estado válido."""
+    path = _state_dir()
+    if not (path / "meta.json").exists():
+        return None, None
+    with open(path / "meta.json", 'r', encoding='utf-8') as f:
+        if json.load(f) != _state_meta():
+            logger.info("El estado de sentimiento es de otro modelo/configuración: se reconstruye.")
+            return None, None
+    state = pd.read_parquet(path / "state.parquet", engine='fastparquet').set_index(['date', 'ticker'])
+    seen = news_keys(pd.read_parquet(path / "ids.parquet", engine='fastparquet'))
+    return state, seen
+
+def save_sentiment_state(state, seen):
+    """
+    Guarda estado + noticias agregadas (`seen`: DataFrame con ticker e id);
+    meta.json se escribe al final y marca el estado como completo.
+    """
+    state = prune_state(state)
+    path = _state_dir()
+    path.mkdir(parents=True, exist_ok=True)
+    if (path / "meta.json").exists():
+        (path / "meta.json").unlink()
+    state.reset_index().to_parquet(path / "state.parquet", engine='fastparquet', compression='snappy')
+    news_keys(seen).drop_duplicates().to_frame(index=False).to_parquet(
+        path / "ids.parquet", engine='fastparquet', compression='snappy')
+    tmp_path = path / f"meta.json.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(_state_meta(), f)
+    os.replace(tmp_path, path / "meta.json")
+
+def aggregate_daily_sentiment(df=None, save=True, full=False):
     """
     Convierte las noticias individuales en un Score Diario por Ticker.
+    `df` permite recibir las noticias puntuadas en memoria (modo en-proceso del pipeline).
+    Con Config.SENTIMENT_INCREMENTAL solo se agregan las noticias cuyo (ticker, id) no está en el estado
+    guardado; `full=True` reconstruye el estado desde todas las noticias.
     """
     input_path = Config.DATA_PROCESSED / "news_scored.parquet"
     output_path = Config.DATA_PROCESSED / "features_sentiment.parquet"
     
-    if not input_path.exists():
-        logger.error(f"No encontré: {input_path}")
-        return
+    if df is None:
+        if not input_path.exists():
+            logger.error(f"No encontré: {input_path}")
+            return
 
-    logger.info("Cargando noticias puntuadas")
-    df = pd.read_parquet(input_path)
-    
-    # Normalizar Fechas
-    # Convertimos la fecha+hora exacta a solo FECHA (YYYY-MM-DD) para agrupar por día
-    df['date'] = df['date'].dt.normalize()
+        logger.info("Cargando noticias puntuadas")
+        df = read_dataset(input_path)
     
     logger.info("ClassName: Agrupando noticias por día y activo")
-    
-    # Agrupación Matemática
-    # Por cada Día y cada Ticker, calculamos:
-    # mean: El promedio del sentimiento (El humor general del día)
-    # count: Cuántas noticias hubo (El volumen de ruido/atención)
-    daily_sentiment = df.groupby(['date', 'ticker'])['sentiment_score'].agg(['mean', 'count']).reset_index()
-    
-    # Renombrar columnas para que sean claras
-    daily_sentiment.columns = ['date', 'ticker', 'sentiment_avg', 'news_count']
+
+    # Estado guardado: solo se agregan las noticias nuevas
+    state, seen = (None, None)
+    if Config.SENTIMENT_INCREMENTAL and not full and 'id' in df.columns:
+        state, seen = load_sentiment_state()
+
+    if state is not None:
+        new = df[~news_keys(df).isin(seen)]
+        logger.info(f"Agregado incremental: {len(new)} noticias nuevas de {len(df)}.")
+        state = merge_states(state, partial_state(new))
+    else:
+        # Por cada Día y cada Ticker: promedio del sentimiento (el humor del día), cuántas noticias hubo
+        # (el volumen de atención), dispersión, extremos y un promedio que pesa más lo reciente
+        state = partial_state(df)
+    state = prune_state(state)
+
+    daily_sentiment = finalize_state(state)
     
     # Guardado
-    logger.info(f"Guardando características de sentimiento diario en: {output_path}")
-    daily_sentiment.to_parquet(output_path, engine='fastparquet', compression='snappy')
+    if save:
+        logger.info(f"Guardando características de sentimiento diario en: {output_path}")
+        daily_sentiment.to_parquet(output_path, engine='fastparquet', compression='snappy')
+        if 'id' in df.columns:
+            # Solo hace falta recordar los ids que siguen en news_scored (lo más viejo ya no vuelve)
+            save_sentiment_state(state, df[['ticker', 'id']])
     
     logger.info(f"Dimensiones finales: {daily_sentiment.shape}")
     logger.info(f"Ejemplo:\n{daily_sentiment.tail(5)}")
+    return daily_sentiment
 
-if __name__ == "__main__":
-    aggregate_daily_sentiment()
+class SentimentAccumulator:
+    """
+    Agregado diario por (date, ticker) acumulado lote a lote (modo streaming).
+    Solo guarda el estado mezclable, así que la memoria depende del número de
+    días x tickers y no del número de noticias procesadas. Acumuladores de workers
+    distintos se combinan con merge().
+    """
+
+    def __init__(self, state=None):
+        self.state = state
+
+    def update(self, df):
+        self.state = merge_states(self.state, partial_state(df))
 
-    
\ No newline at end of file
+    def merge(self, other):
+        self.state = merge_states(self.state, other.state)
+        return self
+
+    def result(self):
+        """Mismo formato que aggregate_daily_sentiment (solo los días dentro de la ventana de noticias)."""
+        self.state = prune_state(merge_states(self.state))
+        return finalize_state(self.state)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentimiento diario por ticker")
+    parser.add_argument("--full", action="store_true", help="Reconstruir el estado desde todas las noticias")
+    aggregate_daily_sentiment(full=parser.parse_args().full)
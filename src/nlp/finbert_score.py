@@ -3,6 +3,7 @@ import torch
 import logging
 from transformers import BertTokenizer, BertForSequenceClassification
 from src.config import Config
+from src.nlp.sentiment_cache import SentimentCache, text_key
 import numpy as np
 
 # Configuración de Logging
@@ -20,10 +21,10 @@ def get_sentiment_score(text, tokenizer, model):
         return 0.0
         
     # Tokenización (Convertir texto a números para la IA)
-    inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512)
+    inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=Config.FINBERT_MAX_LENGTH)
     
     #Inferencia (El modelo piensa)
-    with torch.no_grad(): # No necesitamos entrenar, solo predecir 
+    with torch.inference_mode(): # No necesitamos entrenar, solo predecir 
         outputs = model(**inputs)
     
     # Procesar Probabilidades
@@ -42,14 +43,60 @@ def get_sentiment_score(text, tokenizer, model):
     
     return final_score
 
-def run_finbert_pipeline():
-    input_path = Config.DATA_PROCESSED / "news_clean.parquet"
-    output_path = Config.DATA_PROCESSED / "news_scored.parquet"
-    
-    if not input_path.exists():
-        logger.error(f" No encontré noticias limpias en: {input_path}")
-        return
+def build_news_texts(df):
+    """
+    Construye el texto que ve FinBERT para cada noticia: Titular + Punto + Resumen.
+    """
+    headline = df['headline_clean'].astype(str)
+    summary = df['summary_clean'].astype(str) if 'summary_clean' in df.columns else ""
+    # Unimos todo para que FinBERT tenga más contexto
+    return (headline + ". " + summary).tolist()
+
+def score_texts_batched(texts, tokenizer, model, batch_size=None):
+    """
+    Versión por lotes de get_sentiment_score (mismo puntaje Positivo - Negativo).
+    Tokeniza todo una sola vez, ordena los textos por longitud en tokens para que
+    cada lote tenga un padding mínimo y hace un forward pass por lote.
+    """
+    batch_size = batch_size or Config.FINBERT_BATCH_SIZE
+    scores = np.zeros(len(texts), dtype=np.float32)
+
+    # Textos vacíos valen 0.0 (Neutral), igual que en get_sentiment_score
+    valid = [i for i, text in enumerate(texts) if text and not pd.isna(text)]
+    if not valid:
+        return scores
 
+    # Tokenización única SIN padding (el padding se hace por lote)
+    encodings = tokenizer([texts[i] for i in valid], truncation=True, max_length=Config.FINBERT_MAX_LENGTH)
+    keys = list(encodings.keys())
+
+    # Ordenar por longitud: los lotes agrupan textos de tamaño parecido
+    order = sorted(range(len(valid)), key=lambda j: len(encodings['input_ids'][j]))
+    device = next(model.parameters()).device
+    total_batches = (len(order) + batch_size - 1) // batch_size
+
+    with torch.inference_mode():
+        for b, start in enumerate(range(0, len(order), batch_size)):
+            idx = order[start:start + batch_size]
+            batch = tokenizer.pad([{k: encodings[k][j] for k in keys} for j in idx], return_tensors="pt")
+            batch = {k: v.to(device) for k, v in batch.items()}
+
+            probs = torch.nn.functional.softmax(model(**batch).logits, dim=-1).cpu().numpy()
+            # FinBERT de ProsusAI: [Positive, Negative, Neutral]
+            scores[[valid[j] for j in idx]] = probs[:, 0] - probs[:, 1]
+
+            if b % 20 == 0:
+                logger.info(f"   Progreso: lote {b + 1}/{total_batches} ({min(start + batch_size, len(order))}/{len(order)} noticias)...")
+
+    return scores
+
+# Modelo ya cargado en este proceso (el modo streaming puntúa muchos lotes con el mismo modelo)
+_FINBERT = {}
+
+def load_finbert():
+    """Carga tokenizer + modelo FinBERT listos para inferencia (una sola vez por proceso)."""
+    if Config.FINBERT_MODEL in _FINBERT:
+        return _FINBERT[Config.FINBERT_MODEL]
     logger.info("Cargando modelo FinBERT")
     
     # Usamos el modelo específico de ProsusAI entrenado para finanzas
@@ -58,40 +105,70 @@ def run_finbert_pipeline():
     model = BertForSequenceClassification.from_pretrained(model_name)
     
     # Poner el modelo en modo evaluación (más rápido)
+    model.to(Config.DEVICE)
     model.eval()
+    _FINBERT[model_name] = (tokenizer, model)
+    return tokenizer, model
+
+def score_texts_cached(texts, cache, finbert=None):
+    """
+    Puntúa textos consultando primero la caché. Solo los fallos (noticias nuevas)
+    llegan a FinBERT, y el modelo ni siquiera se carga si todo estaba en caché.
+    `finbert` es un par (tokenizer, model) opcional para reutilizar un modelo ya cargado.
+    """
+    keys = [text_key(text) for text in texts]
+    cached = cache.get_many(keys)
+
+    scores = np.array([cached.get(k, 0.0) for k in keys], dtype=np.float32)
+
+    # Textos repetidos dentro de la misma corrida se puntúan una sola vez
+    missing = {}
+    for i, k in enumerate(keys):
+        if k not in cached:
+            missing.setdefault(k, []).append(i)
+
+    logger.info(f"Caché de sentimiento: {len(keys) - sum(map(len, missing.values()))} aciertos, "
+                f"{len(missing)} textos nuevos por puntuar.")
+
+    if missing:
+        tokenizer, model = finbert or load_finbert()
+        new_scores = score_texts_batched([texts[idx[0]] for idx in missing.values()], tokenizer, model)
+        for score, idx in zip(new_scores, missing.values()):
+            scores[idx] = score
+        cache.put_many(zip(missing.keys(), new_scores))
+
+    return scores
+
+def run_finbert_pipeline(df=None, save=True):
+    """
+    Puntúa las noticias limpias con FinBERT y devuelve el DataFrame con 'sentiment_score'.
+    `df` permite recibir las noticias en memoria (modo en-proceso del pipeline);
+    `save=False` omite el checkpoint news_scored.parquet.
+    """
+    input_path = Config.DATA_PROCESSED / "news_clean.parquet"
+    output_path = Config.DATA_PROCESSED / "news_scored.parquet"
     
-    logger.info("Cargando noticias...")
-    df = pd.read_parquet(input_path)
+    if df is None:
+        if not input_path.exists():
+            logger.error(f" No encontré noticias limpias en: {input_path}")
+            return
+
+        logger.info("Cargando noticias...")
+        df = pd.read_parquet(input_path)
     
-    # Para pruebas rápidas, si tienes muchas noticias, procesamos todas.
-    # Como tienes ~700, la CPU lo hará en 1-3 minutos.
     total_news = len(df)
-    logger.info(f"Analizando sentimiento de {total_news} titulares...")
-    
-    # Aplicamos la función fila por fila
-    # Nota: Para millones de datos usaríamos 'batching', pero para <5000 esto es perfecto.
-    scores = []
+    logger.info(f"Analizando sentimiento de {total_news} titulares (lotes de {Config.FINBERT_BATCH_SIZE})...")
     
-    # Usamos un bucle simple con contador para que veas el progreso
-    for i, row in df.iterrows():
-        # Combinamos Titular + Punto + Resumen 
-        headline = str(row['headline_clean'])
-        summary = str(row['summary_clean']) if 'summary_clean' in row else ""
-        # Unimos todo para que FinBERT tenga más contexto
-        text = f"{headline}. {summary}"
-        
-        score = get_sentiment_score(text, tokenizer, model)
-        scores.append(score)
-        
-        if i % 50 == 0:
-            logger.info(f"   Progreso: {i}/{total_news} noticias procesadas...")
-            
-    df['sentiment_score'] = scores
+    texts = build_news_texts(df)
+    with SentimentCache() as cache:
+        df['sentiment_score'] = score_texts_cached(texts, cache)
     
     # Guardar
-    df.to_parquet(output_path, engine='fastparquet', compression='snappy')
-    
-    logger.info(f"Análisis completado. Guardado en: {output_path}")
+    if save:
+        df.to_parquet(output_path, engine='fastparquet', compression='snappy')
+        logger.info(f"Análisis completado. Guardado en: {output_path}")
+    else:
+        logger.info("Análisis completado (en memoria, sin checkpoint).")
     
     # Mostrar los extremos (Lo más positivo y lo más negativo)
     print("\n" + "="*50)
@@ -102,5 +179,7 @@ def run_finbert_pipeline():
     print(df.sort_values('sentiment_score', ascending=True).iloc[0][['headline', 'sentiment_score']])
     print("="*50 + "\n")
 
+    return df
+
 if __name__ == "__main__":
     run_finbert_pipeline()
\ No newline at end of file
@@ -0,0 +1,90 @@
+import hashlib
+import sqlite3
+import time
+import logging
+from src.config import Config
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# SQLite limita el número de parámetros por consulta
+_SQL_CHUNK = 900
+
+def text_key(text, model_name=None):
+    """
+    Huella única de una noticia: hash del texto que ve FinBERT + el nombre del modelo.
+    Si cambiamos de modelo, las llaves cambian y nada viejo se reutiliza por error.
+    """
+    model_name = model_name or Config.FINBERT_MODEL
+    return hashlib.sha256(f"{model_name}\x00{text}".encode('utf-8')).hexdigest()
+
+class SentimentCache:
+    """
+    Caché persistente (SQLite) de puntajes FinBERT: llave -> sentiment_score.
+    Guarda cuándo se usó cada llave por última vez para desalojar lo más viejo
+    cuando la tabla supera Config.SENTIMENT_CACHE_MAX_ROWS.
+    """
+
+    def __init__(self, path=None, max_rows=None):
+        self.path = path or Config.SENTIMENT_CACHE_PATH
+        self.max_rows = max_rows or Config.SENTIMENT_CACHE_MAX_ROWS
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            " key TEXT PRIMARY KEY, score REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_scores_last_used ON scores(last_used)")
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def get_many(self, keys):
+        """Devuelve {llave: score} solo para las llaves que ya estaban en caché."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for i in range(0, len(keys), _SQL_CHUNK):
+            chunk = keys[i:i + _SQL_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows = self.conn.execute(f"SELECT key, score FROM scores WHERE key IN ({marks})", chunk)
+            found.update(rows.fetchall())
+
+        # Marcamos los aciertos como recientes (protegidos del desalojo)
+        now = time.time()
+        self.conn.executemany("UPDATE scores SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+        self.conn.commit()
+        return found
+
+    def put_many(self, items):
+        """Guarda pares (llave, score) y desaloja si la tabla creció demasiado."""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO scores (key, score, last_used) VALUES (?, ?, ?)",
+            [(k, float(score), now) for k, score in items]
+        )
+        self.conn.commit()
+        self.evict()
+
+    def evict(self):
+        """Borra las llaves usadas hace más tiempo hasta quedar en max_rows."""
+        total = self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        excess = total - self.max_rows
+        if excess <= 0:
+            return 0
+
+        self.conn.execute(
+            "DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY last_used ASC LIMIT ?)",
+            (excess,)
+        )
+        self.conn.commit()
+        logger.info(f"Caché de sentimiento: {excess} entradas desalojadas (límite {self.max_rows}).")
+        return excess
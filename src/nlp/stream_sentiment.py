@@ -0,0 +1,141 @@
+import os
+import time
+import argparse
+import logging
+import pandas as pd
+from fastparquet import ParquetFile
+from src.config import Config
+from src.nlp.sentiment_cache import SentimentCache
+from src.nlp.finbert_score import build_news_texts, score_texts_cached
+from src.nlp.aggregate_sentiment import SentimentAccumulator, load_sentiment_state, save_sentiment_state, news_keys
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# MODO STREAMING (noticias -> limpieza -> FinBERT -> agregado diario)
+# En lugar de cargar news_raw completo, cada etapa recibe lotes de NEWS_STREAM_BATCH_SIZE filas
+# y el agregado diario se acumula por (date, ticker). La memoria pico depende del tamaño del lote.
+
+NEWS_COLUMNS = ['id', 'ticker', 'date', 'headline', 'summary', 'source', 'url']
+
+HTML_TAG = r'<[^>]+>'
+URL = r'https?://\S+|www\.\S+'
+
+def iter_news_batches(path, batch_size=None, columns=None):
+    """
+    Generador de lotes de `batch_size` filas sobre un parquet de noticias.
+    Se lee row group por row group (news_raw se escribe con row groups del tamaño del lote),
+    así que nunca hay más de un row group + un lote en memoria.
+    """
+    batch_size = batch_size or Config.NEWS_STREAM_BATCH_SIZE
+    pf = ParquetFile(str(path))
+    columns = [c for c in (columns or NEWS_COLUMNS) if c in pf.columns]
+
+    pending = []
+    pending_rows = 0
+    for group in pf.iter_row_groups(columns=columns):
+        pending.append(group.reset_index(drop=True))
+        pending_rows += len(group)
+        while pending_rows >= batch_size:
+            buffer = pd.concat(pending, ignore_index=True)
+            yield buffer.iloc[:batch_size]
+            rest = buffer.iloc[batch_size:]
+            pending, pending_rows = [rest], len(rest)
+    if pending_rows:
+        yield pd.concat(pending, ignore_index=True)
+
+def clean_news_batch(df):
+    """
+    Limpieza de un lote: quita HTML, URLs y espacios repetidos del titular y el resumen
+    (headline_clean / summary_clean, lo que espera FinBERT) y descarta titulares vacíos.
+    """
+    def clean(col):
+        text = df[col] if col in df.columns else pd.Series("", index=df.index)
+        return (text.fillna("").astype(str)
+                    .str.replace(HTML_TAG, " ", regex=True)
+                    .str.replace(URL, " ", regex=True)
+                    .str.replace(r'\s+', " ", regex=True)
+                    .str.strip())
+
+    df = df.assign(headline_clean=clean('headline'), summary_clean=clean('summary'))
+    return df[df['headline_clean'] != ""]
+
+def score_batch(df, cache):
+    """
+    FinBERT por lotes (con la caché de sentimiento) sobre un lote ya limpio.
+    load_finbert recuerda el modelo, así que se carga una sola vez y solo si hay textos fuera de caché.
+    """
+    return df.assign(sentiment_score=score_texts_cached(build_news_texts(df), cache))
+
+def run_streaming_sentiment(input_path=None, batch_size=None, save=True, full=False):
+    """
+    news_raw -> features_sentiment en streaming. Con `save=True` también se escribe
+    news_scored.parquet lote a lote (append de row groups) con las noticias puntuadas en esta corrida.
+    Con Config.SENTIMENT_INCREMENTAL las noticias ya agregadas (por ticker e id) ni se limpian ni se puntúan:
+    sus filas de news_scored se copian tal cual y solo se agregan al final las nuevas.
+    Devuelve el sentimiento diario (mismo formato que aggregate_daily_sentiment).
+    """
+    input_path = input_path or Config.DATA_RAW / "news_raw.parquet"
+    scored_path = Config.DATA_PROCESSED / "news_scored.parquet"
+    output_path = Config.DATA_PROCESSED / "features_sentiment.parquet"
+    batch_size = batch_size or Config.NEWS_STREAM_BATCH_SIZE
+
+    if not input_path.exists():
+        logger.error(f"No encontré: {input_path}")
+        return
+
+    state, seen = load_sentiment_state() if Config.SENTIMENT_INCREMENTAL and not full else (None, None)
+    accumulator = SentimentAccumulator(state)
+    keys = []
+    tmp_scored = scored_path.with_name(f"{scored_path.name}.tmp{os.getpid()}")
+    tmp_scored.parent.mkdir(parents=True, exist_ok=True)
+    if tmp_scored.exists():
+        tmp_scored.unlink()
+
+    # Incremental: news_scored conserva las noticias ya puntuadas que siguen en news_raw
+    # (mismo recorte que la ventana de noticias) y el lote nuevo se agrega después
+    columns = None
+    if save and seen is not None and scored_path.exists():
+        raw_keys = news_keys(ParquetFile(str(input_path)).to_pandas(columns=['ticker', 'id']))
+        columns = ParquetFile(str(scored_path)).columns
+        for old in iter_news_batches(scored_path, batch_size, columns=columns):
+            old_keys = news_keys(old)
+            old = old[old_keys.isin(seen) & old_keys.isin(raw_keys)]
+            if len(old):
+                old.to_parquet(tmp_scored, engine='fastparquet', compression='snappy', index=False,
+                               append=tmp_scored.exists())
+
+    start = time.perf_counter()
+    total = 0
+    with SentimentCache() as cache:
+        for b, batch in enumerate(iter_news_batches(input_path, batch_size)):
+            keys.append(batch[['ticker', 'id']])
+            if seen is not None:
+                batch = batch[~news_keys(batch).isin(seen)]
+            scored = score_batch(clean_news_batch(batch), cache)
+            accumulator.update(scored)
+            if save and len(scored):
+                scored = scored.reindex(columns=columns) if columns else scored
+                scored.to_parquet(tmp_scored, engine='fastparquet', compression='snappy', index=False,
+                                  append=tmp_scored.exists())
+            total += len(batch)
+            logger.info(f"   Lote {b + 1}: {total} noticias nuevas procesadas ({time.perf_counter() - start:.1f}s)")
+
+    if save and tmp_scored.exists():
+        os.replace(tmp_scored, scored_path)
+        logger.info(f"Noticias puntuadas guardadas en: {scored_path}")
+
+    daily_sentiment = accumulator.result()
+    daily_sentiment.to_parquet(output_path, engine='fastparquet', compression='snappy')
+    save_sentiment_state(accumulator.state, pd.concat(keys) if keys else pd.DataFrame({'ticker': [], 'id': []}))
+    logger.info(f"Sentimiento diario guardado en: {output_path} ({daily_sentiment.shape})")
+    return daily_sentiment
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Limpieza + FinBERT + agregado diario en streaming")
+    parser.add_argument("--batch-size", type=int, default=None, help="Filas por lote (Config.NEWS_STREAM_BATCH_SIZE)")
+    parser.add_argument("--no-checkpoint", action="store_true", help="No escribir news_scored.parquet")
+    parser.add_argument("--full", action="store_true", help="Ignorar el estado guardado y reagregar todas las noticias")
+    args = parser.parse_args()
+    run_streaming_sentiment(batch_size=args.batch_size, save=not args.no_checkpoint, full=args.full)
@@ -0,0 +1,123 @@
+import logging
+import numpy as np
+import pandas as pd
+from src.config import Config
+from src.data.feature_store import load_store, open_feature_store, write_matrices
+from src.data.market_matrix import load_market_bundle
+from src.utils.explainer import classify_signals, render_narrative, TEMPLATE_STATUS
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Matrices fecha x ticker que persiste el motor
+ALPHA_FIELDS = ('close', 'tech_score', 'sentiment_score', 'alpha_score', 'template_id')
+
+def compute_alpha_matrices(bundle, impact_factor):
+    """
+    Alpha Score para TODAS las fechas y tickers de una vez:
+    Alpha = (Spread técnico entre EMAs) + (Sentimiento suavizado * IMPACT_FACTOR).
+    Devuelve {campo: matriz fecha x ticker} incluyendo el ID de plantilla de narrativa.
+    """
+    close = bundle['close'].to_numpy()
+    tech_score = bundle['tech_score'].to_numpy()
+    sentiment = bundle['sentiment_smooth'].to_numpy()
+
+    alpha_score = tech_score + sentiment * impact_factor
+    template_id = classify_signals(tech_score, sentiment, alpha_score).astype(np.int8)
+
+    return {
+        'close': close, 'tech_score': tech_score, 'sentiment_score': sentiment,
+        'alpha_score': alpha_score, 'template_id': template_id,
+    }
+
+def load_alpha_store(impact_factor=None, smooth_window=None):
+    """
+    Abre el store de Alpha (matrices fecha x ticker, memory-map) y lo recalcula solo si
+    cambió el dataset maestro o los parámetros. Devuelve None si no hay features_master.
+    """
+    impact_factor = Config.IMPACT_FACTOR if impact_factor is None else impact_factor
+    smooth_window = smooth_window or Config.SENTIMENT_SMOOTH_WINDOW
+
+    bundle = load_market_bundle(smooth_window)
+    if bundle is None:
+        return None
+
+    path = Config.FEATURE_STORE_DIR / "alpha"
+    version = {
+        "source": open_feature_store("master", rebuild=False).source_version,
+        "impact_factor": impact_factor,
+        "smooth_window": smooth_window,
+    }
+    store = load_store(path)
+
+    if store is None or store.source_version != version:
+        logger.info(f"Calculando Alpha Score histórico (impacto = {impact_factor}, ventana = {smooth_window})...")
+        matrices = compute_alpha_matrices(bundle, impact_factor)
+        close = bundle['close']
+        store = write_matrices(path, close.index.values, close.columns, matrices, version=version)
+    return store
+
+def build_signal_table(store, date=None):
+    """
+    Señales de todo el universo para una fecha (por defecto la última) leídas del store de Alpha.
+    Devuelve una tabla columnar (un ticker por fila) con el ID de plantilla de narrativa;
+    el texto se arma después con attach_narratives() solo si se va a publicar.
+    """
+    if date is None:
+        row = len(store.dates) - 1
+    else:
+        # Última fecha disponible en o antes de `date`
+        row = np.searchsorted(store.dates, np.datetime64(pd.Timestamp(date)), side='right') - 1
+    if row < 0:
+        raise ValueError(f"No hay datos de Alpha en o antes de {date}")
+    rows = slice(row, row + 1)
+
+    close, tech_score, sentiment, alpha_score, template_id = (store.matrix(name)[rows][0] for name in ALPHA_FIELDS)
+    template_id = template_id.astype(np.intp)
+
+    table = pd.DataFrame({
+        "ticker": store.tickers,
+        "date": str(pd.Timestamp(store.dates[row]).date()),
+        "close_price": close.round(2),
+        "tech_score": tech_score.round(5),
+        "sentiment_score": sentiment.round(4),
+        "alpha_score": alpha_score.round(5),
+        "signal": TEMPLATE_STATUS[template_id],
+        "template_id": template_id,
+    })
+    # Sin precio no hay señal
+    return table[~np.isnan(close)].reset_index(drop=True)
+
+def attach_narratives(table):
+    """Agrega la columna 'narrative' (texto de la plantilla) a una tabla de señales."""
+    narratives = [render_narrative(t, i)[1] for t, i in zip(table['ticker'], table['template_id'])]
+    return table.assign(narrative=narratives)
+
+def signal_history(store, tickers=None, start=None, end=None):
+    """
+    Historial de señales como tabla larga (date, ticker, scores, signal): es un corte
+    del store, no un recálculo.
+    """
+    frames = {name: store.frame(name, tickers=tickers, start=start, end=end) for name in ALPHA_FIELDS}
+    close = frames['close'].to_numpy()
+
+    # Solo las celdas con precio (mismo criterio que build_signal_table)
+    date_pos, ticker_pos = np.nonzero(~np.isnan(close))
+    history = pd.DataFrame({
+        "date": frames['close'].index[date_pos],
+        "ticker": frames['close'].columns[ticker_pos],
+    })
+    for name in ALPHA_FIELDS:
+        history[name] = frames[name].to_numpy()[date_pos, ticker_pos]
+
+    history['template_id'] = history['template_id'].astype(np.intp)
+    history['signal'] = TEMPLATE_STATUS[history['template_id'].to_numpy()]
+    return history
+
+if __name__ == "__main__":
+    store = load_alpha_store()
+    if store is None:
+        logger.error("No encontré features_master: no hay Alpha que calcular.")
+    else:
+        print(build_signal_table(store).drop(columns='template_id').to_string(index=False))
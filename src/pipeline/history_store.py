@@ -0,0 +1,191 @@
+import sqlite3
+import logging
+import numpy as np
+import pandas as pd
+from src.config import Config
+from src.pipeline.alpha_engine import signal_history
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Columnas numéricas que se pueden graficar
+HISTORY_FIELDS = ('close', 'tech_score', 'sentiment_score', 'alpha_score')
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
+class SignalHistory:
+    """
+    Historial de señales (SQLite): una fila por (ticker, date) con precio, scores y señal.
+    La llave primaria (ticker, date) en una tabla WITHOUT ROWID deja las filas de cada ticker
+    contiguas y ordenadas por fecha, así que una serie de 5 años es un solo rango del índice.
+    """
+
+    def __init__(self, path=None, readonly=False):
+        self.path = path or Config.SIGNAL_HISTORY_PATH
+        if readonly:
+            self.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " ticker TEXT NOT NULL, date TEXT NOT NULL,"
+            " close REAL, tech_score REAL, sentiment_score REAL, alpha_score REAL,"
+            " signal TEXT, run_version INTEGER,"
+            " PRIMARY KEY (ticker, date)) WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def last_dates(self):
+        """{ticker: última fecha guardada}. Con la llave (ticker, date) es un salto por ticker en el índice."""
+        return dict(self.conn.execute("SELECT ticker, MAX(date) FROM history GROUP BY ticker").fetchall())
+
+    def append(self, table, run_version=None):
+        """Agrega (o reemplaza, si ya existía la fecha) las filas de una tabla larga de señales."""
+        dates = pd.to_datetime(table['date']).dt.strftime('%Y-%m-%d')
+        rows = zip(
+            table['ticker'], dates,
+            *(table[f].astype(object).where(table[f].notna(), None) for f in HISTORY_FIELDS),
+            table['signal'], [run_version] * len(table),
+        )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO history (ticker, date, close, tech_score, sentiment_score, alpha_score, signal, run_version)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        self.conn.commit()
+        return len(table)
+
+    def series(self, ticker, start=None, end=None, fields=HISTORY_FIELDS):
+        """(fechas 'YYYY-MM-DD', {campo: np.array}) de un ticker entre start y end (inclusive)."""
+        fields = [f for f in fields if f in HISTORY_FIELDS]
+        rows = self.conn.execute(
+            f"SELECT date, {', '.join(fields)} FROM history"
+            " WHERE ticker = ? AND date >= ? AND date <= ? ORDER BY date",
+            (ticker, start or "0000-00-00", end or "9999-99-99")
+        ).fetchall()
+        if not rows:
+            return [], {f: np.empty(0) for f in fields}
+        columns = list(zip(*rows))
+        return list(columns[0]), {f: np.array(col, dtype='float64') for f, col in zip(fields, columns[1:])}
+
+def record_run(alpha_store, run_version=None, path=None):
+    """
+    Guarda en el historial lo que trae el Alpha store desde la última fecha registrada de cada
+    ticker (incluida: la vela del último día pudo cambiar). Un ticker sin filas, sea la primera
+    corrida o un ticker nuevo en el universo, carga toda su historia.
+    """
+    with SignalHistory(path) as history:
+        last = history.last_dates()
+        # Los tickers que comparten la misma última fecha se piden juntos (normalmente todos)
+        groups = {}
+        for ticker in alpha_store.tickers:
+            groups.setdefault(last.get(ticker), []).append(ticker)
+
+        n = 0
+        for start, tickers in groups.items():
+            table = signal_history(alpha_store, tickers=tickers, start=pd.Timestamp(start) if start else None)
+            n += history.append(table, run_version)
+    backfilled = len(groups.get(None, []))
+    logger.info(f"Historial de señales: {n} filas registradas"
+                f"{f' ({backfilled} tickers con carga inicial)' if backfilled else ''}.")
+    return n
+
+# DOWNSAMPLING (para gráficas: N puntos que conservan la forma de la serie)
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: índices de `n_out` puntos de (x, y) que conservan
+    los picos y valles visibles. Siempre incluye el primero y el último.
+    """
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Promedio del siguiente bucket (o el último punto)
+        nlo, nhi = edges[b + 1], (edges[b + 2] if b + 2 < len(edges) else n)
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        # Área del triángulo (punto anterior, candidato, promedio siguiente)
+        area = np.abs((x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev]))
+        prev = lo + int(np.argmax(area))
+        selected[b + 1] = prev
+    return selected
+
+def minmax_buckets(y, n_out):
+    """
+    Mínimo y máximo de cada bucket ((n_out - 2) // 2 buckets) más el primero y el último punto:
+    no se pierde ningún extremo y la gráfica cubre todo el rango de fechas.
+    """
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    edges = np.linspace(0, n, max((n_out - 2) // 2, 1) + 1).astype(np.intp)
+    picks = [0, n - 1]
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi > lo:
+            picks += [lo + int(np.argmin(y[lo:hi])), lo + int(np.argmax(y[lo:hi]))]
+    return np.unique(picks)
+
+def downsample(dates, values, points, method='lttb'):
+    """
+    Índices a conservar para que ninguna serie supere `points` puntos en total.
+    Con varios campos, cada uno elige su parte del presupuesto y se unen las selecciones.
+    """
+    n = len(dates)
+    if points is None or n <= points:
+        return np.arange(n)
+    x = pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]').astype('float64')
+    budget = max(points // max(len(values), 1), 3)
+
+    keep = []
+    for y in values.values():
+        valid = np.flatnonzero(~np.isnan(y))
+        if len(valid) == 0:
+            continue
+        idx = lttb(x[valid], y[valid], budget) if method == 'lttb' else minmax_buckets(y[valid], budget)
+        keep.append(valid[idx])
+    return np.unique(np.concatenate(keep)) if keep else np.arange(0)
+
+def query_series(ticker, start=None, end=None, points=None, fields=('close', 'alpha_score'), method='lttb', path=None):
+    """
+    Serie de un ticker para graficar: fechas + campos pedidos, reducida en el servidor a
+    `points` puntos como máximo (Config.HISTORY_MAX_POINTS). Devuelve un dict listo para JSON.
+    """
+    points = min(points or Config.HISTORY_DEFAULT_POINTS, Config.HISTORY_MAX_POINTS)
+    with SignalHistory(path, readonly=True) as history:
+        dates, values = history.series(ticker, start, end, fields)
+
+    idx = downsample(dates, values, points, method)
+    return {
+        'ticker': ticker,
+        'method': method,
+        'total': len(dates),
+        'points': len(idx),
+        'dates': [dates[i] for i in idx],
+        **{f: [None if np.isnan(v) else float(v) for v in values[f][idx]] for f in values},
+    }
+
+if __name__ == "__main__":
+    from src.pipeline.alpha_engine import load_alpha_store
+    store = load_alpha_store()
+    if store is None:
+        logger.error("No encontré features_master: no hay historial que registrar.")
+    else:
+        record_run(store)
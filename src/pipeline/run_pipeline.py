@@ -1,11 +1,17 @@
 import sys
+import runpy
+import argparse
+import importlib
 import subprocess
 import logging
 from datetime import date
 from src.config import Config
-from src.utils.explainer import generate_narrative
+from src.pipeline.scheduler import run_dag, run_sequential, log_timing_report
+from src.pipeline.alpha_engine import load_alpha_store, build_signal_table, attach_narratives
+from src.pipeline.signal_snapshot import publish_signals, published_version
+from src.pipeline.signal_events import publish_event
+from src.pipeline.history_store import record_run
 import pandas as pd
-import json
 
 # Configuración de Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,39 +27,112 @@ def run_step(module_name):
         logger.error(f"FALLÓ {module_name}. El pipeline se detendrá.")
         sys.exit(1)
 
-def run_full_cycle():
-    
-    today = str(date.today())
-    logger.info(f"BUBO INICIANDO PROTOCOLO (Full Stack FinBERT) - FECHA: {today}")
+# GRAFO DEL PIPELINE (FASE 1)
+# Cada etapa declara qué datasets lee y cuáles escribe; las dependencias salen de ahí.
+# La rama de precios y la de noticias no se tocan hasta merge_data.
+if Config.INGEST_ASYNC:
+    # BAJAR PRECIOS Y NOTICIAS a la vez (asyncio + pool de conexiones por proveedor)
+    INGEST_STAGES = [{"module": "src.data.ingest_async", "inputs": [], "outputs": ["prices_5y", "news_raw"]}]
+else:
+    INGEST_STAGES = [
+        # BAJAR PRECIOS (Actualiza hasta hoy)
+        {"module": "src.data.ingest_prices", "inputs": [], "outputs": ["prices_5y"]},
+        # BAJAR NOTICIAS
+        {"module": "src.data.ingest_news", "inputs": [], "outputs": ["news_raw"]},
+    ]
+
+if Config.NEWS_STREAMING:
+    # LIMPIAR + FINBERT + AGREGAR en streaming (lotes de NEWS_STREAM_BATCH_SIZE, memoria acotada)
+    NEWS_STAGES = [{"module": "src.nlp.stream_sentiment", "inputs": ["news_raw"], "outputs": ["news_scored", "features_sentiment"]}]
+else:
+    NEWS_STAGES = [
+        # LIMPIAR NOTICIAS
+        {"module": "src.data.clean_news", "inputs": ["news_raw"], "outputs": ["news_clean"]},
+        # CALCULAR SENTIMIENTO (FinBERT). Si falla seguimos con el news_scored que haya en disco.
+        {"module": "src.nlp.finbert_score", "inputs": ["news_clean"], "outputs": ["news_scored"], "optional": True},
+        # AGREGAR SENTIMIENTO (Diario)
+        {"module": "src.nlp.aggregate_sentiment", "inputs": ["news_scored"], "outputs": ["features_sentiment"]},
+    ]
+
+PIPELINE_DAG = INGEST_STAGES + NEWS_STAGES + [
+    # CALCULAR INDICADORES TÉCNICOS
+    {"module": "src.tech.indicators", "inputs": ["prices_5y"], "outputs": ["features_technical"]},
+    # UNIFICAR DATASET (MERGE)
+    {"module": "src.data.merge_data", "inputs": ["features_technical", "features_sentiment"], "outputs": ["features_master"]},
+    # MATRICES FECHA x TICKER (memory-map) para señales y backtests
+    {"module": "src.data.feature_store", "inputs": ["features_master", "features_technical"], "outputs": ["feature_store"]},
+]
+
+# MODO EN-PROCESO
+# Etapas que exponen una función: módulo -> (función, etapa que le entrega su DataFrame en memoria).
+# El resto (src.data.*) se ejecuta con runpy dentro del mismo intérprete.
+STAGE_FUNCTIONS = {
+    "src.nlp.finbert_score": ("run_finbert_pipeline", None),
+    "src.nlp.aggregate_sentiment": ("aggregate_daily_sentiment", "src.nlp.finbert_score"),
+    "src.tech.indicators": ("build_technical_features", None),
+    "src.nlp.stream_sentiment": ("run_streaming_sentiment", None),
+}
+
+def run_step_inprocess(module_name, results, checkpoints=False):
+    """
+    Ejecuta una etapa en este mismo proceso (sin arrancar otro intérprete ni re-importar torch/pandas).
+    Los DataFrames se pasan entre etapas a través de `results`; el parquet intermedio solo se escribe
+    si otra etapa lo lee de disco o si se pidieron checkpoints.
+    """
+    logger.info(f"▶️ Ejecutando (en-proceso): {module_name}...")
+    try:
+        if module_name in STAGE_FUNCTIONS:
+            func_name, upstream = STAGE_FUNCTIONS[module_name]
+            func = getattr(importlib.import_module(module_name), func_name)
+
+            # Si alguna etapa consume esta salida en memoria, el parquet es opcional
+            consumed_in_memory = any(up == module_name for _, up in STAGE_FUNCTIONS.values())
+            kwargs = {"save": checkpoints or not consumed_in_memory}
+            if results.get(upstream) is not None:
+                kwargs["df"] = results[upstream]
+
+            results[module_name] = func(**kwargs)
+        else:
+            runpy.run_module(module_name, run_name="__main__")
+        logger.info(f"{module_name} OK.")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            logger.error(f"FALLÓ {module_name}. El pipeline se detendrá.")
+            sys.exit(1)
+    except Exception:
+        logger.exception(f"FALLÓ {module_name}. El pipeline se detendrá.")
+        sys.exit(1)
 
-    
-    # BAJAR PRECIOS (Actualiza hasta hoy)
-    run_step("src.data.ingest_prices")
-    
-    # BAJAR NOTICIAS
-    run_step("src.data.ingest_news")
-    
-    # LIMPIAR NOTICIAS
-    run_step("src.data.clean_news")
-    
-    # CALCULAR SENTIMIENTO (FinBERT) <-- PASO CRÍTICO QUE FALTABA
-    # Ajusta la ruta si está en src.sentiment en lugar de src.data
+def execute_stage_isolated(module_name):
+    """
+    Etapa ejecutada dentro de un worker del pool (modo parallel).
+    Entre procesos no hay DataFrames compartidos: cada etapa escribe su parquet.
+    """
     try:
-        run_step("src.nlp.finbert_score") 
+        run_step_inprocess(module_name, {}, checkpoints=True)
     except SystemExit:
-        # Fallback por si lo tienes en otra carpeta común
-        logger.warning("No encontrado")
-        
+        raise RuntimeError(f"{module_name} terminó con error")
 
-    #AGREGAR SENTIMIENTO (Diario) <-- PASO CRÍTICO QUE FALTABA
-    run_step("src.nlp.aggregate_sentiment")
-    
-    #CALCULAR INDICADORES TÉCNICOS
-    run_step("src.tech.indicators")
+def run_full_cycle(mode=None, checkpoints=False, workers=None):
     
-    #UNIFICAR DATASET (MERGE)
-    run_step("src.data.merge_data")
+    mode = mode or Config.PIPELINE_MODE
+    today = str(date.today())
+    logger.info(f"BUBO INICIANDO PROTOCOLO (Full Stack FinBERT) - FECHA: {today} - MODO: {mode}")
 
+    if mode == "parallel":
+        # Ramas independientes a la vez: el ciclo dura lo que la rama más larga
+        try:
+            timings = run_dag(PIPELINE_DAG, execute_stage_isolated, max_workers=workers or Config.PIPELINE_WORKERS)
+        except RuntimeError as e:
+            logger.error(f"{e}. El pipeline se detendrá.")
+            sys.exit(1)
+    elif mode == "inprocess":
+        results = {}
+        timings = run_sequential(PIPELINE_DAG, lambda module_name: run_step_inprocess(module_name, results, checkpoints))
+    else:
+        timings = run_sequential(PIPELINE_DAG, run_step)
+
+    log_timing_report(PIPELINE_DAG, timings)
     logger.info("FASE 1 COMPLETADA: Datos procesados con FinBERT.")
 
  
@@ -68,65 +147,39 @@ def run_full_cycle():
         logger.error(" No encontré features_master.parquet.")
         return
 
-    # Cargar Dataset Maestro
-    df = pd.read_parquet(input_path)
-    
-    # Pivot y Forward Fill
-    df_pivot = df.pivot(index='date', columns='ticker', values=['close', 'ema_fast', 'ema_slow', 'sentiment_avg'])
-    df_pivot = df_pivot.ffill()
-    
-    # Sentimiento Suavizado (Memoria de 7 días)
-    sentiment_filled = df_pivot['sentiment_avg'].fillna(0.0)
-    sentiment_smooth = sentiment_filled.rolling(window=7).mean()
+    # Alpha Score histórico (fecha x ticker), calculado una vez por versión de datos.
+    # La señal del dashboard es solo la última fila.
+    alpha = load_alpha_store()
 
     # OBTENER LA ÚLTIMA FECHA REAL
-    last_idx = df_pivot.index[-1]
-    last_date = str(last_idx.date())
+    last_date = str(pd.Timestamp(alpha.dates[-1]).date())
     
     logger.info(f"Fecha de análisis encontrada: {last_date}")
-    
-    results = []
-    tickers = df_pivot['close'].columns
-    IMPACT_FACTOR = 0.7
 
-    for ticker in tickers:
-        try:
-            close = df_pivot['close'][ticker].iloc[-1]
-            ema_fast = df_pivot['ema_fast'][ticker].iloc[-1]
-            ema_slow = df_pivot['ema_slow'][ticker].iloc[-1]
-            sentiment = sentiment_smooth[ticker].iloc[-1]
-            
-            if pd.isna(close): continue
-
-            # Alpha Score
-            tech_score = (ema_fast - ema_slow) / close
-            fund_score = sentiment * IMPACT_FACTOR
-            alpha_score = tech_score + fund_score
-
-            # Narrativa
-            status, explanation = generate_narrative(ticker, tech_score, sentiment, alpha_score)
-
-            results.append({
-                "ticker": ticker,
-                "date": last_date,
-                "close_price": round(close, 2),
-                "tech_score": round(tech_score, 5),
-                "sentiment_score": round(sentiment, 4),
-                "alpha_score": round(alpha_score, 5),
-                "signal": status,
-                "narrative": explanation
-            })
-            
-            logger.info(f"   🦉 {ticker}: {status}")
-
-        except Exception as e:
-            logger.warning(f"Error procesando {ticker}: {e}")
-
-    # PUBLICACIÓN
-    with open(output_json, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=4, ensure_ascii=False)
-        
+    signals = attach_narratives(build_signal_table(alpha))
+
+    for ticker, status in zip(signals['ticker'], signals['signal']):
+        logger.info(f"   🦉 {ticker}: {status}")
+    results = signals.drop(columns='template_id').to_dict('records')
+
+    # PUBLICACIÓN (atómica: el dashboard nunca ve el JSON a medias)
+    previous_version = published_version(output_json)
+    published = publish_signals(results, output_json)
+    # Aviso a los clientes conectados por SSE (versión + tickers que cambiaron); None si nada cambió
+    event = publish_event(published, previous_version)
+    # Historial (ticker, fecha) para las gráficas: solo las fechas nuevas desde la última corrida
+    record_run(alpha, run_version=event['version'] if event else previous_version)
+
     logger.info(f"CICLO COMPLETADO. Dashboard actualizado: {output_json}")
 
 if __name__ == "__main__":
-    run_full_cycle()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pipeline diario de Bubo Alpha")
+    parser.add_argument("--mode", choices=["subprocess", "inprocess", "parallel"], default=Config.PIPELINE_MODE,
+                        help="subprocess: un intérprete por etapa (aislamiento). inprocess: todo en un proceso, DataFrames en memoria. "
+                             "parallel: ramas independientes del grafo a la vez en un pool de procesos.")
+    parser.add_argument("--checkpoints", action="store_true",
+                        help="En modo inprocess, escribir también los parquet intermedios que no lee nadie de disco.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos del pool en modo parallel (por defecto Config.PIPELINE_WORKERS).")
+    args = parser.parse_args()
+    run_full_cycle(mode=args.mode, checkpoints=args.checkpoints, workers=args.workers)
\ No newline at end of file
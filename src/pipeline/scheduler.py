@@ -0,0 +1,134 @@
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def resolve_dependencies(stages):
+    """
+    Calcula de qué etapas depende cada una a partir de sus entradas/salidas declaradas.
+    Devuelve {módulo: set(módulos de los que depende)}.
+    """
+    producers = {}
+    for stage in stages:
+        for output in stage["outputs"]:
+            if output in producers:
+                raise ValueError(f"La salida '{output}' la producen dos etapas: {producers[output]} y {stage['module']}")
+            producers[output] = stage["module"]
+
+    # Entradas sin productor son datos externos (ya en disco)
+    return {
+        stage["module"]: {producers[i] for i in stage["inputs"] if i in producers}
+        for stage in stages
+    }
+
+def topological_order(stages):
+    """
+    Orden de ejecución secuencial que respeta las dependencias (falla si hay ciclos).
+    Entre las etapas listas se respeta el orden en que fueron declaradas.
+    """
+    deps = resolve_dependencies(stages)
+    done, order = set(), []
+    while len(order) < len(stages):
+        ready = next((s["module"] for s in stages if s["module"] not in done and deps[s["module"]] <= done), None)
+        if ready is None:
+            raise ValueError(f"Ciclo de dependencias entre: {sorted(set(deps) - done)}")
+        done.add(ready)
+        order.append(ready)
+    return order
+
+def run_sequential(stages, execute):
+    """
+    Ejecuta las etapas una tras otra en orden topológico.
+    `execute(módulo)` corre la etapa; las marcadas `optional` pueden fallar sin detener el ciclo.
+    Devuelve {módulo: (inicio, fin)} en segundos relativos al arranque.
+    """
+    optional = {s["module"] for s in stages if s.get("optional")}
+    timings = {}
+    t0 = time.perf_counter()
+
+    for module in topological_order(stages):
+        start = time.perf_counter() - t0
+        try:
+            execute(module)
+        except SystemExit:
+            if module not in optional:
+                raise
+            logger.warning(f"Etapa opcional {module} falló; se continúa con lo que haya en disco.")
+        timings[module] = (start, time.perf_counter() - t0)
+
+    return timings
+
+def run_dag(stages, execute, max_workers=None):
+    """
+    Ejecuta el grafo en un pool de procesos: cada etapa arranca en cuanto terminan las etapas
+    de las que depende, así que las ramas independientes (precios vs noticias) corren a la vez.
+    `execute(módulo)` debe ser una función de nivel de módulo (se envía a otro proceso).
+    Devuelve {módulo: (inicio, fin)} en segundos relativos al arranque.
+    """
+    deps = resolve_dependencies(stages)
+    optional = {s["module"] for s in stages if s.get("optional")}
+    pending = [s["module"] for s in stages]
+    done, running, timings = set(), {}, {}
+    t0 = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            # Lanzar todo lo que ya tiene sus dependencias listas
+            for module in [m for m in pending if deps[m] <= done]:
+                pending.remove(module)
+                logger.info(f"⏩ Lanzando {module} (en paralelo con: {sorted(m for m in running.values()) or '-'})")
+                running[pool.submit(execute, module)] = module
+                timings[module] = (time.perf_counter() - t0, None)
+
+            if not running:
+                raise ValueError(f"Ciclo de dependencias entre: {sorted(pending)}")
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                module = running.pop(future)
+                timings[module] = (timings[module][0], time.perf_counter() - t0)
+                try:
+                    future.result()
+                except Exception as e:
+                    if module not in optional:
+                        for other in running:
+                            other.cancel()
+                        raise RuntimeError(f"FALLÓ {module}: {e}") from e
+                    logger.warning(f"Etapa opcional {module} falló ({e}); se continúa con lo que haya en disco.")
+                done.add(module)
+
+    return timings
+
+def critical_path(stages, timings):
+    """
+    Camino más largo del grafo usando la duración real de cada etapa.
+    Es el piso del tiempo de ciclo: acelerar cualquier otra etapa no lo reduce.
+    Devuelve (lista de módulos, segundos).
+    """
+    deps = resolve_dependencies(stages)
+    duration = {m: end - start for m, (start, end) in timings.items()}
+    best = {}
+
+    for module in topological_order(stages):
+        prev = max(deps[module], key=lambda m: best[m][1], default=None)
+        path, total = best[prev] if prev else ([], 0.0)
+        best[module] = (path + [module], total + duration.get(module, 0.0))
+
+    return max(best.values(), key=lambda item: item[1])
+
+def log_timing_report(stages, timings):
+    """Imprime el tiempo de cada etapa y el camino crítico del ciclo."""
+    wall = max(end for _, end in timings.values())
+    total = sum(end - start for start, end in timings.values())
+    path, path_time = critical_path(stages, timings)
+
+    logger.info("⏱️ TIEMPOS POR ETAPA:")
+    for module, (start, end) in sorted(timings.items(), key=lambda item: item[1][0]):
+        mark = "*" if module in path else " "
+        logger.info(f"   {mark} {module:<30} {end - start:8.2f}s  (inicio +{start:.2f}s)")
+
+    logger.info(f"Camino crítico ({path_time:.2f}s): {' -> '.join(path)}")
+    logger.info(f"Tiempo total: {wall:.2f}s | Suma de etapas: {total:.2f}s")
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+from src.config import Config
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# CANAL LOCAL DE EVENTOS
+# El pipeline agrega una línea JSON por publicación a signal_events.jsonl; cada proceso del
+# servidor web vigila el archivo (un solo hilo por proceso) y reparte el evento a sus clientes SSE.
+# Un archivo sirve para varios workers a la vez, cosa que un socket Unix no haría sin un intermediario.
+
+def events_path():
+    return Config.DATA_PROCESSED / "signal_events.jsonl"
+
+def publish_event(published, previous_version=0, path=None):
+    """
+    Evento "signals updated" tras publicar latest_signals.json: versión y tickers que cambiaron en ella.
+    Si ninguna señal trae la versión nueva (`previous_version` + 1) la corrida no cambió nada:
+    no se publica evento y se devuelve None.
+    Se agrega con una sola escritura O_APPEND (una línea corta no se intercala con otras).
+    """
+    path = path or events_path()
+    version = max((s.get('version', 0) for s in published), default=0)
+    if version <= previous_version:
+        logger.info(f"Sin señales nuevas (versión {previous_version}): no se publica evento.")
+        return None
+    event = {
+        'version': version,
+        'changed': [s['ticker'] for s in published if s.get('version') == version],
+        'published_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+    # El log se recorta para que no crezca sin límite; los lectores detectan el recorte por tamaño
+    if path.exists() and path.stat().st_size > Config.SSE_EVENT_LOG_MAX_BYTES:
+        tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+    else:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (json.dumps(event, ensure_ascii=False) + "\n").encode('utf-8'))
+        finally:
+            os.close(fd)
+
+    logger.info(f"Evento publicado: versión {version}, {len(event['changed'])} tickers cambiaron.")
+    return event
+
+class SignalBroadcaster:
+    """
+    Vigila el log de eventos y reparte cada evento nuevo a las colas de los clientes suscritos.
+    El hilo vigía arranca con el primer suscriptor; cada cliente tiene su propia cola acotada
+    (si un cliente lento la llena, pierde eventos viejos en vez de frenar a los demás).
+    """
+
+    def __init__(self, path=None, poll_seconds=None):
+        self.path = path or events_path()
+        self.poll_seconds = poll_seconds or Config.SSE_POLL_SECONDS
+        self.subscribers = set()
+        self.last_version = 0
+        self._offset = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=Config.SSE_QUEUE_SIZE)
+        with self._lock:
+            self.subscribers.add(q)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch, name="signal-events", daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self.subscribers.discard(q)
+
+    def _read_new_events(self):
+        try:
+            size = os.stat(self.path).st_size
+        except FileNotFoundError:
+            return []
+        if self._offset is None:
+            # Al arrancar no se reenvía la historia: solo lo que llegue de aquí en adelante
+            self._offset = size
+            return []
+        if size < self._offset:
+            # El log fue recortado: releemos desde el inicio y filtramos por versión
+            self._offset = 0
+        if size == self._offset:
+            return []
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        # Solo líneas completas (la última puede estar a medio escribir)
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        self._offset += len(complete)
+
+        events = []
+        for line in complete.splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event.get('version', 0) > self.last_version:
+                events.append(event)
+        return events
+
+    def _broadcast(self, event):
+        self.last_version = event['version']
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                q.put_nowait(event)
+
+    def _watch(self):
+        while True:
+            try:
+                for event in self._read_new_events():
+                    self._broadcast(event)
+            except OSError as e:
+                logger.warning(f"No pude leer {self.path.name}: {e}")
+            time.sleep(self.poll_seconds)
+
+def format_sse(data, event=None, event_id=None):
+    """Un mensaje en formato text/event-stream."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
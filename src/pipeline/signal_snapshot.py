@@ -0,0 +1,272 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from functools import lru_cache
+from src.config import Config
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def signals_path():
+    return Config.DATA_PROCESSED / "latest_signals.json"
+
+def columns_path():
+    return Config.DATA_PROCESSED / "latest_signals.npy"
+
+# FORMATO COLUMNAR (latest_signals.npy)
+# Un arreglo estructurado de NumPy, una fila por ticker: textos en UTF-8 de ancho fijo,
+# números en float64 y 'version' en int64. Los workers del servidor lo abren con mmap:
+# todos comparten las mismas páginas del sistema operativo y nadie parsea JSON.
+
+def _column_dtype(key, values):
+    if key == 'version' or (values and all(isinstance(v, int) and not isinstance(v, bool) for v in values)):
+        return 'i8'
+    if all(v is None or isinstance(v, (int, float)) for v in values):
+        return 'f8'
+    width = max((len(str(v).encode('utf-8')) for v in values if v is not None), default=1)
+    return f'S{max(width, 1)}'
+
+def write_signal_columns(results, path=None):
+    """Escribe latest_signals.npy de forma atómica (temporal + os.replace)."""
+    path = path or columns_path()
+    keys = list(dict.fromkeys(k for r in results for k in r)) or ['ticker']
+    dtype = [(k, _column_dtype(k, [r.get(k) for r in results])) for k in keys]
+    table = np.zeros(len(results), dtype=dtype)
+    for key, kind in dtype:
+        values = [r.get(key) for r in results]
+        if kind.startswith('S'):
+            table[key] = [b"" if v is None else str(v).encode('utf-8') for v in values]
+        else:
+            table[key] = [np.nan if v is None else v for v in values] if kind == 'f8' else [v or 0 for v in values]
+
+    tmp_path = path.with_name(f"{path.stem}.tmp{os.getpid()}{path.suffix}")
+    np.save(tmp_path, table, allow_pickle=False)
+    os.replace(tmp_path, path)
+    return path
+
+def _read_signals(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+def published_version(path=None):
+    """Versión de la publicación vigente (0 si todavía no hay señales publicadas)."""
+    return max((s.get('version', 0) for s in _read_signals(path or signals_path())), default=0)
+
+def stamp_versions(results, previous):
+    """
+    Cada señal lleva 'version': la publicación en la que cambió por última vez.
+    Las que quedaron idénticas a la publicación anterior conservan su versión; las demás
+    reciben la siguiente (máximo anterior + 1). Así `since=<version>` sabe qué cambió.
+    """
+    prev = {s['ticker']: s for s in previous}
+    next_version = max((s.get('version', 0) for s in previous), default=0) + 1
+
+    stamped = []
+    for signal in results:
+        signal = {k: v for k, v in signal.items() if k != 'version'}
+        old = prev.get(signal['ticker'])
+        unchanged = old is not None and {k: v for k, v in old.items() if k != 'version'} == signal
+        stamped.append({**signal, 'version': old.get('version', 0) if unchanged else next_version})
+    return stamped
+
+def publish_signals(results, path=None):
+    """
+    Publica las señales de forma atómica: se escriben en un archivo temporal y se
+    renombran encima del anterior, así el dashboard nunca lee un JSON a medias.
+    Devuelve las señales publicadas (con su 'version').
+    """
+    path = path or signals_path()
+    # Ida y vuelta por JSON para comparar con lo publicado en los mismos tipos (floats, strings)
+    results = stamp_versions(json.loads(json.dumps(results, ensure_ascii=False)), _read_signals(path))
+    # Primero el columnar (lo que leen los workers), luego el JSON (herramientas y modo simple)
+    write_signal_columns(results, path.with_suffix('.npy'))
+    tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return results
+
+@lru_cache(maxsize=4096)
+def parse_watchlist(watchlist):
+    """"AAPL, btc-usd" -> ('AAPL', 'BTC-USD'). Se memoriza: cada usuario repite la misma cadena en cada visita."""
+    return tuple(t.strip().upper() for t in (watchlist or "").split(',') if t.strip())
+
+class Snapshot:
+    """
+    Una versión inmutable de latest_signals.json: la lista original y un índice por ticker.
+    Las respuestas de la API ya serializadas se guardan aquí mismo (mueren con la versión).
+    """
+
+    def __init__(self, key, signals):
+        self.key = key
+        self._signals = signals
+        self.position = {s['ticker']: i for i, s in enumerate(signals)}
+        self.version = max((s.get('version', 0) for s in signals), default=0)
+        self._responses = OrderedDict()
+        self._responses_lock = threading.Lock()
+
+    @property
+    def signals(self):
+        return self._signals
+
+    def row(self, i):
+        return self._signals[i]
+
+    def select(self, tickers):
+        """Señales de `tickers` (búsqueda directa por ticker) en el orden del archivo."""
+        found = sorted(self.position[t] for t in set(tickers) if t in self.position)
+        return [self.row(i) for i in found]
+
+    def render(self, tickers=None, fields=None, exclude=(), since=None):
+        """
+        Respuesta JSON de la API: (cuerpo en bytes, ETag fuerte).
+        `tickers` filtra (None = todos), `fields`/`exclude` proyectan columnas (p. ej. quitar 'narrative')
+        y `since` deja solo las señales que cambiaron después de esa versión.
+        """
+        cache_key = (tickers, fields, exclude, since)
+        with self._responses_lock:
+            if cache_key in self._responses:
+                self._responses.move_to_end(cache_key)
+                return self._responses[cache_key]
+
+        signals = self.select(tickers) if tickers is not None else self.signals
+        if since is not None:
+            signals = [s for s in signals if s.get('version', 0) > since]
+        if fields or exclude:
+            keep = set(fields) | {'ticker'} if fields else None
+            signals = [{k: v for k, v in s.items() if (keep is None or k in keep) and k not in exclude} for s in signals]
+
+        body = json.dumps({'version': self.version, 'count': len(signals), 'signals': signals},
+                          ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        response = (body, hashlib.sha1(body).hexdigest())
+
+        with self._responses_lock:
+            self._responses[cache_key] = response
+            while len(self._responses) > Config.API_RESPONSE_CACHE_SIZE:
+                self._responses.popitem(last=False)
+        return response
+
+    def gzipped(self, body, etag):
+        """Cuerpo comprimido (también se guarda: lo piden los mismos clientes una y otra vez)."""
+        with self._responses_lock:
+            if ('gzip', etag) in self._responses:
+                return self._responses[('gzip', etag)]
+        compressed = gzip.compress(body, compresslevel=6)
+        with self._responses_lock:
+            self._responses[('gzip', etag)] = compressed
+        return compressed
+
+class MappedSnapshot(Snapshot):
+    """
+    Snapshot sobre latest_signals.npy abierto con mmap. Solo se decodifican los tickers
+    al abrir; cada fila se convierte a dict la primera vez que alguien la pide.
+    """
+
+    def __init__(self, key, table):
+        self.key = key
+        self._table = table
+        self._rows = {}
+        self._all = None
+        self.position = {t.decode('utf-8'): i for i, t in enumerate(table['ticker'])}
+        self.version = int(table['version'].max()) if 'version' in table.dtype.names and len(table) else 0
+        self._responses = OrderedDict()
+        self._responses_lock = threading.Lock()
+
+    def row(self, i):
+        row = self._rows.get(i)
+        if row is None:
+            record = self._table[i]
+            row = {}
+            for name in self._table.dtype.names:
+                value = record[name]
+                kind = self._table.dtype[name].kind
+                row[name] = value.decode('utf-8') if kind == 'S' else int(value) if kind == 'i' else float(value)
+            self._rows[i] = row
+        return row
+
+    @property
+    def signals(self):
+        if self._all is None:
+            self._all = [self.row(i) for i in range(len(self._table))]
+        return self._all
+
+EMPTY = Snapshot(None, [])
+
+def category_tickers(name):
+    """Tickers de una categoría de Config.TICKER_CATEGORIES; acepta el nombre sin emoji ("criptomonedas")."""
+    if name in Config.TICKER_CATEGORIES:
+        return tuple(Config.TICKER_CATEGORIES[name])
+    wanted = name.strip().lower()
+    for category, tickers in Config.TICKER_CATEGORIES.items():
+        if wanted and wanted in category.lower():
+            return tuple(tickers)
+    return None
+
+class SignalSnapshot:
+    """
+    Caché en memoria de latest_signals.json para el servidor web.
+    Cada petición solo hace un stat(): el archivo se vuelve a leer y parsear cuando cambian
+    su mtime o su tamaño. La recarga construye un Snapshot nuevo y lo publica con una sola
+    asignación, así que las peticiones concurrentes ven la versión vieja o la nueva, nunca una mezcla.
+    """
+
+    def __init__(self, path=None, mmap=None):
+        self.path = path or signals_path()
+        # Con Config.SIGNALS_MMAP se prefiere latest_signals.npy (compartido entre workers por mmap)
+        self.mmap = Config.SIGNALS_MMAP if mmap is None else mmap
+        self._snapshot = EMPTY
+        self._lock = threading.Lock()
+
+    def _source(self):
+        """(archivo a leer, llave mtime/tamaño) o (None, None) si no hay señales publicadas."""
+        candidates = ([self.path.with_suffix('.npy')] if self.mmap else []) + [self.path]
+        for path in candidates:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            return path, (path.suffix, st.st_mtime_ns, st.st_size)
+        return None, None
+
+    def _load(self, path, key):
+        if path.suffix == '.npy':
+            # El mapeo sigue válido aunque el pipeline reemplace el archivo (os.replace no toca el inodo viejo)
+            return MappedSnapshot(key, np.load(path, mmap_mode='r', allow_pickle=False))
+        with open(path, 'r', encoding='utf-8') as f:
+            return Snapshot(key, json.load(f))
+
+    def get(self):
+        path, key = self._source()
+        if key == self._snapshot.key:
+            return self._snapshot
+        if key is None:
+            return EMPTY
+
+        with self._lock:
+            # Otro hilo pudo recargar mientras esperábamos el lock
+            if key == self._snapshot.key:
+                return self._snapshot
+            try:
+                snapshot = self._load(path, key)
+            except (OSError, ValueError) as e:
+                # Archivo escrito sin publish_signals y leído a medias: seguimos con la versión anterior
+                logger.warning(f"No pude recargar {path.name} ({e}); se mantiene la versión anterior.")
+                return self._snapshot
+            self._snapshot = snapshot
+            logger.info(f"Señales recargadas ({path.name}): {len(snapshot.position)} tickers.")
+        return self._snapshot
+
+    def for_watchlist(self, watchlist):
+        """Señales filtradas por la watchlist del usuario (todas si está vacía)."""
+        snapshot = self.get()
+        tickers = parse_watchlist(watchlist)
+        return snapshot.select(tickers) if tickers else snapshot.signals
@@ -1,18 +1,25 @@
 import pandas as pd
 import numpy as np
 import logging
+import argparse
 from src.config import Config
+from src.tech import kernels
+from src.data.datasets import read_dataset, write_dataset, dataset_tickers
 import warnings
 # Configuración de Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
-def calculate_rsi(series, period=14):
+def calculate_rsi(series, period=14, smoothing="sma"):
     """
     Calcula el Relative Strength Index (RSI) manualmente con Pandas.
     Fórmula: 100 - (100 / (1 + RS))
+    smoothing="wilder" usa el suavizado original de Wilder (kernel de src.tech.kernels).
     """
+    if smoothing != "sma":
+        return pd.Series(kernels.rsi(series.to_numpy(dtype=float), period, smoothing), index=series.index)
+
     delta = series.diff()
     gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
     loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
@@ -21,11 +28,15 @@ def calculate_rsi(series, period=14):
     rsi = 100 - (100 / (1 + rs))
     return rsi
 
-def calculate_atr(df, period=14):
+def calculate_atr(df, period=14, smoothing="sma"):
     """
     Calcula el Average True Range (ATR) para medir volatilidad absoluta ($).
     TR = Max(High-Low, Abs(High-PrevClose), Abs(Low-PrevClose))
+    smoothing="wilder" usa el suavizado original de Wilder (kernel de src.tech.kernels).
     """
+    if smoothing != "sma":
+        return pd.Series(kernels.atr(df['high'], df['low'], df['close'], period, smoothing), index=df.index)
+
     high = df['high']
     low = df['low']
     close = df['close']
@@ -69,10 +80,10 @@ def add_indicators(group):
     group['ema_slow'] = group['close'].ewm(span=Config.SMA_SLOW, adjust=False).mean()
     
     # Momentum (RSI)
-    group['rsi'] = calculate_rsi(group['close'], period=14)
+    group['rsi'] = calculate_rsi(group['close'], period=14, smoothing=Config.INDICATOR_SMOOTHING)
     
     # Riesgo Absoluto (ATR)
-    group['atr'] = calculate_atr(group, period=14)
+    group['atr'] = calculate_atr(group, period=14, smoothing=Config.INDICATOR_SMOOTHING)
     
     # Distancia a la Media (Para detectar sobre-extensión)
     # (Precio - EMA_Slow) / EMA_Slow
@@ -80,48 +91,236 @@ def add_indicators(group):
     
     return group
 
-def build_technical_features():
+# MOTOR MATRICIAL (WIDE)
+# En lugar de un DataFrame por ticker, ponemos cada columna en una matriz [posición x ticker]
+# y calculamos todos los activos a la vez sobre el eje 0. La fila es la posición de la barra
+# dentro de la historia de CADA ticker (no la fecha global): así las acciones no "ven"
+# fines de semana que no tienen y el resultado es idéntico al de add_indicators.
+
+def _ffill_rows(m):
+    """Forward fill por columna (eje 0) sin pasar por pandas."""
+    idx = np.where(np.isnan(m), 0, np.arange(m.shape[0])[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return m[idx, np.arange(m.shape[1])]
+
+def _shift_rows(m):
+    """Equivalente a shift(1): la fila anterior, con NaN en la primera."""
+    out = np.empty_like(m)
+    out[0] = np.nan
+    out[1:] = m[:-1]
+    return out
+
+def _rolling_std_rows(m, window):
+    """rolling(window).std() (ddof=1) por columna a partir de las medias de x y x²."""
+    mean = kernels.sma(m, window)
+    mean_sq = kernels.sma(m * m, window)
+    return np.sqrt(np.maximum(mean_sq - mean * mean, 0.0) * window / (window - 1))
+
+def add_indicators_wide(df):
+    """
+    Versión matricial de groupby('ticker').apply(add_indicators): mismas columnas,
+    mismo orden (ticker, fecha), pero sin crear un DataFrame por activo.
+    """
+    df = df.sort_values(['ticker', 'date'], kind='mergesort')
+    codes, tickers = pd.factorize(df['ticker'], sort=True)
+    pos = df.groupby('ticker', sort=True).cumcount().to_numpy()
+    shape = (pos.max() + 1, len(tickers))
+
+    def wide(col):
+        m = np.full(shape, np.nan)
+        m[pos, codes] = df[col].to_numpy(dtype=float)
+        return m
+
+    out = df.copy()
+    prices = {}
+    for col in ['close', 'high', 'low', 'open']:
+        # Si es sábado/domingo y hay NaNs, rellenamos con el precio del viernes.
+        prices[col] = _ffill_rows(wide(col))
+        out[col] = prices[col][pos, codes]
+
+    close, high, low = prices['close'], prices['high'], prices['low']
+    prev_close = _shift_rows(close)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_returns = np.log(close / prev_close)
+        ema_slow = kernels.ema(close, Config.SMA_SLOW)
+
+        indicators = {
+            'returns': close / prev_close - 1,
+            'log_returns': log_returns,
+            'volatility_21d': _rolling_std_rows(log_returns, 21) * np.sqrt(252),
+            'ema_fast': kernels.ema(close, Config.SMA_FAST),
+            'ema_slow': ema_slow,
+            'rsi': kernels.rsi(close, 14, Config.INDICATOR_SMOOTHING),
+            'atr': kernels.atr(high, low, close, 14, Config.INDICATOR_SMOOTHING),
+            'trend_strength': (close - ema_slow) / ema_slow,
+        }
+
+    for col, m in indicators.items():
+        out[col] = m[pos, codes]
+    return out
+
+def compute_indicators(df):
+    """Aplica los indicadores a todos los tickers con el motor de Config.TECH_ENGINE."""
+    if Config.TECH_ENGINE == "wide":
+        return add_indicators_wide(df)
+    return df.groupby('ticker', group_keys=False).apply(add_indicators)
+
+# ESTADO INCREMENTAL
+# Guardamos las últimas filas de cada ticker (con sus indicadores). Con eso basta para
+# continuar las EMAs y rellenar las ventanas de RSI/ATR (14) y volatilidad (21 retornos).
+STATE_TAIL = 30
+
+def extend_ticker(tail, new_bars):
+    """
+    Calcula los indicadores SOLO de las barras nuevas de un ticker, partiendo de su estado.
+    tail: últimas STATE_TAIL filas ya calculadas. new_bars: precios con fecha posterior.
+    """
+    n_tail = len(tail)
+    combined = pd.concat([tail.reindex(columns=new_bars.columns), new_bars], ignore_index=True)
+
+    # Ventanas móviles (returns, volatilidad, RSI, ATR): el tail ya cubre la ventana más larga
+    fresh = add_indicators(combined).iloc[n_tail:].copy()
+
+    # EMAs: continuamos la recursión desde el último valor guardado (no desde el inicio del tail)
+    for col, span in (('ema_fast', Config.SMA_FAST), ('ema_slow', Config.SMA_SLOW)):
+        seeded = pd.concat([tail[col].iloc[-1:], fresh['close']], ignore_index=True)
+        fresh[col] = seeded.ewm(span=span, adjust=False).mean().iloc[1:].to_numpy()
+
+    fresh['trend_strength'] = (fresh['close'] - fresh['ema_slow']) / fresh['ema_slow']
+    return fresh
+
+def save_feature_state(df_features, state_path=None):
+    """Guarda la cola de cada ticker como estado para la próxima corrida incremental."""
+    state_path = state_path or Config.DATA_PROCESSED / "features_technical_state.parquet"
+    state = df_features.sort_values(['ticker', 'date']).groupby('ticker').tail(STATE_TAIL)
+    state.to_parquet(state_path, engine='fastparquet', compression='snappy')
+
+def has_required_columns(df):
+    """Validar que tengamos las columnas necesarias."""
+    required_cols = ['date', 'ticker', 'close', 'high', 'low']
+    if not all(col in df.columns for col in required_cols):
+        logger.error(f"Faltan columnas. Tu archivo tiene: {df.columns}")
+        return False
+    return True
+
+def load_new_prices(input_path, last_dates):
+    """
+    Lee de prices_5y solo lo que el modo incremental necesita (filtros empujados al lector):
+    las barras desde la fecha de estado más vieja y la historia completa de tickers nuevos.
+    Los tickers nuevos salen del propio dataset de precios (no de Config.TICKERS): así también
+    entran los que se agregaron con una ingesta `--tickers` o que ya no están en la configuración.
+    """
+    recent = read_dataset(input_path, start=last_dates.min())
+    new_tickers = [t for t in dataset_tickers(input_path) if t not in last_dates.index]
+    history = read_dataset(input_path, tickers=new_tickers) if new_tickers else recent.iloc[0:0]
+    return pd.concat([recent[recent['ticker'].isin(last_dates.index)], history], ignore_index=True)
+
+def update_technical_features(df, input_path, output_path, save=True):
+    """
+    Modo incremental: agrega a features_technical.parquet solo las barras nuevas de cada ticker.
+    Si `df` es None, lee de `input_path` solo las fechas/tickers necesarios.
+    Devuelve las filas nuevas (None si no hay estado y hace falta una reconstrucción completa).
+    """
+    state_path = Config.DATA_PROCESSED / "features_technical_state.parquet"
+    if not state_path.exists() or not output_path.exists():
+        logger.info("No hay estado incremental previo: se hará la reconstrucción completa.")
+        return None
+    if Config.INDICATOR_SMOOTHING != "sma":
+        # Wilder tiene memoria infinita: la cola guardada no alcanza para continuarlo exactamente
+        logger.info("Suavizado Wilder activo: el modo incremental no aplica, se hará la reconstrucción completa.")
+        return None
+
+    state = pd.read_parquet(state_path)
+    last_dates = state.groupby('ticker')['date'].max()
+
+    if df is None:
+        logger.info(" Cargando solo precios recientes (modo incremental)...")
+        df = load_new_prices(input_path, last_dates)
+        if not has_required_columns(df):
+            return df.iloc[0:0]
+
+    known = df['ticker'].isin(last_dates.index)
+    new_bars = df[known & (df['date'] > df['ticker'].map(last_dates))]
+    new_tickers = df[~known]
+
+    logger.info(f"Modo incremental: {len(new_bars)} barras nuevas en {new_bars['ticker'].nunique()} activos, "
+                f"{new_tickers['ticker'].nunique()} activos nuevos.")
+
+    pieces = [extend_ticker(state[state['ticker'] == ticker], bars) for ticker, bars in new_bars.groupby('ticker')]
+    if not new_tickers.empty:
+        # Un activo que no estaba antes se calcula con toda su historia
+        pieces.append(compute_indicators(new_tickers))
+
+    if not pieces:
+        logger.info("Sin barras nuevas. features_technical.parquet ya está al día.")
+        return df.iloc[0:0]
+
+    appended = pd.concat(pieces).dropna(subset=['ema_slow'])
+
+    if save and not appended.empty:
+        write_dataset(appended, output_path, append=True)
+        save_feature_state(pd.concat([state, appended]), state_path)
+        logger.info(f" {len(appended)} filas agregadas a: {output_path}")
+
+    return appended
+
+def build_technical_features(df=None, save=True, incremental=None):
     """
     Pipeline principal: Carga precios -> Calcula indicadores -> Guarda Features
+    `df` permite recibir los precios en memoria (modo en-proceso del pipeline).
+    `incremental` (por defecto Config.TECH_INCREMENTAL) solo procesa barras nuevas y devuelve esas filas;
+    con `incremental=False` se recalcula toda la historia.
     """
     warnings.simplefilter(action='ignore', category=FutureWarning)
     input_path = Config.DATA_RAW / "prices_5y.parquet"
     output_path = Config.DATA_PROCESSED / "features_technical.parquet"
+    incremental = Config.TECH_INCREMENTAL if incremental is None else incremental
     
-    if not input_path.exists():
+    if df is None and not input_path.exists():
         logger.error(f" No encontré el archivo de precios: {input_path}")
         return
 
-    # Cargar datos
-    logger.info(" Cargando precios históricos...")
-    df = pd.read_parquet(input_path)
+    if incremental:
+        appended = update_technical_features(df, input_path, output_path, save=save)
+        if appended is not None:
+            return appended
+
+    if df is None:
+        # Cargar datos
+        logger.info(" Cargando precios históricos...")
+        df = read_dataset(input_path)
     
     # Validar que tengamos las columnas necesarias 
-    required_cols = ['date', 'ticker', 'close', 'high', 'low']
-    if not all(col in df.columns for col in required_cols):
-        logger.error(f"Faltan columnas. Tu archivo tiene: {df.columns}")
+    if not has_required_columns(df):
         return
     
+
     logger.info(f"Calculando indicadores para {len(df['ticker'].unique())} activos.")
     
     # Aplicamos indicadores (incluye el rellenado de fines de semana)
-    df_features = df.groupby('ticker', group_keys=False).apply(add_indicators)
+    df_features = compute_indicators(df)
     
     # Borramos solo las filas iniciales (warm-up) donde NO se pudo calcular la EMA.
     # Como ya hicimos ffill, los fines de semana ya tienen precio, así que no se borrarán.
     df_features = df_features.dropna(subset=['ema_slow'])
 
     # Guardar
-    Config.DATA_PROCESSED.mkdir(parents=True, exist_ok=True)
-    df_features.to_parquet(output_path, engine='fastparquet', compression='snappy')
-    
     logger.info(f" Ingeniería de Características terminada.")
-    logger.info(f" Guardado en: {output_path}")
+    if save:
+        Config.DATA_PROCESSED.mkdir(parents=True, exist_ok=True)
+        write_dataset(df_features, output_path)
+        save_feature_state(df_features)
+        logger.info(f" Guardado en: {output_path}")
     logger.info(f"Nuevas Dimensiones: {df_features.shape}")
     logger.info(f"Ejemplo:\n{df_features[['date', 'ticker', 'close', 'ema_slow', 'rsi']].tail(5)}")
+    return df_features
 
 if __name__ == "__main__":
-    build_technical_features()
+    parser = argparse.ArgumentParser(description="Indicadores técnicos")
+    parser.add_argument("--full", action="store_true", help="Recalcular toda la historia en vez de solo las barras nuevas.")
+    args = parser.parse_args()
+    build_technical_features(incremental=False if args.full else None)
 
     
     
\ No newline at end of file
@@ -0,0 +1,205 @@
+import numpy as np
+import logging
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Numba es opcional: si está instalado compilamos los bucles a código máquina,
+# si no, usamos versiones NumPy que recorren el tiempo vectorizando entre tickers.
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Todos los kernels trabajan sobre matrices [tiempo x series] a lo largo del eje 0.
+# Una serie 1-D se trata como una matriz de una sola columna.
+
+def _as_2d(x):
+    x = np.asarray(x, dtype=np.float64)
+    return (x[:, None], True) if x.ndim == 1 else (x, False)
+
+# KERNELS ESCALARES (para Numba): una pasada por serie, sin Series intermedias
+
+def _ema_loop(x, alpha):
+    T, N = x.shape
+    out = np.empty((T, N))
+    for j in range(N):
+        prev = np.nan
+        for t in range(T):
+            v = x[t, j]
+            if np.isnan(prev):
+                prev = v
+            elif not np.isnan(v):
+                prev = (1.0 - alpha) * prev + alpha * v
+            out[t, j] = prev
+    return out
+
+def _sma_loop(x, window):
+    T, N = x.shape
+    out = np.full((T, N), np.nan)
+    for j in range(N):
+        for t in range(window - 1, T):
+            # Suma exacta de la ventana (sin arrastre de errores de una suma móvil)
+            acc = 0.0
+            for k in range(t - window + 1, t + 1):
+                acc += x[k, j]
+            out[t, j] = acc / window
+    return out
+
+def _wilder_loop(x, period):
+    T, N = x.shape
+    out = np.full((T, N), np.nan)
+    for j in range(N):
+        prev = np.nan
+        run = 0
+        acc = 0.0
+        for t in range(T):
+            v = x[t, j]
+            if np.isnan(v):
+                # Un hueco reinicia el promedio
+                prev = np.nan
+                run = 0
+                acc = 0.0
+            elif not np.isnan(prev):
+                # Suavizado de Wilder: promedio anterior con peso (n-1)/n
+                prev = (prev * (period - 1) + v) / period
+            else:
+                # Semilla: media simple de los primeros `period` valores válidos
+                run += 1
+                acc += v
+                if run == period:
+                    prev = acc / period
+            out[t, j] = prev
+    return out
+
+# VERSIONES NUMPY (sin Numba): un bucle sobre el tiempo, vectorizado entre tickers
+
+def _ema_rows(x, alpha):
+    out = np.empty_like(x)
+    prev = x[0].copy()
+    out[0] = prev
+    for t in range(1, len(x)):
+        v = x[t]
+        prev = np.where(np.isnan(prev), v, np.where(np.isnan(v), prev, (1.0 - alpha) * prev + alpha * v))
+        out[t] = prev
+    return out
+
+def _sma_rows(x, window):
+    out = np.full_like(x, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window, axis=0).mean(axis=-1)
+    return out
+
+def _wilder_rows(x, period):
+    T, N = x.shape
+    out = np.full((T, N), np.nan)
+    prev = np.full(N, np.nan)
+    run = np.zeros(N)
+    acc = np.zeros(N)
+    for t in range(T):
+        v = x[t]
+        valid = ~np.isnan(v)
+        seeded = ~np.isnan(prev)
+
+        new_prev = np.where(seeded & valid, (prev * (period - 1) + v) / period, np.nan)
+
+        building = ~seeded & valid
+        run = np.where(building, run + 1, 0)
+        acc = np.where(building, acc + np.where(valid, v, 0.0), 0.0)
+        prev = np.where(building & (run == period), acc / period, new_prev)
+        out[t] = prev
+    return out
+
+if NUMBA_AVAILABLE:
+    _ema_impl = njit(cache=True)(_ema_loop)
+    _sma_impl = njit(cache=True)(_sma_loop)
+    _wilder_impl = njit(cache=True)(_wilder_loop)
+else:
+    _ema_impl, _sma_impl, _wilder_impl = _ema_rows, _sma_rows, _wilder_rows
+
+# API PÚBLICA
+
+def ema(x, span):
+    """Equivalente a ewm(span=span, adjust=False).mean() por columna."""
+    x, flat = _as_2d(x)
+    out = _ema_impl(x, 2.0 / (span + 1.0))
+    return out[:, 0] if flat else out
+
+def sma(x, window):
+    """Equivalente a rolling(window).mean(): NaN si falta algún dato de la ventana."""
+    x, flat = _as_2d(x)
+    out = _sma_impl(x, window)
+    return out[:, 0] if flat else out
+
+def wilder(x, period):
+    """Media de Wilder: semilla = media simple de `period` valores, luego (prev*(n-1) + x) / n."""
+    x, flat = _as_2d(x)
+    out = _wilder_impl(x, period)
+    return out[:, 0] if flat else out
+
+def smooth(x, period, smoothing="sma"):
+    """Suavizado usado por RSI/ATR: 'sma' (media móvil simple, el histórico) o 'wilder'."""
+    if smoothing == "wilder":
+        return wilder(x, period)
+    if smoothing == "sma":
+        return sma(x, period)
+    raise ValueError(f"Suavizado desconocido: {smoothing}")
+
+def rsi(close, period=14, smoothing="sma"):
+    """
+    RSI = 100 - 100 / (1 + RS) sobre un array de cierres.
+    Con 'sma' replica calculate_rsi (la primera diferencia cuenta como 0).
+    Con 'wilder' la primera diferencia (indefinida) se omite, como en la definición original.
+    """
+    close, flat = _as_2d(close)
+    delta = np.full_like(close, np.nan)
+    delta[1:] = close[1:] - close[:-1]
+
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    if smoothing == "wilder":
+        gain[np.isnan(delta)] = np.nan
+        loss[np.isnan(delta)] = np.nan
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = 100 - (100 / (1 + smooth(gain, period, smoothing) / smooth(loss, period, smoothing)))
+    return out[:, 0] if flat else out
+
+def true_range(high, low, close):
+    """TR = Max(High-Low, |High-PrevClose|, |Low-PrevClose|), ignorando NaN como pandas max."""
+    high, flat = _as_2d(high)
+    low, _ = _as_2d(low)
+    close, _ = _as_2d(close)
+    prev_close = np.full_like(close, np.nan)
+    prev_close[1:] = close[:-1]
+
+    with np.errstate(invalid='ignore'):
+        out = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    return out[:, 0] if flat else out
+
+def atr(high, low, close, period=14, smoothing="sma"):
+    """Average True Range con suavizado 'sma' (calculate_atr) o 'wilder'."""
+    return smooth(true_range(high, low, close), period, smoothing)
+
+if __name__ == "__main__":
+    # Chequeo rápido de equivalencia contra las funciones pandas de src.tech.indicators
+    import pandas as pd
+    from src.tech.indicators import calculate_rsi, calculate_atr
+
+    rng = np.random.default_rng(0)
+    close = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.02, 2000))))
+    bars = pd.DataFrame({'close': close, 'high': close * 1.01, 'low': close * 0.99})
+
+    checks = {
+        "ema": (ema(close, 20), close.ewm(span=20, adjust=False).mean()),
+        "rsi (sma)": (rsi(close, 14), calculate_rsi(close, 14)),
+        "atr (sma)": (atr(bars['high'], bars['low'], bars['close'], 14), calculate_atr(bars, 14)),
+        "wilder vs ewm": (wilder(close, 14)[400:], close.ewm(alpha=1 / 14, adjust=False).mean().to_numpy()[400:]),
+    }
+    logger.info(f"Numba disponible: {NUMBA_AVAILABLE}")
+    for name, (fast, reference) in checks.items():
+        ok = np.allclose(fast, np.asarray(reference), rtol=1e-6 if name == "wilder vs ewm" else 1e-9, equal_nan=True)
+        logger.info(f"   {name:<15} {'OK' if ok else 'DIFERENTE'}")
@@ -1,57 +1,87 @@
+import numpy as np
+
+# Umbrales
+STRONG_THRESHOLD = 0.05
+
+# Encabezado del Personaje (La firma de Bubo)
+INTRO = "🦉 **La Visión de Bubo:**\n"
+
+# PLANTILLAS DE NARRATIVA
+# El ID de plantilla es lo que se calcula (vectorizado) para todo el universo;
+# el texto solo se arma cuando alguien lo va a mostrar.
+NEUTRAL = 0
+NARRATIVE_TEMPLATES = [
+    # 0: Sin señal clara
+    ("NEUTRAL", ""),
+
+    # 1: COMPRA FUERTE (Sinergia Total)
+    ("🟢 VUELO CONFIRMADO",
+     "{intro}La niebla se ha disipado en **{ticker}**. "
+     "Mis análisis confirman que la tendencia técnica está respaldada por noticias sólidas. "
+     "Es un trayecto claro y seguro para tu capital. Proceda con sabiduría."),
+
+    # 2: COMPRA POR OPORTUNIDAD (Fundamental)
+    ("🟢 VISIÓN NOCTURNA (Smart Buy)",
+     "{intro}He detectado movimiento en la oscuridad sobre **{ticker}**. "
+     "Aunque el precio parece dormido, la información fundamental (noticias) está muy despierta y positiva. "
+     "La sabiduría dicta anticiparse antes de que amanezca para el resto."),
+
+    # 3: COMPRA TÉCNICA (Inercia)
+    ("📈 VUELO ESTABLE",
+     "{intro}**{ticker}** mantiene un planeo ascendente constante. "
+     "No hay ruido en el entorno (noticias neutrales), pero la inercia es favorable. "
+     "A veces, la acción más sabia es simplemente dejar que la corriente te lleve."),
+
+    # 4: ESCUDO ACTIVADO (Veto por Noticias) -> CLAVE DE IDENTIDAD
+    ("🛡️ ALERTA DE PRUDENCIA",
+     "{intro}Mi visión ha detectado un riesgo oculto bajo la superficie de **{ticker}**. "
+     "La gráfica parece atractiva a simple vista, pero el trasfondo fundamental es negativo y peligroso. "
+     "El inversor sabio sabe cuándo observar desde la rama y no arriesgar sus alas. Te protejo."),
+
+    # 5: VENTA / ESPERAR
+    ("🔴 OBSERVACIÓN (WAIT)",
+     "{intro}El panorama en **{ticker}** es incierto y turbio. "
+     "No hay claridad ni en los gráficos ni en las noticias. "
+     "La noche es larga; es mejor preservar la energía (capital) y esperar una señal clara."),
+]
+
+# Estado de cada plantilla, indexable con un array de IDs
+TEMPLATE_STATUS = np.array([status for status, _ in NARRATIVE_TEMPLATES], dtype=object)
+
+def classify_signals(tech_score, sentiment_score, alpha_score):
+    """
+    Versión vectorizada de la lógica de personalidad: recibe arrays (o escalares)
+    y devuelve el ID de plantilla de cada elemento. El orden de las condiciones
+    es el mismo que el de la cadena if/elif original (gana la primera que se cumple).
+    Con NaN ninguna comparación se cumple y el resultado es NEUTRAL.
+    """
+    tech_score = np.asarray(tech_score, dtype=np.float64)
+    sentiment_score = np.asarray(sentiment_score, dtype=np.float64)
+    alpha_score = np.asarray(alpha_score, dtype=np.float64)
+
+    # Variables de Estado
+    with np.errstate(invalid='ignore'):
+        is_tech_bullish = tech_score > 0
+        is_news_good = sentiment_score > 0
+
+        conditions = [
+            (alpha_score > 0) & is_tech_bullish & is_news_good,
+            (alpha_score > 0) & ~is_tech_bullish & is_news_good,
+            (alpha_score > 0) & (tech_score > 0),
+            (alpha_score <= 0) & is_tech_bullish & (sentiment_score < 0),
+            alpha_score < 0,
+        ]
+    return np.select(conditions, [1, 2, 3, 4, 5], default=NEUTRAL)
+
+def render_narrative(ticker, template_id):
+    """Arma (estado, explicación) de una plantilla para un ticker."""
+    status, template = NARRATIVE_TEMPLATES[int(template_id)]
+    return status, template.format(intro=INTRO, ticker=ticker)
+
 def generate_narrative(ticker, tech_score, sentiment_score, alpha_score):
     """
     Narrativa generada por 'Bubo', el Búho de Datos.
     Arquetipo: El Sabio Guardián / El Vigilante Nocturno.
     Tono: Calmado, analítico, prudente, visionario.
     """
-    # Umbrales
-    STRONG_THRESHOLD = 0.05
-    
-    explanation = ""
-    status = "NEUTRAL"
-
-    # Variables de Estado
-    is_tech_bullish = tech_score > 0
-    is_news_good = sentiment_score > 0
-    
-    # Encabezado del Personaje (La firma de Bubo)
-    intro = "🦉 **La Visión de Bubo:**\n"
-    
-    #LÓGICA DE PERSONALIDAD
-    
-    # CASO: COMPRA FUERTE (Sinergia Total)
-    if alpha_score > 0 and is_tech_bullish and is_news_good:
-        status = "🟢 VUELO CONFIRMADO"
-        explanation = (f"{intro}La niebla se ha disipado en **{ticker}**. "
-                       f"Mis análisis confirman que la tendencia técnica está respaldada por noticias sólidas. "
-                       f"Es un trayecto claro y seguro para tu capital. Proceda con sabiduría.")
-
-    # CASO: COMPRA POR OPORTUNIDAD (Fundamental)
-    elif alpha_score > 0 and not is_tech_bullish and is_news_good:
-        status = "🟢 VISIÓN NOCTURNA (Smart Buy)"
-        explanation = (f"{intro}He detectado movimiento en la oscuridad sobre **{ticker}**. "
-                       f"Aunque el precio parece dormido, la información fundamental (noticias) está muy despierta y positiva. "
-                       f"La sabiduría dicta anticiparse antes de que amanezca para el resto.")
-
-    # CASO: COMPRA TÉCNICA (Inercia)
-    elif alpha_score > 0 and tech_score > 0:
-        status = "📈 VUELO ESTABLE"
-        explanation = (f"{intro}**{ticker}** mantiene un planeo ascendente constante. "
-                       f"No hay ruido en el entorno (noticias neutrales), pero la inercia es favorable. "
-                       f"A veces, la acción más sabia es simplemente dejar que la corriente te lleve.")
-
-    # CASO: ESCUDO ACTIVADO (Veto por Noticias) -> CLAVE DE IDENTIDAD
-    elif alpha_score <= 0 and is_tech_bullish and sentiment_score < 0:
-        status = "🛡️ ALERTA DE PRUDENCIA"
-        explanation = (f"{intro}Mi visión ha detectado un riesgo oculto bajo la superficie de **{ticker}**. "
-                       f"La gráfica parece atractiva a simple vista, pero el trasfondo fundamental es negativo y peligroso. "
-                       f"El inversor sabio sabe cuándo observar desde la rama y no arriesgar sus alas. Te protejo.")
-    
-    # CASO: VENTA / ESPERAR
-    elif alpha_score < 0:
-        status = "🔴 OBSERVACIÓN (WAIT)"
-        explanation = (f"{intro}El panorama en **{ticker}** es incierto y turbio. "
-                       f"No hay claridad ni en los gráficos ni en las noticias. "
-                       f"La noche es larga; es mejor preservar la energía (capital) y esperar una señal clara.")
-
-    return status, explanation
+    return render_narrative(ticker, classify_signals(tech_score, sentiment_score, alpha_score))
@@ -0,0 +1,110 @@
+import time
+import asyncio
+import argparse
+import logging
+import numpy as np
+import aiohttp
+
+# Configuración de Logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# PRUEBA DE CARGA DEL DASHBOARD
+# N usuarios concurrentes: cada uno inicia sesión (su propia cookie) y pide la ruta
+# una y otra vez. Al final se reporta la latencia p50/p90/p99 y las peticiones por segundo.
+# Con --streams se mantienen además N conexiones SSE abiertas (pestañas del dashboard) durante la prueba.
+
+async def ensure_user(base_url, username, password):
+    """Registra el usuario de prueba (si ya existe, el registro simplemente falla y seguimos)."""
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{base_url}/register", data={"username": username, "password": password}) as resp:
+            await resp.read()
+
+async def run_user(base_url, path, username, password, n_requests, latencies, errors):
+    async with aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True),
+                                     timeout=aiohttp.ClientTimeout(total=30)) as session:
+        async with session.post(f"{base_url}/login", data={"username": username, "password": password}) as resp:
+            await resp.read()
+        for _ in range(n_requests):
+            start = time.perf_counter()
+            try:
+                async with session.get(f"{base_url}{path}", allow_redirects=False) as resp:
+                    await resp.read()
+                    if resp.status != 200:
+                        errors.append(resp.status)
+                        continue
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                errors.append(type(e).__name__)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+async def login_cookies(base_url, username, password):
+    """Inicia sesión una vez y devuelve las cookies (para abrir muchas pestañas sin un bcrypt por cada una)."""
+    async with aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True)) as session:
+        async with session.post(f"{base_url}/login", data={"username": username, "password": password}) as resp:
+            await resp.read()
+        return {name: morsel.value for name, morsel in session.cookie_jar.filter_cookies(base_url).items()}
+
+async def hold_stream(base_url, cookies, opened):
+    """Una pestaña del dashboard: /api/stream abierto con la sesión iniciada hasta que se cancele."""
+    async with aiohttp.ClientSession(cookies=cookies, timeout=aiohttp.ClientTimeout(total=None)) as session:
+        async with session.get(f"{base_url}/api/stream") as resp:
+            if resp.status == 200:
+                opened.append(1)
+            async for _ in resp.content.iter_any():
+                pass
+
+async def load_test(base_url, path="/", users=20, requests_per_user=50, username="loadtest", password="loadtest",
+                    streams=0):
+    """Corre la prueba y devuelve un dict con latencias (ms) y rendimiento."""
+    await ensure_user(base_url, username, password)
+
+    opened = []
+    cookies = await login_cookies(base_url, username, password) if streams else None
+    holders = [asyncio.create_task(hold_stream(base_url, cookies, opened)) for _ in range(streams)]
+    # Las conexiones SSE se abren antes de medir
+    deadline = time.monotonic() + 120
+    while len(opened) + sum(t.done() for t in holders) < streams and time.monotonic() < deadline:
+        await asyncio.sleep(0.2)
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_user(base_url, path, username, password, requests_per_user, latencies, errors)
+                           for _ in range(users)))
+    elapsed = time.perf_counter() - start
+
+    for task in holders:
+        task.cancel()
+    await asyncio.gather(*holders, return_exceptions=True)
+
+    ms = np.array(latencies) * 1000
+    return {
+        'users': users,
+        'streams': len(opened),
+        'requests': len(latencies),
+        'errors': len(errors),
+        'p50_ms': float(np.percentile(ms, 50)) if len(ms) else float('nan'),
+        'p90_ms': float(np.percentile(ms, 90)) if len(ms) else float('nan'),
+        'p99_ms': float(np.percentile(ms, 99)) if len(ms) else float('nan'),
+        'req_per_s': len(latencies) / elapsed,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga del dashboard (latencia p50/p99 con N usuarios)")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Servidor (gunicorn o python -m src.app)")
+    parser.add_argument("--path", default="/", help="Ruta a medir, p. ej. / o /api/signals")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 10, 50], help="Usuarios concurrentes (uno o varios escenarios)")
+    parser.add_argument("--requests", type=int, default=50, help="Peticiones por usuario")
+    parser.add_argument("--streams", type=int, default=0, help="Conexiones SSE (/api/stream) abiertas durante la prueba")
+    parser.add_argument("--username", default="loadtest")
+    parser.add_argument("--password", default="loadtest")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"PRUEBA DE CARGA: {args.url}{args.path}")
+    print("="*60)
+    print(f"{'usuarios':>9} {'streams':>8} {'peticiones':>11} {'errores':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+    for users in args.users:
+        r = asyncio.run(load_test(args.url, args.path, users, args.requests, args.username, args.password, args.streams))
+        print(f"{r['users']:>9} {r['streams']:>8} {r['requests']:>11} {r['errors']:>8} {r['p50_ms']:>9.1f} {r['p90_ms']:>9.1f} "
+              f"{r['p99_ms']:>9.1f} {r['req_per_s']:>9.1f}")
@@ -0,0 +1,222 @@
+import time
+import asyncio
+
+import aiohttp
+import pandas as pd
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.config import Config
+from src.data.ingest_async import (Provider, fetch_prices, fetch_news, ingest_prices_async,
+                                    load_watermarks, save_watermarks)
+
+# La capa de ingesta contra un servidor local (aiohttp) que imita a Yahoo y a Finnhub:
+# reintentos ante 429/5xx, el no-reintento de un 404 y el parseo de chart y company-news.
+# Correr desde la raíz del repo: python -m pytest
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(Config, "INGEST_RETRIES", 3)
+    monkeypatch.setattr(Config, "INGEST_BACKOFF", 0.01)
+    monkeypatch.setattr(Config, "INGEST_TIMEOUT", 5)
+    monkeypatch.setattr(Config, "FINNHUB_KEY", "test-key")
+
+def run_with_stub(routes, scenario):
+    """Levanta el stub con `routes` [(path, handler)] y corre `scenario(base_url)` dentro del mismo loop."""
+    async def main():
+        app = web.Application()
+        for path, handler in routes:
+            app.router.add_get(path, handler)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            return await scenario(str(server.make_url("")).rstrip("/"))
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+def scripted(responses, calls):
+    """Handler que devuelve las respuestas de `responses` en orden (la última se repite)."""
+    async def handler(request):
+        calls.append(dict(request.query))
+        return responses[min(len(calls), len(responses)) - 1]()
+    return handler
+
+def ok_json():
+    return web.json_response({"ok": True})
+
+def chart_payload(timestamps, closes, meta=None):
+    n = len(timestamps)
+    return {"chart": {"result": [{
+        "meta": meta or {},
+        "timestamp": timestamps,
+        "indicators": {"quote": [{"open": closes, "high": closes, "low": closes, "close": closes, "volume": [100] * n}]},
+    }]}}
+
+def test_429_waits_for_retry_after_then_succeeds():
+    calls = []
+    handler = scripted([lambda: web.Response(status=429, headers={"Retry-After": "0.3"}), ok_json], calls)
+
+    async def scenario(base_url):
+        async with Provider("stub", base_url, rate=100) as provider:
+            start = time.perf_counter()
+            payload = await provider.get_json("data")
+            return payload, time.perf_counter() - start
+
+    payload, elapsed = run_with_stub([("/data", handler)], scenario)
+    assert payload == {"ok": True}
+    assert len(calls) == 2
+    # El bucket quedó penalizado por Retry-After: el reintento no sale antes de tiempo
+    assert elapsed >= 0.3
+
+def test_5xx_is_retried():
+    calls = []
+    handler = scripted([lambda: web.Response(status=503), lambda: web.Response(status=502), ok_json], calls)
+
+    async def scenario(base_url):
+        async with Provider("stub", base_url, rate=100) as provider:
+            return await provider.get_json("data")
+
+    assert run_with_stub([("/data", handler)], scenario) == {"ok": True}
+    assert len(calls) == 3
+
+def test_5xx_gives_up_after_retries():
+    calls = []
+    handler = scripted([lambda: web.Response(status=500)], calls)
+
+    async def scenario(base_url):
+        async with Provider("stub", base_url, rate=100) as provider:
+            return await provider.get_json("data", retries=2)
+
+    with pytest.raises(aiohttp.ClientResponseError) as excinfo:
+        run_with_stub([("/data", handler)], scenario)
+    assert excinfo.value.status == 500
+    assert len(calls) == 3
+
+def test_404_is_not_retried():
+    calls = []
+    handler = scripted([lambda: web.Response(status=404), ok_json], calls)
+
+    async def scenario(base_url):
+        async with Provider("stub", base_url, rate=100) as provider:
+            return await provider.get_json("data")
+
+    with pytest.raises(aiohttp.ClientResponseError) as excinfo:
+        run_with_stub([("/data", handler)], scenario)
+    assert excinfo.value.status == 404
+    assert len(calls) == 1
+
+def test_fetch_prices_parses_chart():
+    day = int(pd.Timestamp("2024-03-04").timestamp())
+    # Dos velas el mismo día (la del día en curso repetida) y un cierre nulo
+    timestamps = [day + 14 * 3600, day + 86400 + 14 * 3600, day + 86400 + 20 * 3600, day + 2 * 86400 + 14 * 3600]
+    closes = [10.0, 11.0, 11.5, None]
+    calls = []
+
+    async def chart(request):
+        calls.append((request.match_info["ticker"], dict(request.query)))
+        return web.json_response(chart_payload(timestamps, closes))
+
+    async def scenario(base_url):
+        async with Provider("yahoo", base_url, rate=100) as provider:
+            full = await fetch_prices(provider, "AAPL", period="5y")
+            delta = await fetch_prices(provider, "AAPL", start="2024-03-05")
+            return full, delta
+
+    full, delta = run_with_stub([("/v8/finance/chart/{ticker}", chart)], scenario)
+    assert list(full.columns) == ["date", "ticker", "open", "high", "low", "close", "volume"]
+    assert full["date"].tolist() == list(pd.to_datetime(["2024-03-04", "2024-03-05", "2024-03-06"]))
+    assert (full["ticker"] == "AAPL").all()
+    assert full["close"].iloc[1] == 11.5          # Se queda la última vela del día
+    assert pd.isna(full["close"].iloc[2])
+    assert calls[0][1]["range"] == "5y"
+    assert calls[1][1]["period1"] == str(int(pd.Timestamp("2024-03-05").timestamp()))
+    assert len(delta) == 3
+
+@pytest.mark.parametrize("meta", [
+    {"exchangeTimezoneName": "Europe/London", "gmtoffset": 3600},
+    {"exchangeTimezoneName": "Nowhere/Atlantis", "gmtoffset": 3600},   # Zona desconocida: gmtoffset
+])
+def test_fetch_prices_uses_exchange_time(meta):
+    # Par FX sellado en la medianoche de Londres: 00:00 UTC en invierno, 23:00 UTC del día previo en verano
+    timestamps = [int(pd.Timestamp("2024-03-29 00:00", tz="UTC").timestamp()),
+                  int(pd.Timestamp("2024-04-01 23:00", tz="UTC").timestamp()),
+                  int(pd.Timestamp("2024-04-02 23:00", tz="UTC").timestamp())]
+
+    async def chart(request):
+        return web.json_response(chart_payload(timestamps, [1.08, 1.07, 1.09], meta))
+
+    async def scenario(base_url):
+        async with Provider("yahoo", base_url, rate=100) as provider:
+            return await fetch_prices(provider, "EURUSD=X")
+
+    prices = run_with_stub([("/v8/finance/chart/{ticker}", chart)], scenario)
+    # Ninguna vela cae en el día anterior ni se pierde como duplicada
+    assert prices["date"].tolist() == list(pd.to_datetime(["2024-03-29", "2024-04-02", "2024-04-03"]))
+    assert prices["close"].tolist() == [1.08, 1.07, 1.09]
+
+def test_fetch_prices_empty_chart():
+    async def chart(request):
+        return web.json_response({"chart": {"result": None, "error": {"code": "Not Found"}}})
+
+    async def scenario(base_url):
+        async with Provider("yahoo", base_url, rate=100) as provider:
+            return await fetch_prices(provider, "NOPE")
+
+    assert run_with_stub([("/v8/finance/chart/{ticker}", chart)], scenario).empty
+
+def test_fetch_news_splits_windows_and_parses(monkeypatch):
+    monkeypatch.setattr(Config, "INGEST_NEWS_WINDOW_DAYS", 10)
+    calls = []
+
+    async def company_news(request):
+        q = dict(request.query)
+        calls.append(q)
+        ts = int(pd.Timestamp(q["from"]).timestamp()) + 3600
+        # El mismo artículo (id 1) aparece en todas las ventanas: no debe duplicarse
+        return web.json_response([
+            {"id": 1, "datetime": int(pd.Timestamp("2024-01-01").timestamp()), "headline": "h1",
+             "summary": "s", "source": "x", "url": "u"},
+            {"id": int(ts), "datetime": ts, "headline": f"h {q['from']}", "summary": "s", "source": "x", "url": "u"},
+        ])
+
+    async def scenario(base_url):
+        async with Provider("finnhub", base_url, rate=100) as provider:
+            return await fetch_news(provider, "MSFT", "2024-01-01", "2024-01-25")
+
+    news = run_with_stub([("/company-news", company_news)], scenario)
+    windows = sorted((c["from"], c["to"]) for c in calls)
+    assert windows == [("2024-01-01", "2024-01-10"), ("2024-01-11", "2024-01-20"), ("2024-01-21", "2024-01-25")]
+    assert all(c["symbol"] == "MSFT" and c["token"] == "test-key" for c in calls)
+    assert list(news.columns) == ["id", "ticker", "date", "headline", "summary", "source", "url"]
+    assert news["id"].is_unique and len(news) == 4
+    assert news["id"].dtype == "int64"
+    assert (news["ticker"] == "MSFT").all()
+    assert news.loc[news["id"] == 1, "date"].iloc[0] == pd.Timestamp("2024-01-01")
+
+def test_failed_ticker_does_not_abort_the_run(monkeypatch):
+    day = int(pd.Timestamp("2024-03-04").timestamp())
+
+    async def chart(request):
+        if request.match_info["ticker"] == "BAD":
+            return web.Response(status=404)
+        return web.json_response(chart_payload([day], [1.0]))
+
+    async def scenario(base_url):
+        monkeypatch.setattr(Config, "YAHOO_BASE_URL", base_url)
+        return await ingest_prices_async(["AAA", "BAD", "BBB"])
+
+    prices, failed = run_with_stub([("/v8/finance/chart/{ticker}", chart)], scenario)
+    assert failed == ["BAD"]
+    assert sorted(prices["ticker"]) == ["AAA", "BBB"]
+
+def test_watermarks_ignored_when_dataset_is_missing(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "DATA_RAW", tmp_path)
+    save_watermarks({"prices": {"AAA": "2024-03-04"}, "news": {"AAA": {"ts": 0, "id": 1}}})
+    pd.DataFrame({"id": [1], "ticker": ["AAA"], "date": [pd.Timestamp("2024-03-04")]}).to_parquet(
+        tmp_path / "news_raw.parquet", engine="fastparquet")
+    # prices_5y no existe: pedir solo el delta lo dejaría sin historia
+    marks = load_watermarks()
+    assert marks["prices"] == {}
+    assert marks["news"] == {"AAA": {"ts": 0, "id": 1}}
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.tech import kernels
+from src.tech.indicators import calculate_rsi, calculate_atr
+
+# Equivalencia de los kernels de src.tech.kernels contra las funciones pandas de referencia
+# y entre sus dos implementaciones (bucle escalar / Numba y versión NumPy por filas).
+# Correr desde la raíz del repo: python -m pytest
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(0)
+    close = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.02, 600))))
+    spread = np.abs(rng.normal(0, 0.01, len(close)))
+    return pd.DataFrame({'close': close, 'high': close * (1 + spread), 'low': close * (1 - spread)})
+
+@pytest.fixture
+def matrix_with_gaps():
+    """Matriz [tiempo x tickers] con NaN al inicio (ticker que empieza tarde) y huecos sueltos."""
+    rng = np.random.default_rng(1)
+    x = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (300, 4)), axis=0))
+    x[:40, 1] = np.nan
+    x[rng.random(x.shape) < 0.03] = np.nan
+    return x
+
+def test_ema_matches_pandas_ewm(bars):
+    expected = bars['close'].ewm(span=20, adjust=False).mean()
+    np.testing.assert_allclose(kernels.ema(bars['close'], 20), expected, rtol=1e-9)
+
+def test_ema_matches_pandas_ewm_with_gaps(matrix_with_gaps):
+    expected = pd.DataFrame(matrix_with_gaps).ewm(span=20, adjust=False, ignore_na=True).mean().to_numpy()
+    np.testing.assert_allclose(kernels.ema(matrix_with_gaps, 20), expected, rtol=1e-9)
+
+def test_sma_matches_pandas_rolling(matrix_with_gaps):
+    expected = pd.DataFrame(matrix_with_gaps).rolling(14).mean().to_numpy()
+    np.testing.assert_allclose(kernels.sma(matrix_with_gaps, 14), expected, rtol=1e-9)
+
+def test_rsi_matches_calculate_rsi(bars):
+    expected = calculate_rsi(bars['close'], 14)
+    np.testing.assert_allclose(kernels.rsi(bars['close'], 14), expected, rtol=1e-9)
+
+def test_atr_matches_calculate_atr(bars):
+    expected = calculate_atr(bars, 14)
+    np.testing.assert_allclose(kernels.atr(bars['high'], bars['low'], bars['close'], 14), expected, rtol=1e-9)
+
+def test_wilder_converges_to_ewm(bars):
+    # Wilder = EWM con alpha = 1/n; con otra semilla la diferencia se desvanece tras varios períodos
+    expected = bars['close'].ewm(alpha=1 / 14, adjust=False).mean().to_numpy()
+    np.testing.assert_allclose(kernels.wilder(bars['close'], 14)[400:], expected[400:], rtol=1e-6)
+
+def test_wilder_seed_is_simple_mean(bars):
+    close = bars['close'].to_numpy()
+    out = kernels.wilder(close, 14)
+    assert np.isnan(out[:13]).all()
+    assert out[13] == pytest.approx(close[:14].mean())
+    assert out[14] == pytest.approx((out[13] * 13 + close[14]) / 14)
+
+def test_wilder_smoothing_through_indicators(bars):
+    np.testing.assert_allclose(calculate_rsi(bars['close'], 14, "wilder"), kernels.rsi(bars['close'], 14, "wilder"))
+    np.testing.assert_allclose(calculate_atr(bars, 14, "wilder"),
+                               kernels.atr(bars['high'], bars['low'], bars['close'], 14, "wilder"))
+
+def test_unknown_smoothing_raises(bars):
+    with pytest.raises(ValueError):
+        kernels.smooth(bars['close'].to_numpy(), 14, "hull")
+
+@pytest.mark.parametrize("loop, rows, param", [
+    (kernels._ema_loop, kernels._ema_rows, 2.0 / 21.0),
+    (kernels._sma_loop, kernels._sma_rows, 14),
+    (kernels._wilder_loop, kernels._wilder_rows, 14),
+])
+def test_loop_and_numpy_paths_agree(matrix_with_gaps, loop, rows, param):
+    np.testing.assert_allclose(loop(matrix_with_gaps, param), rows(matrix_with_gaps, param), rtol=1e-12)
+
+@pytest.mark.skipif(not kernels.NUMBA_AVAILABLE, reason="numba no está instalado")
+@pytest.mark.parametrize("name, param", [("ema", 2.0 / 21.0), ("sma", 14), ("wilder", 14)])
+def test_numba_and_numpy_paths_agree(matrix_with_gaps, name, param):
+    compiled = getattr(kernels, f"_{name}_impl")
+    rows = getattr(kernels, f"_{name}_rows")
+    np.testing.assert_allclose(compiled(matrix_with_gaps, param), rows(matrix_with_gaps, param), rtol=1e-12)
+
+@pytest.mark.parametrize("smoothing", ["sma", "wilder"])
+def test_rsi_atr_agree_across_paths(monkeypatch, bars, smoothing):
+    # Mismo RSI/ATR con los kernels activos (Numba si está) y forzando la versión NumPy
+    high, low, close = bars['high'].to_numpy(), bars['low'].to_numpy(), bars['close'].to_numpy()
+    close[[50, 51, 300]] = np.nan
+    active = kernels.rsi(close, 14, smoothing), kernels.atr(high, low, close, 14, smoothing)
+
+    monkeypatch.setattr(kernels, "_sma_impl", kernels._sma_rows)
+    monkeypatch.setattr(kernels, "_wilder_impl", kernels._wilder_rows)
+    numpy_only = kernels.rsi(close, 14, smoothing), kernels.atr(high, low, close, 14, smoothing)
+
+    for a, b in zip(active, numpy_only):
+        np.testing.assert_allclose(a, b, rtol=1e-12)